@@ -16,8 +16,22 @@ from routes.notifications import notifications_bp
 from routes.personalized_challenges import personalized_challenges_bp
 from routes.chat import chat_bp
 from routes.admin import admin_bp
+from routes.users import users_bp
+from routes.groups import groups_bp
+from routes.events import events_bp
 from services.message_retention import MessageRetentionService
 from services.message_storage import SimpleMessageStorage
+from services.candidate_index import candidate_index
+from services.connections import connection_graph
+from services.social_graph import friends_of_friends
+from services.lsh import interest_lsh
+from services.text_similarity import text_index
+from services.profile_snapshot import profile_snapshot
+from services.network_clusters import study_network
+from services.matching import compatibility_cache
+from services.events import event_hub
+from services.broker import create_broker
+from services.recommendation_rebuild import recommendations_cli
 from models import User
 from config import Config
 import os
@@ -48,8 +62,8 @@ def create_app():
     supports_credentials=True,
     origins=["http://localhost:5173", "http://127.0.0.1:5173"],
     methods=["GET","POST","PUT","DELETE","OPTIONS","PATCH"],
-    allow_headers=["Content-Type","Authorization","Cookie"],
-    expose_headers=["Content-Type","Set-Cookie"],
+    allow_headers=["Content-Type","Authorization","Cookie","Last-Event-ID"],
+    expose_headers=["Content-Type","Set-Cookie","X-Next-Cursor"],
 )
 
 
@@ -72,6 +86,24 @@ def create_app():
         app.message_retention_service = MessageRetentionService(app)
         app.message_retention_service.start()
         app.message_storage = SimpleMessageStorage(app)
+        candidate_index.ttl = app.config["CANDIDATE_INDEX_TTL"]
+        interest_lsh.configure(app.config["LSH_BANDS"], app.config["LSH_ROWS"])
+        interest_lsh.enabled = app.config["MATCHING_CANDIDATE_MODE"] == "lsh"
+        interest_lsh.ttl = app.config["CANDIDATE_INDEX_TTL"]
+        text_index.ttl = app.config["CANDIDATE_INDEX_TTL"]
+        text_index.compact_after = app.config["TEXT_INDEX_COMPACT_AFTER"]
+        profile_snapshot.path = app.config["PROFILE_SNAPSHOT_PATH"] or os.path.join(
+            app.instance_path, "profile_snapshot.bin"
+        )
+        profile_snapshot.max_changes = app.config["PROFILE_SNAPSHOT_MAX_CHANGES"]
+        connection_graph.max_users = app.config["CONNECTION_CACHE_SIZE"]
+        connection_graph.ttl = app.config["CONNECTION_CACHE_TTL"]
+        friends_of_friends.max_cached_users = app.config["FRIENDS_OF_FRIENDS_CACHE_SIZE"]
+        friends_of_friends.ttl = app.config["FRIENDS_OF_FRIENDS_TTL"]
+        study_network.rebuild_interval = app.config["NETWORK_REBUILD_INTERVAL"]
+        compatibility_cache.max_size = app.config["COMPATIBILITY_CACHE_SIZE"]
+        event_hub.replay_size = app.config["EVENTS_REPLAY_SIZE"]
+        event_hub.use_broker(create_broker(app.config["EVENT_BROKER_URL"]))
 
         # ✅ Ensure admin user exists safely - MOVED INSIDE APP CONTEXT
         try:
@@ -111,6 +143,12 @@ def create_app():
     app.register_blueprint(personalized_challenges_bp, url_prefix="/api/challenges")
     app.register_blueprint(chat_bp, url_prefix="/api/chat")
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(users_bp, url_prefix="/api/users")
+    app.register_blueprint(groups_bp, url_prefix="/api/groups")
+    app.register_blueprint(events_bp, url_prefix="/api/events")
+
+    # ---------------- CLI Commands ----------------
+    app.cli.add_command(recommendations_cli)
     
 
     # ---------------- Utility Routes ----------------
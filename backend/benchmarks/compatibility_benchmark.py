@@ -0,0 +1,151 @@
+"""
+Compare the per-candidate compatibility loop with the vectorized CandidateMatrix scorer.
+
+Both are also checked against the original string-based scorer, which parsed
+the raw profile fields on every comparison. Inputs avoid the two cases where
+the stored features intentionally differ from it: specializations padded with
+whitespace (now stripped) and empty interest entries such as "a,,b" (now
+dropped).
+
+Run from the backend directory:
+    python -m benchmarks.compatibility_benchmark
+    python -m benchmarks.compatibility_benchmark --sizes 10000 100000 --repeat 5
+"""
+import argparse
+import random
+import time
+
+from collections import namedtuple
+
+from services.matching import (
+    SCHEDULE_INDICATORS, MatchFeatures, compatibility_from_features, match_tier,
+    normalize_interests, normalize_specialization, schedule_to_mask
+)
+from services.batch_matching import CandidateMatrix, NO_TIER
+
+INTERESTS = [f"topic {i}" for i in range(300)]
+SPECIALIZATIONS = [f"field {i}" for i in range(40)]
+
+# The raw profile fields the original scorer read
+RawProfile = namedtuple("RawProfile", ["interests", "specialization", "schedule"])
+
+
+def random_case(rnd, text):
+    return "".join(c.upper() if rnd.random() < 0.3 else c for c in text)
+
+
+def random_profile(rnd):
+    interests = ",".join(
+        " " * rnd.randint(0, 2) + random_case(rnd, name) + " " * rnd.randint(0, 2)
+        for name in rnd.sample(INTERESTS, rnd.randint(0, 6))
+    )
+    specialization = random_case(rnd, rnd.choice(SPECIALIZATIONS)) if rnd.random() < 0.85 else ""
+    schedule = ""
+    if rnd.random() < 0.8:
+        words = [random_case(rnd, word) for word in SCHEDULE_INDICATORS if rnd.random() < 0.4]
+        schedule = " and ".join(words) or "flexible"
+    return RawProfile(interests, specialization, schedule)
+
+
+def features_of(profile):
+    return MatchFeatures(
+        frozenset(normalize_interests(profile.interests)),
+        normalize_specialization(profile.specialization),
+        schedule_to_mask(profile.schedule)
+    )
+
+
+def baseline_compatibility(profile1, profile2):
+    """The original per-pair scorer and tier, parsing the raw fields each time"""
+    score = 0
+    interests1 = set(i.strip().lower() for i in profile1.interests.split(',')) if profile1.interests else set()
+    interests2 = set(i.strip().lower() for i in profile2.interests.split(',')) if profile2.interests else set()
+    if interests1 and interests2:
+        score += (len(interests1 & interests2) / max(len(interests1), len(interests2))) * 40
+    elif not profile1.interests and not profile2.interests:
+        score += 20
+
+    same_specialization = False
+    if profile1.specialization and profile2.specialization:
+        same_specialization = profile1.specialization.lower() == profile2.specialization.lower()
+        if same_specialization:
+            score += 30
+    elif not profile1.specialization and not profile2.specialization:
+        score += 15
+
+    schedule_matches = 0
+    if profile1.schedule and profile2.schedule:
+        schedule1, schedule2 = profile1.schedule.lower(), profile2.schedule.lower()
+        schedule_matches = sum(1 for indicator in SCHEDULE_INDICATORS if indicator in schedule1 and indicator in schedule2)
+        score += (schedule_matches / len(SCHEDULE_INDICATORS)) * 30
+    elif not profile1.schedule and not profile2.schedule:
+        score += 15
+
+    if same_specialization:
+        tier = 0
+    elif interests1 & interests2:
+        tier = 1
+    elif schedule_matches:
+        tier = 2
+    else:
+        tier = NO_TIER
+    return min(round(score), 100), tier
+
+
+def baseline_scorer(current, candidates):
+    return [baseline_compatibility(current, profile) for profile in candidates]
+
+
+def loop_scorer(current, candidates):
+    results = []
+    for features in candidates:
+        tier = match_tier(current, features)
+        results.append((compatibility_from_features(current, features), NO_TIER if tier is None else tier))
+    return results
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(size, repeat, seed):
+    rnd = random.Random(seed)
+    profiles = [random_profile(rnd) for _ in range(size)]
+    current_profile = random_profile(rnd)
+    candidates = [features_of(profile) for profile in profiles]
+    current = features_of(current_profile)
+
+    baseline_time, baseline = best_of(repeat, lambda: baseline_scorer(current_profile, profiles))
+    loop_time, expected = best_of(repeat, lambda: loop_scorer(current, candidates))
+    build_time, matrix = best_of(repeat, lambda: CandidateMatrix.from_features(range(size), candidates))
+    score_time, (compatibility, tier) = best_of(repeat, lambda: matrix.score(current))
+
+    if expected != baseline:
+        raise SystemExit(f"Feature scorer disagrees with the baseline at {size} profiles")
+    if list(zip(compatibility.tolist(), tier.tolist())) != expected:
+        raise SystemExit(f"Scorers disagree at {size} profiles")
+
+    print(f"{size:>8} profiles | baseline {baseline_time * 1000:9.2f} ms | loop {loop_time * 1000:9.2f} ms | "
+          f"matrix build {build_time * 1000:9.2f} ms | vectorized score {score_time * 1000:8.2f} ms | "
+          f"speedup {loop_time / score_time:6.1f}x (scoring only)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.repeat, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Measure fan-out latency and throughput of realtime event delivery through each broker.
+
+One hub publishes and a second hub, standing in for another worker process,
+delivers to SUBSCRIBERS reader threads blocked in EventHub.wait like SSE
+streams. Every round publishes one event to each subscriber and waits for
+all of them to arrive. Run from the backend directory:
+    python -m benchmarks.event_broker_benchmark
+    python -m benchmarks.event_broker_benchmark --backend redis --url redis://localhost:6379/0 --subscribers 5000
+    python -m benchmarks.event_broker_benchmark --backend redis --fake
+    python -m benchmarks.event_broker_benchmark --backend postgres --url postgresql://localhost/studybuddy
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from services.broker import RedisBroker, PostgresBroker
+from services.events import EventHub
+
+
+def make_hubs(backend, url, fake):
+    """(publishing hub, delivering hub)"""
+    if backend == "local":
+        # Single process, the publisher delivers to its own readers
+        hub = EventHub()
+        return hub, hub
+
+    publisher, subscriber = EventHub(), EventHub()
+    if backend == "redis":
+        if fake:
+            import fakeredis
+            server = fakeredis.FakeServer()
+            brokers = [RedisBroker(None, client=fakeredis.FakeRedis(server=server)) for _ in range(2)]
+        else:
+            brokers = [RedisBroker(url), RedisBroker(url)]
+    else:
+        brokers = [PostgresBroker(url), PostgresBroker(url)]
+    # Like real workers, the publishing hub also receives (and buffers) every event
+    publisher.use_broker(brokers[0])
+    subscriber.use_broker(brokers[1])
+    return publisher, subscriber
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(backend, url, fake, subscribers, rounds):
+    publisher, hub = make_hubs(backend, url, fake)
+    time.sleep(0.5)  # let broker listeners subscribe
+
+    latencies = []
+    latency_lock = threading.Lock()
+    remaining = [0]
+    round_done = threading.Event()
+    stop = threading.Event()
+
+    def reader(user_id):
+        after_id = hub.current_id()
+        while not stop.is_set():
+            events, _ = hub.wait(user_id, after_id, 1.0)
+            if not events:
+                continue
+            received = time.perf_counter()
+            after_id = events[-1][0]
+            with latency_lock:
+                latencies.extend(received - data["sent"] for _, _, data in events)
+                remaining[0] -= len(events)
+                if remaining[0] == 0:
+                    round_done.set()
+
+    threads = [threading.Thread(target=reader, args=(user_id,), daemon=True) for user_id in range(subscribers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+
+    fan_out_times = []
+    publish_rates = []
+    for _ in range(rounds):
+        round_done.clear()
+        with latency_lock:
+            remaining[0] = subscribers
+        started = time.perf_counter()
+        for user_id in range(subscribers):
+            publisher.publish(user_id, "benchmark", {"sent": time.perf_counter()})
+        published = time.perf_counter()
+        if not round_done.wait(60):
+            print(f"  round timed out with {remaining[0]} events undelivered")
+            break
+        fan_out_times.append(time.perf_counter() - started)
+        publish_rates.append(subscribers / (published - started))
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    hub.broker.close()
+    publisher.broker.close()
+
+    if not fan_out_times:
+        return
+    delivered = len(fan_out_times) * subscribers
+    print(f"{backend:>8} {subscribers:>6} subscribers x {len(fan_out_times)} rounds: "
+          f"publish {statistics.median(publish_rates):>9.0f} ev/s, "
+          f"delivered {delivered / sum(fan_out_times):>9.0f} ev/s, "
+          f"fan-out p50 {statistics.median(fan_out_times) * 1000:7.1f}ms, "
+          f"latency p50 {percentile(latencies, 0.5) * 1000:6.2f}ms "
+          f"p99 {percentile(latencies, 0.99) * 1000:6.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["local", "redis", "postgres"], default="local")
+    parser.add_argument("--url", default=None, help="Broker URL for redis or postgres.")
+    parser.add_argument("--fake", action="store_true", help="Use an in-process fakeredis server.")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[100, 1000, 4000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    for subscribers in args.subscribers:
+        run(args.backend, args.url, args.fake, subscribers, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
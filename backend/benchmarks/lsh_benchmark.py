@@ -0,0 +1,109 @@
+"""
+Measure recall and latency of LSH candidate retrieval against the exact candidate index.
+
+Both paths score their candidates with the same CandidateMatrix scorer as
+score_candidates, so recall@K compares the top-K recommendations each mode
+would materialize. Run from the backend directory:
+    python -m benchmarks.lsh_benchmark
+    python -m benchmarks.lsh_benchmark --size 100000 --configs 16x2 32x2 16x4 --top-k 20
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from services.matching import MatchFeatures
+from services.batch_matching import CandidateMatrix, NO_TIER
+from services.candidate_index import CandidateIndex
+from services.lsh import InterestLSH
+
+TOPICS = [f"topic {i}" for i in range(2000)]
+SPECIALIZATIONS = [f"field {i}" for i in range(40)]
+
+
+def random_profiles(size, rnd):
+    """Profiles drawn from interest communities so that high-overlap neighbours exist"""
+    communities = [rnd.sample(TOPICS, 8) for _ in range(max(1, size // 200))]
+    profiles = []
+    for _ in range(size):
+        community = rnd.choice(communities)
+        interests = set(rnd.sample(community, rnd.randint(2, 6)))
+        if rnd.random() < 0.5:
+            interests.add(rnd.choice(TOPICS))
+        specialization = rnd.choice(SPECIALIZATIONS) if rnd.random() < 0.85 else None
+        schedule_mask = rnd.randint(0, 63) if rnd.random() < 0.8 else None
+        profiles.append(MatchFeatures(frozenset(interests), specialization, schedule_mask))
+    return profiles
+
+
+def top_k(candidate_ids, profiles, current, query_id, k):
+    """Best k (tier, -compatibility, user_id) keys among the candidates, as score_candidates ranks them"""
+    candidate_ids = [user_id for user_id in candidate_ids if user_id != query_id]
+    if not candidate_ids:
+        return []
+    matrix = CandidateMatrix.from_features(candidate_ids, [profiles[user_id] for user_id in candidate_ids])
+    compatibility, tier = matrix.score(current)
+    keep = tier != NO_TIER
+    keys = np.lexsort((matrix.user_ids[keep], -compatibility[keep], tier[keep]))[:k]
+    return matrix.user_ids[keep][keys].tolist()
+
+
+def run_queries(profiles, queries, k, candidates_for):
+    """(mean latency in ms, mean candidate count, rankings) over the query ids"""
+    elapsed = 0.0
+    candidate_count = 0
+    rankings = []
+    for query_id in queries:
+        start = time.perf_counter()
+        candidate_ids = candidates_for(query_id)
+        rankings.append(top_k(candidate_ids, profiles, profiles[query_id], query_id, k))
+        elapsed += time.perf_counter() - start
+        candidate_count += len(candidate_ids)
+    return elapsed / len(queries) * 1000, candidate_count / len(queries), rankings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--configs", nargs="+", default=["8x4", "16x2", "32x2", "16x4"],
+                        help="LSH banding as BANDSxROWS")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    profiles = random_profiles(args.size, rnd)
+    queries = rnd.sample(range(args.size), min(args.queries, args.size))
+
+    index = CandidateIndex()
+    index.build(enumerate(profiles))
+    exact_ms, exact_candidates, exact = run_queries(
+        profiles, queries, args.top_k, lambda query_id: index.candidates(profiles[query_id])
+    )
+    print(f"{args.size} profiles, {len(queries)} queries, recall@{args.top_k} against the exact candidate index")
+    print(f"  exact   | {exact_candidates:9.0f} candidates | {exact_ms:8.2f} ms/query | recall 1.000")
+
+    for config in args.configs:
+        bands, rows = (int(part) for part in config.lower().split("x"))
+        lsh = InterestLSH(bands, rows)
+        build_start = time.perf_counter()
+        signatures = [lsh.signature(features.interests) for features in profiles]
+        lsh.build(enumerate(signatures))
+        build_time = time.perf_counter() - build_start
+
+        def lsh_candidates(query_id):
+            features = profiles[query_id]
+            return index.specialization_candidates(features.specialization) | lsh.candidates(signatures[query_id])
+
+        lsh_ms, lsh_candidates_mean, approximate = run_queries(profiles, queries, args.top_k, lsh_candidates)
+        found = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+        expected = sum(len(e) for e in exact)
+        recall = found / expected if expected else 1.0
+        print(f"  {bands:>3}x{rows:<3} | {lsh_candidates_mean:9.0f} candidates | {lsh_ms:8.2f} ms/query | "
+              f"recall {recall:.3f} | index build {build_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,31 @@ class Config:
     MAX_MESSAGES_PER_CONVERSATION = int(
         os.getenv("MAX_MESSAGES_PER_CONVERSATION", 5000))
 
+    # Matching
+    CANDIDATE_INDEX_TTL = int(os.getenv("CANDIDATE_INDEX_TTL", 300))  # seconds before the in-memory index is reloaded
+    COMPATIBILITY_CACHE_SIZE = int(os.getenv("COMPATIBILITY_CACHE_SIZE", 50000))  # memoized profile pairs
+    MATCHING_CANDIDATE_MODE = os.getenv("MATCHING_CANDIDATE_MODE", "exact")  # "exact" or "lsh" (approximate)
+    LSH_BANDS = int(os.getenv("LSH_BANDS", 32))  # MinHash bands, more bands = higher recall
+    LSH_ROWS = int(os.getenv("LSH_ROWS", 2))  # MinHash values per band, more rows = stricter buckets
+    PROFILE_SNAPSHOT_PATH = os.getenv("PROFILE_SNAPSHOT_PATH")  # default: instance/profile_snapshot.bin
+    PROFILE_SNAPSHOT_MAX_CHANGES = int(os.getenv("PROFILE_SNAPSHOT_MAX_CHANGES", 1000))  # profile writes before a rewrite
+    RECOMMENDATIONS_PER_TIER = int(os.getenv("RECOMMENDATIONS_PER_TIER", 100))  # stored candidates per user and tier
+    TEXT_INDEX_COMPACT_AFTER = int(os.getenv("TEXT_INDEX_COMPACT_AFTER", 256))  # edited profiles before re-weighting
+
+    # Buddy connection graph cache
+    CONNECTION_CACHE_SIZE = int(os.getenv("CONNECTION_CACHE_SIZE", 10000))  # users kept in memory
+    CONNECTION_CACHE_TTL = int(os.getenv("CONNECTION_CACHE_TTL", 60))  # seconds before a user's edges are reloaded
+    FRIENDS_OF_FRIENDS_CACHE_SIZE = int(os.getenv("FRIENDS_OF_FRIENDS_CACHE_SIZE", 10000))  # users with cached results
+    FRIENDS_OF_FRIENDS_TTL = int(os.getenv("FRIENDS_OF_FRIENDS_TTL", 300))  # seconds before the adjacency is reloaded
+    NETWORK_REBUILD_INTERVAL = int(os.getenv("NETWORK_REBUILD_INTERVAL", 3600))  # seconds between full cluster rebuilds
+
+    # Realtime events
+    EVENT_BROKER_URL = os.getenv("EVENT_BROKER_URL", "local")  # "local", redis:// or postgresql://, shared by workers
+    EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", 100))  # recent events kept per user for reconnects
+    EVENTS_KEEPALIVE_SECONDS = int(os.getenv("EVENTS_KEEPALIVE_SECONDS", 15))  # idle time before an SSE keepalive
+    EVENTS_LONG_POLL_TIMEOUT = int(os.getenv("EVENTS_LONG_POLL_TIMEOUT", 25))  # longest wait of /api/events/poll
+    EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", 3000))  # EventSource reconnect delay
+
     # Mail (✅ pulled from env)
     MAIL_SERVER = "smtp.gmail.com"
     MAIL_PORT = 587
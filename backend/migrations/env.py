@@ -45,6 +45,9 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+SEARCH_OBJECT_PREFIXES = ("profiles_fts", "ix_profiles_search")
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -90,9 +93,18 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # full-text search tables and indexes are created by hand in migrations,
+    # keep autogenerate from dropping them because no model declares them
+    def include_object(object, name, type_, reflected, compare_to):
+        if reflected and compare_to is None and name and name.startswith(SEARCH_OBJECT_PREFIXES):
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,67 @@
+"""Add pre-normalized matching features to profiles
+
+Revision ID: 3f9c2a7d81b4
+Revises: 53432d5e6004
+Create Date: 2025-09-08 10:12:41.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d81b4'
+down_revision = '53432d5e6004'
+branch_labels = None
+depends_on = None
+
+SCHEDULE_INDICATORS = ("weekday", "weekend", "morning", "afternoon", "evening", "night")
+
+
+def _features(interests, specialization, schedule):
+    interest_keys = ",".join(sorted({i.strip().lower() for i in (interests or "").split(',') if i.strip()}))
+    specialization_key = specialization.strip().lower() if specialization and specialization.strip() else None
+    schedule_mask = None
+    if schedule:
+        schedule = schedule.lower()
+        schedule_mask = sum(1 << bit for bit, word in enumerate(SCHEDULE_INDICATORS) if word in schedule)
+    return interest_keys, specialization_key, schedule_mask
+
+
+def upgrade():
+    with op.batch_alter_table('profiles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('interest_keys', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('specialization_key', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('schedule_mask', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_profiles_specialization_key'), ['specialization_key'], unique=False)
+
+    # Backfill features for existing profiles
+    profiles = sa.table(
+        'profiles',
+        sa.column('id', sa.Integer),
+        sa.column('interests', sa.String),
+        sa.column('specialization', sa.String),
+        sa.column('schedule', sa.String),
+        sa.column('interest_keys', sa.Text),
+        sa.column('specialization_key', sa.String),
+        sa.column('schedule_mask', sa.Integer),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(profiles.c.id, profiles.c.interests, profiles.c.specialization, profiles.c.schedule)).fetchall()
+    for row in rows:
+        interest_keys, specialization_key, schedule_mask = _features(row.interests, row.specialization, row.schedule)
+        conn.execute(
+            profiles.update().where(profiles.c.id == row.id).values(
+                interest_keys=interest_keys,
+                specialization_key=specialization_key,
+                schedule_mask=schedule_mask,
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('profiles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_profiles_specialization_key'))
+        batch_op.drop_column('schedule_mask')
+        batch_op.drop_column('specialization_key')
+        batch_op.drop_column('interest_keys')
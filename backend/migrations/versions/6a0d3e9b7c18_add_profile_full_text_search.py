@@ -0,0 +1,74 @@
+"""Add profile full-text search
+
+Revision ID: 6a0d3e9b7c18
+Revises: f2a84c6e1b95
+Create Date: 2025-09-14 11:05:52.371940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0d3e9b7c18'
+down_revision = 'f2a84c6e1b95'
+branch_labels = None
+depends_on = None
+
+# Must stay identical to services.search.POSTGRES_DOCUMENT for the index to be used
+POSTGRES_DOCUMENT = (
+    "to_tsvector('english', coalesce(bio, '') || ' ' || coalesce(interests, '') || ' ' || "
+    "coalesce(specialization, '') || ' ' || coalesce(schedule, ''))"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        # External-content FTS5 index over profiles, kept in sync by triggers.
+        # Note: recreating `profiles` (batch "move and copy") drops these triggers.
+        op.execute("""
+            CREATE VIRTUAL TABLE profiles_fts USING fts5(
+                bio, interests, specialization, schedule,
+                content='profiles', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER profiles_fts_insert AFTER INSERT ON profiles BEGIN
+                INSERT INTO profiles_fts(rowid, bio, interests, specialization, schedule)
+                VALUES (new.id, new.bio, new.interests, new.specialization, new.schedule);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER profiles_fts_delete AFTER DELETE ON profiles BEGIN
+                INSERT INTO profiles_fts(profiles_fts, rowid, bio, interests, specialization, schedule)
+                VALUES ('delete', old.id, old.bio, old.interests, old.specialization, old.schedule);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER profiles_fts_update AFTER UPDATE OF bio, interests, specialization, schedule ON profiles BEGIN
+                INSERT INTO profiles_fts(profiles_fts, rowid, bio, interests, specialization, schedule)
+                VALUES ('delete', old.id, old.bio, old.interests, old.specialization, old.schedule);
+                INSERT INTO profiles_fts(rowid, bio, interests, specialization, schedule)
+                VALUES (new.id, new.bio, new.interests, new.specialization, new.schedule);
+            END
+        """)
+        op.execute("INSERT INTO profiles_fts(profiles_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        # An expression index is maintained by Postgres itself, no trigger needed
+        op.execute(f"CREATE INDEX ix_profiles_search ON profiles USING GIN ({POSTGRES_DOCUMENT})")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS profiles_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS profiles_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS profiles_fts_insert")
+        op.execute("DROP TABLE IF EXISTS profiles_fts")
+
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_profiles_search")
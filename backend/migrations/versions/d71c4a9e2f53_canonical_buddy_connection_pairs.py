@@ -0,0 +1,134 @@
+"""Canonical buddy connection pairs
+
+Revision ID: d71c4a9e2f53
+Revises: b93f1d5c2e60
+Create Date: 2025-09-17 14:22:05.318847
+
+Keys every connection by (low_id, high_id) so a pair has one row whichever
+user sent the request. Where both A->B and B->A rows exist the one that got
+furthest is kept (approved, then pending, then rejected; oldest first).
+Rows of the unused buddy_relationships table are folded in for pairs that
+have no connection yet, and the table is dropped.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd71c4a9e2f53'
+down_revision = 'b93f1d5c2e60'
+branch_labels = None
+depends_on = None
+
+STATUS_RANK = {'approved': 0, 'pending': 1, 'rejected': 2}
+RELATIONSHIP_STATUS = {'accepted': 'approved', 'pending': 'pending', 'rejected': 'rejected'}
+
+
+def upgrade():
+    with op.batch_alter_table('buddy_connections', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('low_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('high_id', sa.Integer(), nullable=True))
+
+    buddy_connections = sa.table(
+        'buddy_connections',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('buddy_id', sa.Integer),
+        sa.column('low_id', sa.Integer),
+        sa.column('high_id', sa.Integer),
+        sa.column('status', sa.String),
+        sa.column('created_at', sa.DateTime),
+    )
+    buddy_relationships = sa.table(
+        'buddy_relationships',
+        sa.column('id', sa.Integer),
+        sa.column('user1_id', sa.Integer),
+        sa.column('user2_id', sa.Integer),
+        sa.column('status', sa.String),
+        sa.column('created_at', sa.DateTime),
+    )
+    conn = op.get_bind()
+
+    # Self connections cannot be expressed as a pair
+    conn.execute(buddy_connections.delete().where(buddy_connections.c.user_id == buddy_connections.c.buddy_id))
+
+    first_is_low = buddy_connections.c.user_id < buddy_connections.c.buddy_id
+    conn.execute(buddy_connections.update().values(
+        low_id=sa.case((first_is_low, buddy_connections.c.user_id), else_=buddy_connections.c.buddy_id),
+        high_id=sa.case((first_is_low, buddy_connections.c.buddy_id), else_=buddy_connections.c.user_id),
+    ))
+
+    # Keep one row per pair
+    rows = conn.execute(sa.select(
+        buddy_connections.c.id, buddy_connections.c.low_id, buddy_connections.c.high_id,
+        buddy_connections.c.status
+    ).order_by(buddy_connections.c.id)).fetchall()
+    kept = {}
+    duplicates = []
+    for row in rows:
+        pair = (row.low_id, row.high_id)
+        current = kept.get(pair)
+        if current is None:
+            kept[pair] = row
+        elif STATUS_RANK.get(row.status, 3) < STATUS_RANK.get(current.status, 3):
+            duplicates.append(current.id)
+            kept[pair] = row
+        else:
+            duplicates.append(row.id)
+    if duplicates:
+        conn.execute(buddy_connections.delete().where(buddy_connections.c.id.in_(duplicates)))
+
+    # Fold in buddy_relationships
+    relationships = conn.execute(sa.select(
+        buddy_relationships.c.user1_id, buddy_relationships.c.user2_id,
+        buddy_relationships.c.status, buddy_relationships.c.created_at
+    ).order_by(buddy_relationships.c.id)).fetchall()
+    for row in relationships:
+        pair = tuple(sorted((row.user1_id, row.user2_id)))
+        if pair[0] == pair[1] or pair in kept:
+            continue
+        kept[pair] = row
+        conn.execute(buddy_connections.insert().values(
+            user_id=row.user1_id,
+            buddy_id=row.user2_id,
+            low_id=pair[0],
+            high_id=pair[1],
+            status=RELATIONSHIP_STATUS.get(row.status, 'pending'),
+            created_at=row.created_at,
+        ))
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('buddy_connections', schema=None) as batch_op:
+        batch_op.alter_column('low_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('high_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_constraint('unique_connection', type_='unique')
+        batch_op.create_unique_constraint('unique_connection_pair', ['low_id', 'high_id'])
+        batch_op.create_check_constraint('ck_connection_pair_order', 'low_id < high_id')
+        batch_op.create_index(batch_op.f('ix_buddy_connections_high_id'), ['high_id'], unique=False)
+
+    op.drop_table('buddy_relationships')
+    # ### end Alembic commands ###
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('buddy_relationships',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user1_id', sa.Integer(), nullable=False),
+    sa.Column('user2_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user1_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user2_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('buddy_connections', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_buddy_connections_high_id'))
+        batch_op.drop_constraint('ck_connection_pair_order', type_='check')
+        batch_op.drop_constraint('unique_connection_pair', type_='unique')
+        batch_op.create_unique_constraint('unique_connection', ['user_id', 'buddy_id'])
+        batch_op.drop_column('high_id')
+        batch_op.drop_column('low_id')
+
+    # ### end Alembic commands ###
@@ -43,7 +43,7 @@ class User(db.Model, UserMixin):
     def get_connections(self):
         from models import BuddyConnection
         return BuddyConnection.query.filter(
-            ((BuddyConnection.user_id == self.id) | (BuddyConnection.buddy_id == self.id)) &
+            ((BuddyConnection.low_id == self.id) | (BuddyConnection.high_id == self.id)) &
             (BuddyConnection.status == 'approved')
         ).all()
     
@@ -57,6 +57,38 @@ class User(db.Model, UserMixin):
         return f'<User {self.username}>'
 
 
+# Canonical interests of each profile, kept in sync by services.matching.refresh_profile_features
+profile_interests = db.Table(
+    'profile_interests',
+    db.Column('profile_id', db.Integer, db.ForeignKey('profiles.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('interest_id', db.Integer, db.ForeignKey('interests.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_profile_interests_interest_id', 'interest_id')
+)
+
+
+class Interest(db.Model):
+    __tablename__ = 'interests'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), unique=True, nullable=False)  # canonical lowercase name
+
+    aliases = db.relationship('InterestAlias', backref='interest', lazy='dynamic', cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<Interest {self.name}>'
+
+
+class InterestAlias(db.Model):
+    __tablename__ = 'interest_aliases'
+
+    id = db.Column(db.Integer, primary_key=True)
+    alias = db.Column(db.String(200), unique=True, nullable=False)  # lowercase spelling folded into the interest
+    interest_id = db.Column(db.Integer, db.ForeignKey('interests.id'), nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<InterestAlias {self.alias}>'
+
+
 class Profile(db.Model):
     __tablename__ = 'profiles'
     
@@ -69,24 +101,68 @@ class Profile(db.Model):
     schedule = db.Column(db.String(100))
     profile_picture = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Pre-normalized matching features, kept in sync by services.matching.refresh_profile_features
+    interest_keys = db.Column(db.Text)  # sorted lowercase interest tokens, comma separated
+    specialization_key = db.Column(db.String(100), index=True)
+    schedule_mask = db.Column(db.Integer)  # one bit per schedule indicator, NULL when no schedule
+    interest_signature = db.Column(db.LargeBinary)  # MinHash of interest_keys, see services.lsh
+    availability = db.Column(db.LargeBinary)  # 7x48 half-hour weekly grid, see services.availability
+    recommendations_refreshed_at = db.Column(db.DateTime)  # last full refresh of buddy_recommendations rows
+
+    interest_tags = db.relationship('Interest', secondary=profile_interests, backref=db.backref('profiles', lazy='dynamic'))
 
     def __repr__(self):
         return f'<Profile {self.user.username}>'
 
+
+# A profile whose matching features changed or that was deleted, see services.profile_snapshot
+class ProfileChange(db.Model):
+    __tablename__ = 'profile_changes'
+
+    id = db.Column(db.Integer, primary_key=True)  # never reused, snapshots record the last id they cover
+    user_id = db.Column(db.Integer, nullable=False)  # no foreign key, deleted users are logged too
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self):
+        return f'<ProfileChange {self.id}: User {self.user_id}>'
+
 class BuddyConnection(db.Model):
     __tablename__ = 'buddy_connections'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    buddy_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # initiator of the request
+    buddy_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # receiver of the request
+    # Canonical pair key, the smaller and larger of the two user ids
+    low_id = db.Column(db.Integer, nullable=False)
+    high_id = db.Column(db.Integer, nullable=False, index=True)
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (
-        db.UniqueConstraint('user_id', 'buddy_id', name='unique_connection'),
+        db.UniqueConstraint('low_id', 'high_id', name='unique_connection_pair'),
+        db.CheckConstraint('low_id < high_id', name='ck_connection_pair_order'),
     )
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.low_id, self.high_id = self.pair_key(self.user_id, self.buddy_id)
+
+    @staticmethod
+    def pair_key(user_id, other_id):
+        return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+    @classmethod
+    def between(cls, user_id, other_id):
+        """Query for the connection between two users, in either direction"""
+        low_id, high_id = cls.pair_key(user_id, other_id)
+        return cls.query.filter(cls.low_id == low_id, cls.high_id == high_id)
+
     def approve(self):
         self.status = 'approved'
         return self
@@ -98,6 +174,24 @@ class BuddyConnection(db.Model):
     def __repr__(self):
         return f'<Connection {self.user_id}-{self.buddy_id}: {self.status}>'
 
+class BuddyRecommendation(db.Model):
+    __tablename__ = 'buddy_recommendations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    tier = db.Column(db.SmallInteger, nullable=False)  # 0 specialization, 1 interests, 2 schedule
+    score = db.Column(db.Integer, nullable=False)  # compatibility 0-100
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'candidate_id', name='unique_recommendation'),
+        db.Index('ix_buddy_recommendations_ranking', 'user_id', 'tier', 'score', 'candidate_id'),
+        db.Index('ix_buddy_recommendations_candidate_id', 'candidate_id'),
+    )
+
+    def __repr__(self):
+        return f'<Recommendation {self.candidate_id} for User {self.user_id}: tier {self.tier}, {self.score}>'
+
 class Activity(db.Model):
     __tablename__ = 'activities'
     
@@ -195,34 +289,25 @@ class Notification(db.Model):
         self.data = json.dumps(data_dict)
 
 
-class BuddyRelationship(db.Model):
-    __tablename__ = 'buddy_relationships'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    user1_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    user2_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    status = db.Column(db.String(20), default='pending')  # pending, accepted, rejected
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    # Relationships
-    user1 = db.relationship('User', foreign_keys=[user1_id], backref='initiated_buddies')
-    user2 = db.relationship('User', foreign_keys=[user2_id], backref='received_buddies')
-    
-    @staticmethod
-    def get_buddies(user_id):
-        return BuddyRelationship.query.filter(
-            ((BuddyRelationship.user1_id == user_id) | (BuddyRelationship.user2_id == user_id)) &
-            (BuddyRelationship.status == 'accepted')
-        ).all()
-
 class Conversation(db.Model):
     __tablename__ = 'conversations'
     
     id = db.Column(db.Integer, primary_key=True)
-    user1_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    user2_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user1_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # smaller user id of the pair
+    user2_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # larger user id of the pair
     last_activity = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Read model maintained by services.conversations as messages are sent
+    last_message_id = db.Column(db.Integer)  # no foreign key, retention may delete the message
+    # Read watermarks: messages from the other user up to this id have been read
+    user1_last_read_id = db.Column(db.Integer, nullable=False, default=0)
+    user2_last_read_id = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user1_id', 'user2_id', name='unique_conversation_pair'),
+        db.Index('ix_conversations_user1_activity', 'user1_id', 'last_activity'),
+        db.Index('ix_conversations_user2_activity', 'user2_id', 'last_activity'),
+    )
     
     # Relationships - Use back_populates instead of backref
     user1 = db.relationship('User', foreign_keys=[user1_id])
@@ -243,10 +328,16 @@ class Message(db.Model):
     
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    read = db.Column(db.Boolean, default=False)
     message_type = db.Column(db.String(20), default='text')
     expires_at = db.Column(db.DateTime)
     
+    __table_args__ = (
+        # One direction of a conversation in id order, see services.message_history
+        db.Index('ix_messages_pair', 'sender_id', 'receiver_id', 'id'),
+        # Read watermarks and last_message_id compare ids, a deleted id must never come back
+        {'sqlite_autoincrement': True},
+    )
+    
     # Relationships - Use back_populates instead of backref
     sender = db.relationship('User', foreign_keys=[sender_id])
     receiver = db.relationship('User', foreign_keys=[receiver_id])
@@ -6,6 +6,9 @@ from .buddies import buddies_bp
 from .challenges import challenges_bp
 from .activities import activities_bp
 from .personalized_challenges import personalized_challenges_bp
+from .users import users_bp
+from .groups import groups_bp
+from .events import events_bp
 
 __all__ = [
     'auth_bp',
@@ -14,5 +17,8 @@ __all__ = [
     'buddies_bp',
     'challenges_bp',
     'activities_bp',
-    'personalized_challenges_bp'
+    'personalized_challenges_bp',
+    'users_bp',
+    'groups_bp',
+    'events_bp'
 ]
\ No newline at end of file
@@ -3,6 +3,17 @@ from flask_login import login_user, logout_user, current_user, login_required
 from models import User, BuddyConnection, Challenge, StudyGroup, Activity
 from extensions import db, bcrypt
 from sqlalchemy import func, and_, or_
+from services.candidate_index import candidate_index
+from services.lsh import interest_lsh
+from services.connections import connection_graph
+from services.matching import compatibility_cache
+from services.recommendations import remove_recommendation_pair, remove_user_recommendations
+from services.profile_snapshot import profile_snapshot
+from services.social_graph import friends_of_friends
+from services.text_similarity import text_index
+from services.user_directory import username_index
+from services.network_clusters import study_network
+from services.events import event_hub
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
@@ -102,6 +113,46 @@ def admin_stats():
     except Exception as e:
         return jsonify({'error': 'Failed to fetch stats'}), 500
 
+# ---------------- Study Network Clusters ----------------
+@admin_bp.route('/network-clusters', methods=['GET', 'OPTIONS'])
+@login_required
+def network_clusters():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+        
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        # Components of the approved buddy graph, from the incremental union-find
+        return jsonify(study_network.stats()), 200
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch network clusters'}), 500
+
+# ---------------- Matching Cache Stats ----------------
+@admin_bp.route('/cache-stats', methods=['GET', 'OPTIONS'])
+@login_required
+def cache_stats():
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+        
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Per-process numbers, each worker keeps its own caches
+    return jsonify({
+        'compatibility': compatibility_cache.stats(),
+        'connectionGraph': {
+            'users': len(connection_graph.entries),
+            'maxUsers': connection_graph.max_users
+        },
+        'friendsOfFriends': {
+            'users': len(friends_of_friends.adjacency),
+            'cachedResults': len(friends_of_friends.results)
+        },
+        'events': event_hub.stats()
+    }), 200
+
 # ---------------- Get All Users ----------------
 @admin_bp.route('/users', methods=['GET', 'OPTIONS'])
 @login_required
@@ -204,7 +255,17 @@ def delete_user(user_id):
             return jsonify({'error': 'Cannot delete your own account'}), 400
         
         db.session.delete(user)
+        profile_snapshot.record_change(user_id)
+        remove_user_recommendations(user_id)
         db.session.commit()
+        profile_snapshot.refresh_if_stale()
+        candidate_index.remove(user_id)
+        interest_lsh.remove(user_id)
+        text_index.remove(user_id)
+        username_index.remove(user_id)
+        connection_graph.remove_user(user_id)
+        friends_of_friends.remove_user(user_id)
+        study_network.mark_stale()
         
         return jsonify({'message': 'User deleted successfully'}), 200
         
@@ -237,6 +298,10 @@ def toggle_user_status(user_id):
         
         user.is_active = (new_status == 'active')
         db.session.commit()
+        if user.is_active:
+            username_index.add(user.id, user.username)
+        else:
+            username_index.remove(user.id)
         
         return jsonify({'message': f'User status updated to {new_status}'}), 200
         
@@ -257,7 +322,11 @@ def approve_request(request_id):
     try:
         connection = BuddyConnection.query.get_or_404(request_id)
         connection.status = 'approved'
+        remove_recommendation_pair(connection.user_id, connection.buddy_id)
         db.session.commit()
+        connection_graph.set_edge(connection.user_id, connection.buddy_id, 'approved')
+        friends_of_friends.add_edge(connection.user_id, connection.buddy_id)
+        study_network.connect(connection.user_id, connection.buddy_id)
         
         return jsonify({'message': 'Request approved successfully'}), 200
         
@@ -277,8 +346,14 @@ def reject_request(request_id):
     
     try:
         connection = BuddyConnection.query.get_or_404(request_id)
+        was_approved = connection.status == 'approved'
         connection.status = 'rejected'
+        remove_recommendation_pair(connection.user_id, connection.buddy_id)
         db.session.commit()
+        connection_graph.set_edge(connection.user_id, connection.buddy_id, 'rejected')
+        friends_of_friends.remove_edge(connection.user_id, connection.buddy_id)
+        if was_approved:
+            study_network.mark_stale()
         
         return jsonify({'message': 'Request rejected successfully'}), 200
         
@@ -9,6 +9,8 @@ import string
 import re
 from models import User, Profile
 from extensions import db, bcrypt, mail
+from services.user_directory import username_index
+from services.network_clusters import study_network
 
 auth_bp = Blueprint("auth", __name__)
 logger = logging.getLogger(__name__)
@@ -86,6 +88,8 @@ def signup():
 
         db.session.add(new_user)
         db.session.commit()
+        username_index.add(new_user.id, new_user.username)
+        study_network.add_user(new_user.id)
 
         # Best-effort welcome email
         try:
@@ -7,89 +7,23 @@ from flask import current_app
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import or_, and_
 from datetime import datetime
+from services.matching import calculate_compatibility, profile_features, split_interests
+from services.batch_matching import CandidateMatrix
+from services.connections import connection_status_map, connection_graph
+from services.recommendations import (
+    rank_recommendations, encode_cursor, decode_cursor, remove_recommendation_pair, restore_recommendation_pair,
+    FRIENDS_OF_FRIENDS_TIER
+)
+from services.social_graph import friends_of_friends
+from services.text_similarity import text_index
+from services.search import search_profiles
+from services.network_clusters import study_network
+from services.availability import common_slots
+from services.events import event_hub, publish_notification
 import json  
 
 buddies_bp = Blueprint("buddies", __name__, url_prefix="/api/buddies")
 
-def calculate_compatibility(profile1, profile2):
-    """
-    Calculate compatibility score between two profiles
-    """
-    score = 0
-    max_score = 100
-    
-    # Check interests (40% of score)
-    if profile1.interests and profile2.interests:
-        # Handle both string and list formats for interests
-        if isinstance(profile1.interests, str):
-            interests1 = set([i.strip().lower() for i in profile1.interests.split(',')])
-        else:
-            interests1 = set([i.strip().lower() for i in profile1.interests])
-            
-        if isinstance(profile2.interests, str):
-            interests2 = set([i.strip().lower() for i in profile2.interests.split(',')])
-        else:
-            interests2 = set([i.strip().lower() for i in profile2.interests])
-        
-        if interests1 and interests2:
-            common_interests = interests1.intersection(interests2)
-            interest_score = (len(common_interests) / max(len(interests1), len(interests2))) * 40
-            score += interest_score
-    elif not profile1.interests and not profile2.interests:
-        # Both have no interests specified - give partial score
-        score += 20
-    
-    # Check specialization (30% of score)
-    if profile1.specialization and profile2.specialization:
-        if profile1.specialization.lower() == profile2.specialization.lower():
-            score += 30
-    elif not profile1.specialization and not profile2.specialization:
-        # Both have no specialization specified - give partial score
-        score += 15
-    
-    # Check schedule (30% of score)
-    if profile1.schedule and profile2.schedule:
-        schedule1 = profile1.schedule.lower()
-        schedule2 = profile2.schedule.lower()
-        
-        common_indicators = ["weekday", "weekend", "morning", "afternoon", "evening", "night"]
-        matches = sum(1 for indicator in common_indicators if indicator in schedule1 and indicator in schedule2)
-        
-        schedule_score = (matches / len(common_indicators)) * 30
-        score += schedule_score
-    elif not profile1.schedule and not profile2.schedule:
-        # Both have no schedule specified - give partial score
-        score += 15
-    
-    return min(round(score), 100)
-
-def check_connection_status(user_id, buddy_id):
-    """
-    Check the connection status between two users
-    """
-    connection = BuddyConnection.query.filter(
-        or_(
-            and_(
-                BuddyConnection.user_id == user_id,
-                BuddyConnection.buddy_id == buddy_id
-            ),
-            and_(
-                BuddyConnection.user_id == buddy_id,
-                BuddyConnection.buddy_id == user_id
-            )
-        )
-    ).first()
-    
-    if connection:
-        if connection.status == "approved":
-            return "connected"
-        elif connection.user_id == user_id:
-            return "request_sent"
-        else:
-            return "request_received"
-    
-    return "not_connected"
-
 def create_connection_notification(sender_id, receiver_id):
     """
     Create a notification for a connection request
@@ -124,6 +58,78 @@ def create_connection_notification(sender_id, receiver_id):
         print(f"Error creating notification: {str(e)}")
         return None
 
+def load_users_with_profiles(user_ids):
+    """Load users and their profiles in one query, keyed by id"""
+    if not user_ids:
+        return {}
+    users = User.query.filter(User.id.in_(user_ids)).options(joinedload(User.profile)).all()
+    return {user.id: user for user in users}
+
+def serialize_buddy(user, compatibility, connection_status):
+    return {
+        "id": user.id,
+        "userId": user.id,
+        "username": user.username,
+        "email": user.email,
+        "avatar": user.avatar,
+        "specialization": user.profile.specialization,
+        "level": user.profile.level if user.profile.level else "Beginner",
+        "interests": split_interests(user.profile),
+        "schedule": user.profile.schedule,
+        "compatibility": compatibility,
+        "connection_status": connection_status
+    }
+
+def serialize_connected_buddies(buddy_ids, users):
+    """Approved buddies with their compatibility to the current user"""
+    response_data = []
+    for buddy_id in buddy_ids:
+        buddy = users.get(buddy_id)
+        if buddy and buddy.profile:
+            compatibility = calculate_compatibility(current_user.profile, buddy.profile) if current_user.profile else 0
+            response_data.append(serialize_buddy(buddy, compatibility, "connected"))
+    return response_data
+
+def serialize_connection_requests(requests, users):
+    """Pending requests received by the current user"""
+    response_data = []
+    for req in requests:
+        sender = users.get(req.user_id)
+        if sender and sender.profile:
+            response_data.append({
+                "id": req.id,
+                "user_id": sender.id,
+                "username": sender.username,
+                "avatar": sender.avatar,
+                "specialization": sender.profile.specialization,
+                "message": "Wants to connect with you",
+                "timestamp": req.created_at.isoformat() if req.created_at else datetime.utcnow().isoformat()
+            })
+    return response_data
+
+def serialize_recommendations(keys, users, statuses):
+    """Ranked recommendation keys (tier, -score, user_id) as buddy cards"""
+    mutual_counts = friends_of_friends.mutual_counts(current_user.id)
+    response_data = []
+    for tier, negative_score, user_id in keys:
+        user = users.get(user_id)
+        if user and user.profile:
+            # Friends of friends are ranked by mutual connections, not compatibility
+            if tier == FRIENDS_OF_FRIENDS_TIER:
+                compatibility = calculate_compatibility(current_user.profile, user.profile)
+            else:
+                compatibility = -negative_score
+            buddy = serialize_buddy(user, compatibility, statuses.get(user.id, "not_connected"))
+            buddy["mutual_connections"] = mutual_counts.get(user.id, 0)
+            response_data.append(buddy)
+    return response_data
+
+def pending_requests_query():
+    return BuddyConnection.query.filter(
+        BuddyConnection.buddy_id == current_user.id,
+        BuddyConnection.status == "pending"
+    )
+
 @buddies_bp.route("/", methods=["GET"])
 @login_required
 def get_all_buddies():
@@ -131,14 +137,22 @@ def get_all_buddies():
     Get all buddies (connected, pending, recommended) for the current user
     """
     try:
-        # Get connected buddies
-        connected_buddies = get_connected_buddies().get_json()
-        
-        # Get pending requests
-        pending_requests = get_connection_requests().get_json()
+        # Load the user's edges, requests and recommendations once
+        statuses = connection_status_map(current_user.id)
+        buddy_ids = connection_graph.connected_ids(current_user.id)
+        requests = pending_requests_query().all()
+        keys = []
+        if current_user.profile:
+            keys, _ = rank_recommendations(current_user.profile)
+        
+        # Every user shown in any section comes from a single query
+        users = load_users_with_profiles(
+            set(buddy_ids) | {req.user_id for req in requests} | {user_id for _, _, user_id in keys}
+        )
         
-        # Get recommended buddies
-        recommended = get_recommended_buddies().get_json()
+        connected_buddies = serialize_connected_buddies(buddy_ids, users)
+        pending_requests = serialize_connection_requests(requests, users)
+        recommended = serialize_recommendations(keys, users, statuses)
         
         return jsonify({
             "connected": connected_buddies,
@@ -156,7 +170,11 @@ def get_all_buddies():
 @login_required
 def get_recommended_buddies():
     """
-    Get recommended study buddies with priority: specialization > interests > schedule
+    Get recommended study buddies with priority: specialization > interests > schedule,
+    then friends of friends by mutual connections
+
+    Optional `limit` returns only the best page, with an `X-Next-Cursor` response
+    header to pass back as `cursor` for the next one
     """
     try:
         # Get current user's profile
@@ -164,113 +182,31 @@ def get_recommended_buddies():
         if not current_profile:
             return jsonify({"error": "Profile not found"}), 404
         
-        # Get all users except current user and existing connections
-        existing_connections = BuddyConnection.query.filter(
-            or_(
-                BuddyConnection.user_id == current_user.id,
-                BuddyConnection.buddy_id == current_user.id
-            )
-        ).all()
+        # Optional page size and opaque cursor from a previous page
+        limit = request.args.get("limit", type=int)
+        if limit is not None:
+            limit = max(1, min(limit, 100))
         
-        # Get IDs of users we're already connected with or have pending requests with
-        excluded_user_ids = {current_user.id}
-        for conn in existing_connections:
-            if conn.user_id == current_user.id:
-                excluded_user_ids.add(conn.buddy_id)
-            else:
-                excluded_user_ids.add(conn.user_id)
+        after = None
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                after = decode_cursor(cursor)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor"}), 400
         
-        # Get all potential buddies (users with profiles, excluding current user and existing connections)
-        potential_buddies = User.query.filter(
-            User.id != current_user.id,
-            User.id.notin_(excluded_user_ids),
-            User.profile != None
-        ).options(joinedload(User.profile)).all()
+        # Priority: specialization > interests > schedule > friends of friends
+        keys, has_more = rank_recommendations(current_profile, limit=limit, after=after)
         
-        # Categorize buddies by priority
-        specialization_matches = []  # Highest priority
-        interest_matches = []        # Medium priority
-        schedule_matches = []        # Lower priority
-        
-        for user in potential_buddies:
-            if user.profile:
-                # Calculate compatibility score
-                compatibility = calculate_compatibility(current_profile, user.profile)
-                
-                # Handle interests format
-                interests = []
-                if user.profile.interests:
-                    if isinstance(user.profile.interests, str):
-                        interests = [i.strip() for i in user.profile.interests.split(',')]
-                    else:
-                        interests = user.profile.interests
-                
-                buddy_data = {
-                    "id": user.id,
-                    "userId": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "avatar": user.avatar,
-                    "specialization": user.profile.specialization,
-                    "level": user.profile.level if user.profile.level else "Beginner",
-                    "interests": interests,
-                    "schedule": user.profile.schedule,
-                    "compatibility": compatibility,
-                    "connection_status": check_connection_status(current_user.id, user.id)
-                }
-                
-                # Check for same specialization (highest priority)
-                has_same_specialization = (
-                    current_profile.specialization and 
-                    user.profile.specialization and
-                    current_profile.specialization.lower() == user.profile.specialization.lower()
-                )
-                
-                # Check for common interests (medium priority)
-                common_interests = False
-                if current_profile.interests and user.profile.interests:
-                    # Handle both string and list formats for interests
-                    if isinstance(current_profile.interests, str):
-                        current_interests = set([i.strip().lower() for i in current_profile.interests.split(',')])
-                    else:
-                        current_interests = set([i.strip().lower() for i in current_profile.interests])
-                        
-                    if isinstance(user.profile.interests, str):
-                        buddy_interests = set([i.strip().lower() for i in user.profile.interests.split(',')])
-                    else:
-                        buddy_interests = set([i.strip().lower() for i in user.profile.interests])
-                    
-                    if current_interests and buddy_interests:
-                        common_interests = len(current_interests.intersection(buddy_interests)) > 0
-                
-                # Check for similar schedule/timeline (lowest priority)
-                similar_schedule = False
-                if current_profile.schedule and user.profile.schedule:
-                    schedule1 = current_profile.schedule.lower()
-                    schedule2 = user.profile.schedule.lower()
-                    
-                    common_indicators = ["weekday", "weekend", "morning", "afternoon", "evening", "night"]
-                    matches = sum(1 for indicator in common_indicators if indicator in schedule1 and indicator in schedule2)
-                    
-                    similar_schedule = matches > 0
-                
-                # Categorize based on priority
-                if has_same_specialization:
-                    specialization_matches.append(buddy_data)
-                elif common_interests:
-                    interest_matches.append(buddy_data)
-                elif similar_schedule:
-                    schedule_matches.append(buddy_data)
-        
-        # Sort each category by compatibility score (highest first)
-        specialization_matches.sort(key=lambda x: x["compatibility"], reverse=True)
-        interest_matches.sort(key=lambda x: x["compatibility"], reverse=True)
-        schedule_matches.sort(key=lambda x: x["compatibility"], reverse=True)
-        
-        # Combine all categories in priority order
-        recommended_list = specialization_matches + interest_matches + schedule_matches
-        
-        return jsonify(recommended_list)
+        users = load_users_with_profiles([user_id for _, _, user_id in keys])
+        
+        # One query for the status of every shown user
+        recommended_list = serialize_recommendations(keys, users, connection_status_map(current_user.id))
+        
+        response = jsonify(recommended_list)
+        if has_more:
+            response.headers["X-Next-Cursor"] = encode_cursor(keys[-1])
+        return response
         
     except SQLAlchemyError as e:
         return jsonify({
@@ -284,6 +220,94 @@ def get_recommended_buddies():
             "message": str(e)
         }), 500
     
+@buddies_bp.route("/similar", methods=["GET"])
+@login_required
+def get_similar_buddies():
+    """
+    Get the users whose bio, interests and specialization read most like the
+    current user's (TF-IDF cosine similarity), excluding existing connections
+    """
+    try:
+        if not current_user.profile:
+            return jsonify({"error": "Profile not found"}), 404
+        
+        limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+        
+        statuses = connection_status_map(current_user.id)
+        neighbours = text_index.top_k(current_user.id, k=limit, exclude=statuses.keys())
+        users = load_users_with_profiles([user_id for user_id, _ in neighbours])
+        
+        response_data = []
+        for user_id, similarity in neighbours:
+            user = users.get(user_id)
+            if user and user.profile:
+                buddy = serialize_buddy(
+                    user, calculate_compatibility(current_user.profile, user.profile), "not_connected"
+                )
+                buddy["similarity"] = round(similarity, 3)
+                response_data.append(buddy)
+        
+        return jsonify(response_data)
+        
+    except SQLAlchemyError as e:
+        return jsonify({
+            "error": "Database error occurred",
+            "message": str(e)
+        }), 500
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to retrieve similar buddies",
+            "message": str(e)
+        }), 500
+    
+@buddies_bp.route("/search", methods=["GET"])
+@login_required
+def search_buddies():
+    """
+    Search study partners by bio, interests, specialization and schedule.
+    Every word of `q` must match; results are ranked and paginated with
+    `page` and `limit`
+    """
+    try:
+        query = request.args.get("q", "").strip()
+        if not query:
+            return jsonify({"error": "q is required"}), 400
+        
+        page = max(1, request.args.get("page", 1, type=int))
+        limit = max(1, min(request.args.get("limit", 20, type=int), 50))
+        
+        user_ids, has_next = search_profiles(
+            query, exclude_user_id=current_user.id, limit=limit, offset=(page - 1) * limit
+        )
+        users = load_users_with_profiles(user_ids)
+        statuses = connection_status_map(current_user.id)
+        
+        results = []
+        for user_id in user_ids:
+            user = users.get(user_id)
+            if user and user.profile:
+                compatibility = calculate_compatibility(current_user.profile, user.profile) if current_user.profile else 0
+                results.append(serialize_buddy(user, compatibility, statuses.get(user.id, "not_connected")))
+        
+        return jsonify({
+            "results": results,
+            "page": page,
+            "has_next": has_next
+        })
+        
+    except SQLAlchemyError as e:
+        return jsonify({
+            "error": "Database error occurred",
+            "message": str(e)
+        }), 500
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to search buddies",
+            "message": str(e)
+        }), 500
+    
 @buddies_bp.route("/all", methods=["GET"])
 @login_required
 def get_all_potential_buddies():
@@ -298,67 +322,23 @@ def get_all_potential_buddies():
         ).options(joinedload(User.profile)).all()
         
         # Get existing connections to show status
-        existing_connections = BuddyConnection.query.filter(
-            or_(
-                BuddyConnection.user_id == current_user.id,
-                BuddyConnection.buddy_id == current_user.id
+        statuses = connection_status_map(current_user.id)
+        
+        # Calculate compatibility with current user for all candidates at once
+        candidates = [user for user in all_users if user.profile]
+        if current_user.profile:
+            matrix = CandidateMatrix.from_features(
+                [user.id for user in candidates],
+                [profile_features(user.profile) for user in candidates]
             )
-        ).all()
-        
-        # Create a set of connected user IDs
-        connected_user_ids = set()
-        for conn in existing_connections:
-            if conn.user_id == current_user.id:
-                connected_user_ids.add(conn.buddy_id)
-            else:
-                connected_user_ids.add(conn.user_id)
-        
-        response_data = []
+            compatibilities = matrix.score(profile_features(current_user.profile))[0].tolist()
+        else:
+            compatibilities = [0] * len(candidates)
         
-        for user in all_users:
-            if user.profile:
-                # Calculate compatibility with current user
-                compatibility = calculate_compatibility(current_user.profile, user.profile) if current_user.profile else 0
-                
-                # Determine connection status
-                connection_status = "not_connected"
-                if user.id in connected_user_ids:
-                    # Find the specific connection to check status
-                    connection = next(
-                        (conn for conn in existing_connections if 
-                         (conn.user_id == current_user.id and conn.buddy_id == user.id) or
-                         (conn.user_id == user.id and conn.buddy_id == current_user.id)),
-                        None
-                    )
-                    if connection:
-                        if connection.status == "approved":
-                            connection_status = "connected"
-                        elif connection.user_id == current_user.id:
-                            connection_status = "request_sent"
-                        else:
-                            connection_status = "request_received"
-                
-                # Handle interests format
-                interests = []
-                if user.profile.interests:
-                    if isinstance(user.profile.interests, str):
-                        interests = [i.strip() for i in user.profile.interests.split(',')]
-                    else:
-                        interests = user.profile.interests
-                
-                response_data.append({
-                    "id": user.id,
-                    "userId": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "avatar": user.avatar,
-                    "specialization": user.profile.specialization,
-                    "level": user.profile.level if user.profile.level else "Beginner",
-                    "interests": interests,
-                    "schedule": user.profile.schedule,
-                    "compatibility": compatibility,
-                    "connection_status": connection_status
-                })
+        response_data = [
+            serialize_buddy(user, compatibility, statuses.get(user.id, "not_connected"))
+            for user, compatibility in zip(candidates, compatibilities)
+        ]
         
         return jsonify(response_data)
         
@@ -394,20 +374,7 @@ def connect_buddy():
             return jsonify({"error": "Cannot connect with yourself"}), 400
         
         # Check if connection already exists
-        existing_connection = BuddyConnection.query.filter(
-            or_(
-                and_(
-                    BuddyConnection.user_id == current_user.id,
-                    BuddyConnection.buddy_id == buddy.id
-                ),
-                and_(
-                    BuddyConnection.user_id == buddy.id,
-                    BuddyConnection.buddy_id == current_user.id
-                )
-            )
-        ).first()
-        
-        if existing_connection:
+        if connection_graph.edge(current_user.id, buddy.id, fresh=True):
             return jsonify({"error": "Connection already exists"}), 400
         
         # Create a new connection (pending status)
@@ -418,11 +385,20 @@ def connect_buddy():
         )
         
         db.session.add(new_connection)
+        remove_recommendation_pair(current_user.id, buddy.id)
         
         # Create a notification for the receiver
-        create_connection_notification(current_user.id, buddy.id)
+        notification = create_connection_notification(current_user.id, buddy.id)
         
         db.session.commit()
+        connection_graph.set_edge(current_user.id, buddy.id, "pending")
+        event_hub.publish(buddy.id, "connection_request", {
+            "request_id": new_connection.id,
+            "sender_id": current_user.id,
+            "sender_username": current_user.username
+        })
+        if notification:
+            publish_notification(notification)
         
         return jsonify({
             "success": True,
@@ -447,25 +423,11 @@ def connect_buddy():
 def get_connection_requests():
     try:
         # Get pending connection requests where current user is the receiver
-        requests = BuddyConnection.query.filter(
-            BuddyConnection.buddy_id == current_user.id,
-            BuddyConnection.status == "pending"
-        ).all()
+        requests = pending_requests_query().all()
         
-        response_data = []
-        for req in requests:
-            # Get the sender's details
-            sender = User.query.get(req.user_id)
-            if sender and sender.profile:
-                response_data.append({
-                    "id": req.id,
-                    "user_id": sender.id,
-                    "username": sender.username,
-                    "avatar": sender.avatar,
-                    "specialization": sender.profile.specialization,
-                    "message": "Wants to connect with you",
-                    "timestamp": req.created_at.isoformat() if req.created_at else datetime.utcnow().isoformat()
-                })
+        # Get the senders' details
+        users = load_users_with_profiles([req.user_id for req in requests])
+        response_data = serialize_connection_requests(requests, users)
         
         return jsonify(response_data)
         
@@ -497,6 +459,7 @@ def accept_connection_request(request_id):
         
         # Update the connection status to approved
         connection.status = "approved"
+        remove_recommendation_pair(connection.user_id, connection.buddy_id)
         
         # Create a notification for the sender
         notification = Notification(
@@ -511,6 +474,10 @@ def accept_connection_request(request_id):
         db.session.add(notification)
         
         db.session.commit()
+        connection_graph.set_edge(connection.user_id, connection.buddy_id, "approved")
+        friends_of_friends.add_edge(connection.user_id, connection.buddy_id)
+        study_network.connect(connection.user_id, connection.buddy_id)
+        publish_notification(notification)
         
         return jsonify({
             "success": True,
@@ -544,9 +511,11 @@ def decline_connection_request(request_id):
         if not connection:
             return jsonify({"error": "Connection request not found"}), 404
         
-        # Delete the connection request
+        # Delete the connection request, the pair can be recommended again
         db.session.delete(connection)
+        restore_recommendation_pair(connection.user_id, connection.buddy_id)
         db.session.commit()
+        connection_graph.remove_edge(connection.user_id, connection.buddy_id)
         
         return jsonify({
             "success": True,
@@ -570,55 +539,10 @@ def decline_connection_request(request_id):
 @login_required
 def get_connected_buddies():
     try:
-        # Get approved connections
-        connections = BuddyConnection.query.filter(
-            or_(
-                and_(
-                    BuddyConnection.user_id == current_user.id,
-                    BuddyConnection.status == "approved"
-                ),
-                and_(
-                    BuddyConnection.buddy_id == current_user.id,
-                    BuddyConnection.status == "approved"
-                )
-            )
-        ).all()
-        
-        response_data = []
-        for conn in connections:
-            # Determine which user is the buddy (not the current user)
-            if conn.user_id == current_user.id:
-                buddy_id = conn.buddy_id
-            else:
-                buddy_id = conn.user_id
-            
-            # Get the buddy's details
-            buddy = User.query.get(buddy_id)
-            if buddy and buddy.profile:
-                # Calculate compatibility
-                compatibility = calculate_compatibility(current_user.profile, buddy.profile) if current_user.profile else 0
-                
-                # Handle interests format
-                interests = []
-                if buddy.profile.interests:
-                    if isinstance(buddy.profile.interests, str):
-                        interests = [i.strip() for i in buddy.profile.interests.split(',')]
-                    else:
-                        interests = buddy.profile.interests
-                
-                response_data.append({
-                    "id": buddy.id,
-                    "userId": buddy.id,
-                    "username": buddy.username,
-                    "email": buddy.email,
-                    "avatar": buddy.avatar,
-                    "specialization": buddy.profile.specialization,
-                    "level": buddy.profile.level if buddy.profile.level else "Beginner",
-                    "interests": interests,
-                    "schedule": buddy.profile.schedule,
-                    "compatibility": compatibility,
-                    "connection_status": "connected"
-                })
+        # Get approved connections and the buddies' details
+        buddy_ids = connection_graph.connected_ids(current_user.id)
+        users = load_users_with_profiles(buddy_ids)
+        response_data = serialize_connected_buddies(buddy_ids, users)
         
         return jsonify(response_data)
         
@@ -632,4 +556,35 @@ def get_connected_buddies():
         return jsonify({
             "error": "Failed to retrieve connected buddies",
             "message": str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+@buddies_bp.route("/<int:buddy_id>/common-slots", methods=["GET"])
+@login_required
+def get_common_slots(buddy_id):
+    """Weekly time slots when the current user and a connected buddy are both free"""
+    try:
+        if not connection_graph.are_connected(current_user.id, buddy_id):
+            return jsonify({"error": "Not connected with this user"}), 403
+        
+        availability = dict(
+            db.session.query(Profile.user_id, Profile.availability).filter(
+                Profile.user_id.in_([current_user.id, buddy_id])
+            ).all()
+        )
+        missing = [user_id for user_id in (current_user.id, buddy_id) if availability.get(user_id) is None]
+        if missing:
+            return jsonify({"slots": [], "total_minutes": 0, "missing_availability": missing})
+        
+        slots, total_minutes = common_slots(availability.values())
+        return jsonify({"slots": slots, "total_minutes": total_minutes, "missing_availability": []})
+        
+    except SQLAlchemyError as e:
+        return jsonify({
+            "error": "Database error occurred",
+            "message": str(e)
+        }), 500
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to find common study time",
+            "message": str(e)
+        }), 500
@@ -1,11 +1,15 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from models import User, BuddyConnection, Message, Notification
+from models import User, Profile, Message, Notification
 from extensions import db
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import or_, and_
 from datetime import datetime, timedelta
 from config import Config
+from services.connections import connection_graph
+from services.events import publish_message, publish_notification, serialize_message
+from services.message_history import pair_messages, pair_message_count
+from services.conversations import record_message, mark_conversation_read, inbox_rows, last_read_ids, is_read
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
 
@@ -14,77 +18,73 @@ chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
 def get_messages(buddy_id):
     try:
         # Check if users are connected
-        connection = BuddyConnection.query.filter(
-            or_(
-                and_(
-                    BuddyConnection.user_id == current_user.id,
-                    BuddyConnection.buddy_id == buddy_id,
-                    BuddyConnection.status == "approved"
-                ),
-                and_(
-                    BuddyConnection.user_id == buddy_id,
-                    BuddyConnection.buddy_id == current_user.id,
-                    BuddyConnection.status == "approved"
-                )
-            )
-        ).first()
-        
-        if not connection:
+        if not connection_graph.are_connected(current_user.id, buddy_id):
             return jsonify({"error": "You are not connected with this user"}), 403
         
-        # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', getattr(Config, 'MESSAGES_PER_PAGE', 50), type=int)
-        
-        # Get messages with pagination
-        messages = Message.query.filter(
-            or_(
-                and_(
-                    Message.sender_id == current_user.id,
-                    Message.receiver_id == buddy_id
-                ),
-                and_(
-                    Message.sender_id == buddy_id,
-                    Message.receiver_id == current_user.id
-                )
-            )
-        ).order_by(Message.timestamp.desc()).paginate(
-            page=page, 
-            per_page=limit, 
-            error_out=False
+        # Keyset cursors: ?after_id= polls for new messages, ?before_id= loads older ones
+        after_id = request.args.get('after_id', type=int)
+        before_id = request.args.get('before_id', type=int)
+        limit = max(1, min(request.args.get('limit', getattr(Config, 'MESSAGES_PER_PAGE', 50), type=int), 200))
+        include_total = request.args.get('include_total', '').lower() in ('1', 'true')
+        
+        messages, has_more = pair_messages(
+            current_user.id, buddy_id, after_id=after_id, before_id=before_id, limit=limit
         )
+        # Read-only, the client moves its read watermark with POST .../read
+        watermarks = last_read_ids(current_user.id, buddy_id)
+        response_data = [serialize_message(message, is_read(message, watermarks)) for message in messages]
         
-        # Format response
-        response_data = []
-        for message in messages.items:
-            response_data.append({
-                "id": message.id,
-                "senderId": message.sender_id,
-                "receiverId": message.receiver_id,
-                "content": message.content,
-                "timestamp": message.timestamp.isoformat(),
-                "read": message.read,
-                "type": message.message_type
-            })
+        result = {
+            "messages": response_data,
+            "has_more": has_more,
+            "newest_id": messages[0].id if messages else after_id,
+            "oldest_id": messages[-1].id if messages else before_id,
+            "last_read_id": watermarks[current_user.id],
+            "buddy_last_read_id": watermarks[buddy_id]
+        }
+        if include_total:
+            result["total"] = pair_message_count(current_user.id, buddy_id)
+        return jsonify(result)
+        
+    except SQLAlchemyError as e:
+        return jsonify({
+            "error": "Database error occurred",
+            "message": str(e)
+        }), 500
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to retrieve messages",
+            "message": str(e)
+        }), 500
+
+@chat_bp.route("/messages/<int:buddy_id>/read", methods=["POST"])
+@login_required
+def mark_read(buddy_id):
+    """
+    Mark the conversation read up to the optional "last_read_id" (by
+    default its last message). Moves the user's read watermark forward
+    only, so repeated calls write nothing.
+    """
+    try:
+        if not connection_graph.are_connected(current_user.id, buddy_id):
+            return jsonify({"error": "You are not connected with this user"}), 403
+        
+        data = request.get_json(silent=True) or {}
+        up_to_id = data.get("last_read_id")
+        if up_to_id is not None and (isinstance(up_to_id, bool) or not isinstance(up_to_id, int)):
+            return jsonify({"error": "last_read_id must be a message id"}), 400
         
-        # Mark messages as read
-        Message.query.filter(
-            Message.sender_id == buddy_id,
-            Message.receiver_id == current_user.id,
-            Message.read == False
-        ).update({Message.read: True})
+        last_read_id = mark_conversation_read(current_user.id, buddy_id, up_to_id)
         db.session.commit()
         
         return jsonify({
-            "messages": response_data,
-            "has_next": messages.has_next,
-            "has_prev": messages.has_prev,
-            "page": messages.page,
-            "pages": messages.pages,
-            "total": messages.total
+            "success": True,
+            "last_read_id": last_read_id or 0
         })
         
     except SQLAlchemyError as e:
+        db.session.rollback()
         return jsonify({
             "error": "Database error occurred",
             "message": str(e)
@@ -92,7 +92,7 @@ def get_messages(buddy_id):
         
     except Exception as e:
         return jsonify({
-            "error": "Failed to retrieve messages",
+            "error": "Failed to mark messages as read",
             "message": str(e)
         }), 500
 
@@ -115,22 +115,7 @@ def send_message(buddy_id):
             return jsonify({"error": "Message content is required"}), 400
         
         # Check if users are connected
-        connection = BuddyConnection.query.filter(
-            or_(
-                and_(
-                    BuddyConnection.user_id == current_user.id,
-                    BuddyConnection.buddy_id == buddy_id,
-                    BuddyConnection.status == "approved"
-                ),
-                and_(
-                    BuddyConnection.user_id == buddy_id,
-                    BuddyConnection.buddy_id == current_user.id,
-                    BuddyConnection.status == "approved"
-                )
-            )
-        ).first()
-        
-        if not connection:
+        if not connection_graph.are_connected(current_user.id, buddy_id):
             print("DEBUG: Users not connected error")
             return jsonify({"error": "You are not connected with this user"}), 403
         
@@ -147,13 +132,13 @@ def send_message(buddy_id):
             receiver_id=buddy_id,
             content=content.strip(),
             timestamp=datetime.utcnow(),
-            read=False,
             message_type=message_type,
             expires_at=datetime.utcnow() + timedelta(days=retention_days)
         )
         
         print("DEBUG: Adding message to session...")
         db.session.add(message)
+        record_message(message)  # also assigns message.id for the notification data
         
         # Create notification for the receiver
         print("DEBUG: Creating notification...")
@@ -174,6 +159,8 @@ def send_message(buddy_id):
         print("DEBUG: Committing to database...")
         db.session.commit()
         print("DEBUG: Commit successful!")
+        publish_message(message)
+        publish_notification(notification)
         
         # Check if we need to cleanup old messages for this conversation
         _check_conversation_size(current_user.id, buddy_id)
@@ -206,67 +193,40 @@ def send_message(buddy_id):
 @login_required
 def get_conversations():
     try:
-        # Get all connected buddies
-        connections = BuddyConnection.query.filter(
-            or_(
-                and_(
-                    BuddyConnection.user_id == current_user.id,
-                    BuddyConnection.status == "approved"
-                ),
-                and_(
-                    BuddyConnection.buddy_id == current_user.id,
-                    BuddyConnection.status == "approved"
-                )
-            )
-        ).all()
-        
+        # Only conversations with people the user is still connected to
+        buddy_ids = set(connection_graph.connected_ids(current_user.id))
         conversations = []
-        for conn in connections:
-            # Determine which user is the buddy
-            if conn.user_id == current_user.id:
-                buddy_id = conn.buddy_id
-            else:
-                buddy_id = conn.user_id
-            
-            # Get buddy details
-            buddy = User.query.get(buddy_id)
-            if not buddy or not buddy.profile:
+        for row in inbox_rows(current_user.id):
+            if row.user_id not in buddy_ids:
                 continue
-            
-            # Get last message
-            last_message = Message.query.filter(
-                or_(
-                    and_(
-                        Message.sender_id == current_user.id,
-                        Message.receiver_id == buddy_id
-                    ),
-                    and_(
-                        Message.sender_id == buddy_id,
-                        Message.receiver_id == current_user.id
-                    )
-                )
-            ).order_by(Message.timestamp.desc()).first()
-            
-            # Count unread messages
-            unread_count = Message.query.filter(
-                Message.sender_id == buddy_id,
-                Message.receiver_id == current_user.id,
-                Message.read == False
-            ).count()
-            
+            buddy_ids.discard(row.user_id)
             conversations.append({
-                "id": buddy.id,
-                "userId": buddy.id,
-                "username": buddy.username,
-                "avatar": buddy.avatar,
-                "specialization": buddy.profile.specialization,
-                "last_message": last_message.content if last_message else None,
-                "last_message_time": last_message.timestamp.isoformat() if last_message else None,
-                "unread_count": unread_count
+                "id": row.user_id,
+                "userId": row.user_id,
+                "username": row.username,
+                "avatar": row.avatar,
+                "specialization": row.specialization,
+                "last_message": row.last_message,
+                "last_message_time": row.last_message_time.isoformat() if row.last_message_time else None,
+                "unread_count": row.unread_count
             })
         
-        # Sort by last message time
-        conversations.sort(key=lambda x: x["last_message_time"] or "", reverse=True)
+        # Buddies with no messages yet come last
+        if buddy_ids:
+            buddies = db.session.query(
+                User.id, User.username, User.avatar, Profile.specialization
+            ).join(Profile, Profile.user_id == User.id).filter(User.id.in_(buddy_ids)).all()
+            for buddy in buddies:
+                conversations.append({
+                    "id": buddy.id,
+                    "userId": buddy.id,
+                    "username": buddy.username,
+                    "avatar": buddy.avatar,
+                    "specialization": buddy.specialization,
+                    "last_message": None,
+                    "last_message_time": None,
+                    "unread_count": 0
+                })
         
         return jsonify(conversations)
         
@@ -293,22 +253,7 @@ def attach_note(buddy_id):
             return jsonify({"error": "Note content is required"}), 400
         
         # Check if users are connected
-        connection = BuddyConnection.query.filter(
-            or_(
-                and_(
-                    BuddyConnection.user_id == current_user.id,
-                    BuddyConnection.buddy_id == buddy_id,
-                    BuddyConnection.status == "approved"
-                ),
-                and_(
-                    BuddyConnection.user_id == buddy_id,
-                    BuddyConnection.buddy_id == current_user.id,
-                    BuddyConnection.status == "approved"
-                )
-            )
-        ).first()
-        
-        if not connection:
+        if not connection_graph.are_connected(current_user.id, buddy_id):
             return jsonify({"error": "You are not connected with this user"}), 403
         
         # Create note message with expiration (use default if config not available)
@@ -318,13 +263,14 @@ def attach_note(buddy_id):
             receiver_id=buddy_id,
             content=f"📝 Note: {note_content.strip()}",
             timestamp=datetime.utcnow(),
-            read=False,
             message_type="note",
             expires_at=datetime.utcnow() + timedelta(days=retention_days)
         )
         
         db.session.add(message)
+        record_message(message)
         db.session.commit()
+        publish_message(message)
         
         return jsonify({
             "success": True,
@@ -357,22 +303,7 @@ def send_challenge(buddy_id):
             return jsonify({"error": "Challenge title is required"}), 400
         
         # Check if users are connected
-        connection = BuddyConnection.query.filter(
-            or_(
-                and_(
-                    BuddyConnection.user_id == current_user.id,
-                    BuddyConnection.buddy_id == buddy_id,
-                    BuddyConnection.status == "approved"
-                ),
-                and_(
-                    BuddyConnection.user_id == buddy_id,
-                    BuddyConnection.buddy_id == current_user.id,
-                    BuddyConnection.status == "approved"
-                )
-            )
-        ).first()
-        
-        if not connection:
+        if not connection_graph.are_connected(current_user.id, buddy_id):
             return jsonify({"error": "You are not connected with this user"}), 403
         
         # Create challenge message with expiration (use default if config not available)
@@ -383,13 +314,14 @@ def send_challenge(buddy_id):
             receiver_id=buddy_id,
             content=f"🏆 Challenge: {challenge_title.strip()}{description}",
             timestamp=datetime.utcnow(),
-            read=False,
             message_type="challenge",
             expires_at=datetime.utcnow() + timedelta(days=retention_days)
         )
         
         db.session.add(message)
+        record_message(message)
         db.session.commit()
+        publish_message(message)
         
         return jsonify({
             "success": True,
@@ -415,18 +347,7 @@ def _check_conversation_size(user1_id, user2_id):
     try:
         max_messages = getattr(Config, 'MAX_MESSAGES_PER_CONVERSATION', 1000)
         
-        message_count = Message.query.filter(
-            or_(
-                and_(
-                    Message.sender_id == user1_id,
-                    Message.receiver_id == user2_id
-                ),
-                and_(
-                    Message.sender_id == user2_id,
-                    Message.receiver_id == user1_id
-                )
-            )
-        ).count()
+        message_count = pair_message_count(user1_id, user2_id)
         
         # If more than MAX_MESSAGES_PER_CONVERSATION, delete oldest 100
         if message_count > max_messages:
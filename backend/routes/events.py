@@ -0,0 +1,81 @@
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
+from flask_login import login_required, current_user
+from extensions import db
+from services.events import event_hub, format_sse
+
+events_bp = Blueprint("events", __name__, url_prefix="/api/events")
+
+def _cursor():
+    """(after_id, missed) from Last-Event-ID (SSE reconnects) or ?after="""
+    return event_hub.parse_cursor(request.headers.get("Last-Event-ID") or request.args.get("after"))
+
+@events_bp.route("", methods=["GET"])
+@login_required
+def stream_events():
+    """
+    Server-Sent Events stream of the user's new messages, notifications and
+    connection requests. After the login check the stream holds no database
+    connection and idles on the event hub, sending a comment every
+    EVENTS_KEEPALIVE_SECONDS so proxies keep it open and disconnects are
+    noticed.
+    """
+    user_id = current_user.id
+    after_id, missed = _cursor()
+    keepalive = current_app.config["EVENTS_KEEPALIVE_SECONDS"]
+    # Nothing below touches the database, give the connection back now
+    db.session.close()
+
+    def generate():
+        nonlocal after_id, missed
+        yield f"retry: {current_app.config['EVENTS_RETRY_MS']}\n\n"
+        while True:
+            if missed:
+                # Events were lost, the client reloads what it shows
+                after_id = event_hub.current_id()
+                yield format_sse(event_hub.cursor(after_id), "reset", {})
+            events, missed = event_hub.wait(user_id, after_id, keepalive)
+            if missed:
+                continue
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for event_id, event_type, data in events:
+                yield format_sse(event_hub.cursor(event_id), event_type, data)
+            after_id = events[-1][0]
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@events_bp.route("/poll", methods=["GET"])
+@login_required
+def poll_events():
+    """
+    Long-poll fallback for clients without EventSource: waits up to
+    ?timeout= seconds for events after ?after= and returns them with the
+    cursor for the next call. "reset" means events were missed.
+    """
+    user_id = current_user.id
+    after_id, missed = _cursor()
+    timeout = max(0, min(request.args.get("timeout", current_app.config["EVENTS_LONG_POLL_TIMEOUT"], type=int),
+                         current_app.config["EVENTS_LONG_POLL_TIMEOUT"]))
+    db.session.close()
+
+    events = []
+    if not missed:
+        events, missed = event_hub.wait(user_id, after_id, timeout)
+    if missed:
+        events, after_id = [], event_hub.current_id()
+    elif events:
+        after_id = events[-1][0]
+
+    return jsonify({
+        "events": [
+            {"id": event_hub.cursor(event_id), "type": event_type, "data": data}
+            for event_id, event_type, data in events
+        ],
+        "cursor": event_hub.cursor(after_id),
+        "reset": missed
+    })
@@ -1,8 +1,11 @@
 from flask import Blueprint, jsonify
-from flask_login import login_required
-from models import StudyGroup
+from flask_login import login_required, current_user
+from models import StudyGroup, StudyGroupMember, Profile
+from extensions import db
+from sqlalchemy.exc import SQLAlchemyError
+from services.availability import common_slots
 
-groups_bp = Blueprint("dashboard_groups", __name__, url_prefix="/groups")
+groups_bp = Blueprint("dashboard_groups", __name__, url_prefix="/api/groups")
 
 @groups_bp.route("", methods=["GET"])
 @login_required
@@ -12,3 +15,44 @@ def groups():
         {"id": g.id, "name": g.name, "members": g.members, "online": g.online, "avatar": g.avatar}
         for g in groups
     ])
+
+@groups_bp.route("/<int:group_id>/common-slots", methods=["GET"])
+@login_required
+def group_common_slots(group_id):
+    """
+    Weekly time slots when every member of a study group is free. Members
+    who have not set their availability are listed and left out.
+    """
+    try:
+        if db.session.get(StudyGroup, group_id) is None:
+            return jsonify({"error": "Group not found"}), 404
+
+        rows = db.session.query(StudyGroupMember.user_id, Profile.availability).outerjoin(
+            Profile, Profile.user_id == StudyGroupMember.user_id
+        ).filter(StudyGroupMember.group_id == group_id).all()
+
+        if current_user.id not in {user_id for user_id, _ in rows}:
+            return jsonify({"error": "Not a member of this group"}), 403
+
+        availabilities = [availability for _, availability in rows if availability is not None]
+        missing = [user_id for user_id, availability in rows if availability is None]
+        slots, total_minutes = common_slots(availabilities) if availabilities else ([], 0)
+
+        return jsonify({
+            "slots": slots,
+            "total_minutes": total_minutes,
+            "members": len(rows),
+            "missing_availability": missing
+        })
+
+    except SQLAlchemyError as e:
+        return jsonify({
+            "error": "Database error occurred",
+            "message": str(e)
+        }), 500
+
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to find common study time",
+            "message": str(e)
+        }), 500
@@ -1,7 +1,10 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
-from models import Activity, StudyGroup, Challenge, User, BuddyConnection, db
-from sqlalchemy import or_, and_
+from models import Activity, StudyGroup, Challenge, User, db
+from sqlalchemy.orm import joinedload
+from services.recommendations import rank_recommendations, FRIENDS_OF_FRIENDS_TIER
+from services.connections import connection_status_map
+from services.matching import calculate_compatibility
 import math
 
 overview_bp = Blueprint("overview", __name__, url_prefix="/api/overview")
@@ -85,33 +88,29 @@ def get_recommended_buddies(limit=3):
         if not current_user_profile:
             return []
         
-        # Find users with similar interests, specialization, or schedule
-        recommended_users = User.query.filter(
-            User.id != current_user.id,
-            User.profile.has()
-        ).outerjoin(
-            BuddyConnection, 
-            or_(
-                and_(
-                    BuddyConnection.user_id == current_user.id,
-                    BuddyConnection.buddy_id == User.id
-                ),
-                and_(
-                    BuddyConnection.user_id == User.id,
-                    BuddyConnection.buddy_id == current_user.id
-                )
-            )
-        ).filter(
-            BuddyConnection.id.is_(None)
-        ).all()
+        # Same ranking as /api/buddies/recommended, only the top `limit` are selected
+        keys, _ = rank_recommendations(current_user_profile, limit=limit)
+        if not keys:
+            return []
+        
+        users = {
+            user.id: user for user in User.query.filter(
+                User.id.in_([user_id for _, _, user_id in keys])
+            ).options(joinedload(User.profile)).all()
+        }
+        
+        statuses = connection_status_map(current_user.id)
         
-        # Calculate compatibility and prepare response
         buddies = []
-        for user in recommended_users:
-            if not user.profile:
+        for tier, negative_score, user_id in keys:
+            user = users.get(user_id)
+            if not user or not user.profile:
                 continue
-                
-            compatibility = calculate_compatibility(current_user_profile, user.profile)
+            
+            if tier == FRIENDS_OF_FRIENDS_TIER:
+                compatibility = calculate_compatibility(current_user_profile, user.profile)
+            else:
+                compatibility = -negative_score
             
             buddies.append({
                 "id": user.id,
@@ -121,74 +120,15 @@ def get_recommended_buddies(limit=3):
                 "specialization": user.profile.specialization,
                 "level": user.profile.level or "Beginner",
                 "compatibility": compatibility,
-                "connection_status": check_connection_status(current_user.id, user.id)
+                "connection_status": statuses.get(user.id, "not_connected")
             })
         
-        # Sort by compatibility and limit
-        buddies.sort(key=lambda x: x["compatibility"], reverse=True)
-        return buddies[:limit]
+        return buddies
         
     except Exception as e:
         print(f"Error getting recommended buddies: {e}")
         return []
 
-def calculate_compatibility(profile1, profile2):
-    """Calculate compatibility between two profiles"""
-    score = 0
-    
-    # Check interests
-    if profile1.interests and profile2.interests:
-        interests1 = set([i.strip().lower() for i in profile1.interests.split(',')])
-        interests2 = set([i.strip().lower() for i in profile2.interests.split(',')])
-        
-        if interests1 and interests2:
-            common_interests = interests1.intersection(interests2)
-            interest_score = (len(common_interests) / max(len(interests1), len(interests2))) * 40
-            score += interest_score
-    
-    # Check specialization
-    if profile1.specialization and profile2.specialization:
-        if profile1.specialization.lower() == profile2.specialization.lower():
-            score += 30
-    
-    # Check schedule
-    if profile1.schedule and profile2.schedule:
-        schedule1 = profile1.schedule.lower()
-        schedule2 = profile2.schedule.lower()
-        
-        common_indicators = ["weekday", "weekend", "morning", "afternoon", "evening", "night"]
-        matches = sum(1 for indicator in common_indicators if indicator in schedule1 and indicator in schedule2)
-        
-        schedule_score = (matches / len(common_indicators)) * 30
-        score += schedule_score
-    
-    return min(round(score), 100)
-
-def check_connection_status(user_id, buddy_id):
-    """Check connection status between users"""
-    connection = BuddyConnection.query.filter(
-        or_(
-            and_(
-                BuddyConnection.user_id == user_id,
-                BuddyConnection.buddy_id == buddy_id
-            ),
-            and_(
-                BuddyConnection.user_id == buddy_id,
-                BuddyConnection.buddy_id == user_id
-            )
-        )
-    ).first()
-    
-    if connection:
-        if connection.status == "accepted":
-            return "connected"
-        elif connection.user_id == user_id:
-            return "request_sent"
-        else:
-            return "request_received"
-    
-    return "not_connected"
-
 def calculate_level(xp):
     """Calculate level based on XP"""
     return math.floor(math.sqrt(xp / 100)) + 1 if xp > 0 else 1
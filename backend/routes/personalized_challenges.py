@@ -16,8 +16,8 @@ def personalized_challenges():
         if not profile:
             return jsonify({"error": "Profile not found"}), 404
         
-        # Extract interests and specialization
-        interests = profile.interests or ""
+        # Canonical interest names (aliases folded) and specialization
+        interests = [tag.name for tag in profile.interest_tags]
         specialization = profile.specialization or ""
         
         # Generate personalized challenges
@@ -28,9 +28,8 @@ def personalized_challenges():
         return jsonify({"error": "Failed to fetch challenges"}), 500
 
 def generate_personalized_challenges(interests, specialization):
-    """Generate personalized challenges based on user interests"""
-    # Parse interests
-    interests_list = [interest.strip().lower() for interest in interests.split(',')] if interests else []
+    """Generate personalized challenges based on a user's canonical interest names"""
+    interests_list = list(interests)
     specialization = specialization.lower() if specialization else ""
     
     challenges = []
@@ -75,7 +74,8 @@ def generate_personalized_challenges(interests, specialization):
     
     # Data science challenges
     ds_keywords = ['data science', 'machine learning', 'ai', 'analytics', 'data analysis', 
-                  'statistics', 'python', 'r', 'sql', 'data visualization']
+                  'statistics', 'python', 'r', 'sql', 'data visualization',
+                  'artificial intelligence', 'deep learning']
     
     if any(keyword in interests_list or keyword in specialization for keyword in ds_keywords):
         challenges.extend([
@@ -4,6 +4,14 @@ from models import db, Profile
 import os
 from werkzeug.utils import secure_filename
 from flask_cors import cross_origin
+from services.matching import refresh_profile_features, profile_features, compatibility_cache
+from services.candidate_index import candidate_index
+from services.lsh import interest_lsh, profile_signature
+from services.text_similarity import text_index
+from services.recommendations import refresh_user_recommendations
+from services.profile_snapshot import profile_snapshot
+from services.availability import parse_schedule, encode_grid, decode_grid, slots_to_grid, grid_to_slots
+import json
 
 # Create blueprint without url_prefix - will be prefixed in app.py
 profile_bp = Blueprint("profile", __name__)
@@ -18,6 +26,13 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def availability_from_slots(slots):
+    """Stored availability grid from the submitted slot list, raises ValueError when malformed"""
+    if isinstance(slots, str):
+        # multipart/form-data sends the list as a JSON string
+        slots = json.loads(slots) if slots.strip() else []
+    return encode_grid(slots_to_grid(slots))
+
 @profile_bp.route("/profile", methods=["GET"])
 @login_required
 @cross_origin(supports_credentials=True)
@@ -39,6 +54,7 @@ def get_profile():
                     "specialization": "",
                     "level": "Beginner",
                     "schedule": "",
+                    "availability": [],
                     "profile_picture": None
                 }
             }), 200
@@ -62,6 +78,7 @@ def get_profile():
                 "specialization": profile.specialization,
                 "level": profile.level,
                 "schedule": profile.schedule,
+                "availability": grid_to_slots(decode_grid(profile.availability)),
                 "profile_picture": profile_picture_url
             }
         }), 200
@@ -104,6 +121,11 @@ def update_profile():
         else:
             return jsonify({"error": "Unsupported media type. Use multipart/form-data for file uploads or application/json for data only."}), 415
 
+        # Recommendations only depend on the matching fields, search also reads the bio
+        matching_fields = {'interests', 'specialization', 'schedule'}
+        search_fields = {'bio', 'interests', 'specialization'}
+        previous = {field: getattr(profile, field) for field in matching_fields | search_fields}
+
         # Update profile fields from data
         if 'bio' in data:
             profile.bio = data.get('bio')
@@ -122,13 +144,41 @@ def update_profile():
             
         if 'schedule' in data:
             profile.schedule = data.get('schedule')
+
+        # An explicit grid wins. A changed schedule text is parsed into a new
+        # grid only while there is none or the stored one is the old text's,
+        # never over a grid the user set themselves.
+        if 'availability' in data:
+            try:
+                profile.availability = availability_from_slots(data.get('availability'))
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({"error": str(e)}), 400
+        elif profile.schedule != previous['schedule'] and profile.availability in (
+            None, encode_grid(parse_schedule(previous['schedule']))
+        ):
+            profile.availability = encode_grid(parse_schedule(profile.schedule))
             
         # Update profile picture if a new one was uploaded
         if profile_picture_path:
             profile.profile_picture = profile_picture_path
 
+        changed = {field for field in previous if getattr(profile, field) != previous[field]}
+        if changed & matching_fields:
+            refresh_profile_features(profile)
+            profile_snapshot.record_change(current_user.id)
+            # Rescores this user in every stored list, not just their own
+            refresh_user_recommendations(profile)
         db.session.commit()
         
+        if changed & matching_fields:
+            profile_snapshot.refresh_if_stale()
+            candidate_index.update(current_user.id, profile_features(profile))
+            interest_lsh.update(current_user.id, profile_signature(profile))
+            compatibility_cache.invalidate_user(current_user.id)
+        if changed & search_fields:
+            text_index.update(current_user.id, profile.bio, profile.interests, profile.specialization)
+        
         return jsonify({"message": "Profile updated successfully"}), 200
 
     except Exception as e:
@@ -178,6 +228,14 @@ def create_profile():
         if isinstance(interests, list):
             interests = ", ".join(interests)
 
+        try:
+            if "availability" in data:
+                availability = availability_from_slots(data.get("availability"))
+            else:
+                availability = encode_grid(parse_schedule(data.get("schedule", "")))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         new_profile = Profile(
             user_id=current_user.id,
             bio=data.get("bio", ""),
@@ -185,11 +243,19 @@ def create_profile():
             specialization=data.get("specialization", ""),
             level=data.get("level", "Beginner"),
             schedule=data.get("schedule", ""),
+            availability=availability,
             profile_picture=profile_picture_path,
         )
+        refresh_profile_features(new_profile)
 
         db.session.add(new_profile)
+        profile_snapshot.record_change(current_user.id)
+        refresh_user_recommendations(new_profile)
         db.session.commit()
+        profile_snapshot.refresh_if_stale()
+        candidate_index.update(current_user.id, profile_features(new_profile))
+        interest_lsh.update(current_user.id, profile_signature(new_profile))
+        text_index.update(current_user.id, new_profile.bio, new_profile.interests, new_profile.specialization)
 
         return jsonify({"message": "Profile created successfully"}), 201
     except Exception as e:
@@ -0,0 +1,38 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
+from services.connections import connection_status_map
+from services.user_directory import username_index
+
+users_bp = Blueprint("users", __name__, url_prefix="/api/users")
+
+@users_bp.route("/suggest", methods=["GET"])
+@login_required
+def suggest_users():
+    """
+    Username typeahead for the connect dialog, served from the in-memory
+    prefix index without touching the users table
+    """
+    try:
+        prefix = request.args.get("prefix", "")
+        limit = max(1, min(request.args.get("limit", 8, type=int), 20))
+
+        if not prefix.strip():
+            return jsonify([])
+
+        statuses = connection_status_map(current_user.id)
+        suggestions = username_index.suggest(prefix, limit=limit, exclude={current_user.id})
+
+        return jsonify([
+            {
+                "id": user_id,
+                "username": username,
+                "connection_status": statuses.get(user_id, "not_connected")
+            }
+            for user_id, username in suggestions
+        ])
+
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to suggest users",
+            "message": str(e)
+        }), 500
@@ -0,0 +1,202 @@
+import re
+
+# Weekly availability grid: 7 days x 48 half-hour slots, bit day * 48 + slot
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+SLOTS_PER_DAY = 48
+SLOT_MINUTES = 24 * 60 // SLOTS_PER_DAY
+GRID_BITS = len(DAYS) * SLOTS_PER_DAY
+GRID_BYTES = GRID_BITS // 8
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+DAY_WORDS = {
+    "mon": 0, "monday": 0, "mondays": 0,
+    "tue": 1, "tues": 1, "tuesday": 1, "tuesdays": 1,
+    "wed": 2, "wednesday": 2, "wednesdays": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3, "thursdays": 3,
+    "fri": 4, "friday": 4, "fridays": 4,
+    "sat": 5, "saturday": 5, "saturdays": 5,
+    "sun": 6, "sunday": 6, "sundays": 6,
+}
+DAY_GROUPS = {
+    "weekday": range(0, 5), "weekdays": range(0, 5),
+    "weekend": range(5, 7), "weekends": range(5, 7),
+    "daily": range(7), "everyday": range(7),
+}
+# Hours covered by a part of the day, end exclusive
+PARTS_OF_DAY = {
+    "morning": (6, 12), "mornings": (6, 12),
+    "afternoon": (12, 17), "afternoons": (12, 17),
+    "evening": (17, 21), "evenings": (17, 21),
+    "night": (21, 24), "nights": (21, 24),
+}
+
+_DAY_PATTERN = "|".join(sorted(DAY_WORDS, key=len, reverse=True))
+DAY_RANGE_RE = re.compile(rf"\b({_DAY_PATTERN})\s*(?:-|–|to|through)\s*({_DAY_PATTERN})\b")
+# A range followed by "times" is a count ("2-3 times a week")
+TIME_RANGE_RE = re.compile(
+    r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*(?:-|–|to|until)\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b(?!\s*times\b)"
+)
+WORD_RE = re.compile(r"[a-z]+")
+
+
+def _hour(hour, minute, meridiem):
+    hour = int(hour) % 12 + 12 if meridiem == "pm" else int(hour) % 12 if meridiem == "am" else int(hour)
+    return hour + int(minute or 0) / 60
+
+
+def _time_ranges(text):
+    ranges = []
+    for start_h, start_m, start_mer, end_h, end_m, end_mer in TIME_RANGE_RE.findall(text):
+        if not (start_m or end_m or start_mer or end_mer):
+            continue  # bare "2-3" is as likely a count as a clock range
+        start = _hour(start_h, start_m, start_mer or (end_mer if int(start_h) <= int(end_h) else ""))
+        end = _hour(end_h, end_m, end_mer)
+        if not end_mer and end <= start < end + 12 <= 24:
+            end += 12  # "9:00-1:00" means 9am to 1pm
+        if start >= 24 or end > 24:
+            continue
+        if end > start:
+            ranges.append((start, end))
+        else:
+            # Past midnight
+            ranges.extend([(start, 24), (0, end)])
+    return ranges
+
+
+def _parse_clause(clause):
+    days = set()
+    for first, last in DAY_RANGE_RE.findall(clause):
+        first, last = DAY_WORDS[first], DAY_WORDS[last]
+        days.update(range(first, last + 1) if first <= last else [*range(first, 7), *range(0, last + 1)])
+    words = WORD_RE.findall(clause)
+    hours = _time_ranges(clause)
+    for word in words:
+        if word in DAY_WORDS:
+            days.add(DAY_WORDS[word])
+        elif word in DAY_GROUPS:
+            days.update(DAY_GROUPS[word])
+        elif word in PARTS_OF_DAY:
+            hours.append(PARTS_OF_DAY[word])
+    if "every day" in clause or "any day" in clause:
+        days.update(range(7))
+    return days, hours
+
+
+def day_slots(start_hour, end_hour):
+    """Mask of the half-hour slots within one day covering [start_hour, end_hour)"""
+    first = int(start_hour * 60) // SLOT_MINUTES
+    last = -(-int(end_hour * 60) // SLOT_MINUTES)
+    return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+
+def parse_schedule(schedule):
+    """
+    Availability grid for a free-text schedule such as "weekday evenings,
+    Sat 9am-1pm", or None when nothing in it is recognised.
+
+    The text is read in clauses split on commas, semicolons and "and". A
+    clause naming only days covers those whole days and one naming only
+    times covers them every day, unless the next clause supplies the
+    missing half ("weekends, 10:00-14:00"). Days joined by "and" share the
+    times of the clause after them ("Mondays and Wednesdays evenings").
+    Clock ranges need am/pm or minutes, a bare "2-3" is not read as one.
+    """
+    if not schedule:
+        return None
+    clauses = []
+    pieces = re.split(r"([,;\n]|\band\b)", schedule.lower())
+    for index in range(0, len(pieces), 2):
+        days, hours = _parse_clause(pieces[index])
+        if not days and not hours:
+            continue
+        if clauses:
+            last_days, last_hours = clauses[-1]
+            joined_by_and = index > 0 and pieces[index - 1] == "and"
+            if (last_days and not last_hours and (hours and not days or days and joined_by_and)) or \
+                    (last_hours and not last_days and days and not hours):
+                clauses[-1] = (last_days | days, last_hours + hours)
+                continue
+        clauses.append((days, hours))
+    if not clauses:
+        return None
+
+    grid = 0
+    for days, hours in clauses:
+        slots = 0
+        for start, end in hours or [(0, 24)]:
+            slots |= day_slots(start, end)
+        for day in days or range(7):
+            grid |= slots << (day * SLOTS_PER_DAY)
+    return grid
+
+
+def encode_grid(grid):
+    """Bytes stored in Profile.availability"""
+    return None if grid is None else grid.to_bytes(GRID_BYTES, "big")
+
+
+def decode_grid(data):
+    return None if data is None else int.from_bytes(data, "big")
+
+
+def _clock(slot):
+    minutes = slot * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _slot(clock):
+    hours, _, minutes = str(clock).partition(":")
+    minutes = int(hours) * 60 + int(minutes or 0)
+    if minutes % SLOT_MINUTES or not 0 <= minutes <= 24 * 60:
+        raise ValueError(clock)
+    return minutes // SLOT_MINUTES
+
+
+def grid_to_slots(grid):
+    """[{"day", "start", "end"}] of the free intervals in a grid, in weekly order"""
+    slots = []
+    if not grid:
+        return slots
+    for day, name in enumerate(DAYS):
+        bits = (grid >> (day * SLOTS_PER_DAY)) & DAY_MASK
+        slot = 0
+        while bits:
+            # Skip to the next free slot, then over the run of free slots
+            skip = (bits & -bits).bit_length() - 1
+            bits >>= skip
+            slot += skip
+            run = (~bits & (bits + 1)).bit_length() - 1
+            slots.append({"day": name, "start": _clock(slot), "end": _clock(slot + run)})
+            bits >>= run
+            slot += run
+    return slots
+
+
+def slots_to_grid(slots):
+    """Grid for [{"day": "monday" or 0-6, "start": "HH:MM", "end": "HH:MM"}], raises ValueError on bad input"""
+    grid = 0
+    for entry in slots or []:
+        try:
+            day = entry["day"]
+            day = DAYS.index(day.lower()) if isinstance(day, str) else int(day)
+            first, last = _slot(entry["start"]), _slot(entry["end"])
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            raise ValueError(f"Invalid availability slot {entry!r}, expected a day and half-hour start and end") from e
+        if not 0 <= day < len(DAYS) or first >= last:
+            raise ValueError(f"Invalid availability slot {entry!r}")
+        grid |= (((1 << last) - 1) ^ ((1 << first) - 1)) << (day * SLOTS_PER_DAY)
+    return grid
+
+
+def common_grid(grids):
+    """Slots free in every grid"""
+    common = (1 << GRID_BITS) - 1
+    for grid in grids:
+        common &= grid
+    return common
+
+
+def common_slots(availabilities):
+    """Free intervals shared by every stored Profile.availability, with their total minutes"""
+    grid = common_grid(decode_grid(data) for data in availabilities)
+    return grid_to_slots(grid), bin(grid).count("1") * SLOT_MINUTES
@@ -0,0 +1,121 @@
+import numpy as np
+from services.matching import SCHEDULE_INDICATORS
+
+# Number of set bits for every possible schedule mask
+_POPCOUNT = np.array([bin(mask).count("1") for mask in range(1 << len(SCHEDULE_INDICATORS))], dtype=np.int64)
+
+NO_TIER = -1
+
+
+class CandidateMatrix:
+    """
+    Column-oriented matching features of a set of candidates, so one user can
+    be scored against all of them with a handful of NumPy operations.
+
+    Interests are stored CSR-style (indptr/indices into a token vocabulary),
+    specializations as integer codes (-1 when missing) and schedules as the
+    6-bit indicator mask (-1 when missing).
+    """
+
+    def __init__(self, user_ids, indptr, indices, vocabulary, specialization_codes, specializations, schedule_masks,
+                 interest_counts=None, token_rows=None):
+        self.user_ids = user_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.vocabulary = vocabulary
+        self.specialization_codes = specialization_codes
+        self.specializations = specializations
+        self.schedule_masks = schedule_masks
+        # Derived columns can be passed in precomputed, e.g. from a ProfileSnapshot
+        self.interest_counts = np.diff(indptr) if interest_counts is None else interest_counts
+        # Row number of every stored token, used to sum token hits per candidate
+        if token_rows is None:
+            token_rows = np.repeat(np.arange(len(user_ids)), self.interest_counts)
+        self.token_rows = token_rows
+
+    @classmethod
+    def from_features(cls, user_ids, features_list):
+        """Pack (user_id, MatchFeatures) pairs into arrays"""
+        vocabulary = {}
+        specializations = {}
+        indices = []
+        indptr = [0]
+        specialization_codes = []
+        schedule_masks = []
+
+        for features in features_list:
+            for token in features.interests:
+                indices.append(vocabulary.setdefault(token, len(vocabulary)))
+            indptr.append(len(indices))
+            if features.specialization:
+                specialization_codes.append(specializations.setdefault(features.specialization, len(specializations)))
+            else:
+                specialization_codes.append(-1)
+            schedule_masks.append(-1 if features.schedule_mask is None else features.schedule_mask)
+
+        return cls(
+            np.asarray(user_ids, dtype=np.int64),
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64),
+            vocabulary,
+            np.asarray(specialization_codes, dtype=np.int64),
+            specializations,
+            np.asarray(schedule_masks, dtype=np.int64),
+        )
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def score(self, features):
+        """
+        Score one user's features against every candidate.
+
+        Returns (compatibility, tier) arrays aligned with user_ids; they match
+        services.matching.compatibility_from_features and match_tier exactly,
+        with NO_TIER where match_tier would return None.
+        """
+        n = len(self.user_ids)
+
+        # Interests (40% of score)
+        own_interests = len(features.interests)
+        hits = np.zeros(len(self.vocabulary), dtype=bool)
+        token_ids = [self.vocabulary[t] for t in features.interests if t in self.vocabulary]
+        hits[token_ids] = True
+        common = np.bincount(self.token_rows, weights=hits[self.indices], minlength=n)
+
+        has_interests = self.interest_counts > 0
+        if own_interests:
+            largest = np.maximum(self.interest_counts, own_interests)
+            score = np.where(has_interests, (common / largest) * 40, 0.0)
+        else:
+            # Both have no interests specified - give partial score
+            score = np.where(has_interests, 0.0, 20.0)
+
+        # Specialization (30% of score)
+        has_specialization = self.specialization_codes >= 0
+        if features.specialization:
+            code = self.specializations.get(features.specialization, -2)
+            same_specialization = self.specialization_codes == code
+            score = score + np.where(same_specialization, 30.0, 0.0)
+        else:
+            same_specialization = np.zeros(n, dtype=bool)
+            score = score + np.where(has_specialization, 0.0, 15.0)
+
+        # Schedule (30% of score)
+        has_schedule = self.schedule_masks >= 0
+        if features.schedule_mask is not None:
+            shared = np.where(has_schedule, self.schedule_masks & features.schedule_mask, 0)
+            matches = _POPCOUNT[shared]
+            score = score + np.where(has_schedule, (matches / len(SCHEDULE_INDICATORS)) * 30, 0.0)
+        else:
+            shared = np.zeros(n, dtype=np.int64)
+            score = score + np.where(has_schedule, 0.0, 15.0)
+
+        compatibility = np.minimum(np.round(score), 100).astype(np.int64)
+
+        tier = np.full(n, NO_TIER, dtype=np.int64)
+        tier[shared != 0] = 2
+        tier[common > 0] = 1
+        tier[same_specialization] = 0
+
+        return compatibility, tier
@@ -0,0 +1,167 @@
+import json
+import logging
+import select
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads must be shorter than 8000 bytes
+MAX_NOTIFY_BYTES = 7999
+
+
+class LocalBroker:
+    """Delivers events in the publishing process only, enough for a single worker"""
+
+    def __init__(self):
+        self.deliver = None
+
+    def start(self, deliver, on_reconnect):
+        self.deliver = deliver
+
+    def publish(self, message):
+        self.deliver(message)
+
+    def close(self):
+        self.deliver = None
+
+
+class RedisBroker:
+    """
+    Redis pub/sub. Every process subscribes to one channel from a background
+    thread and delivers the events meant for readers connected to it.
+    """
+
+    def __init__(self, url, channel="studybuddy:events", client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self.closed = False
+        self.thread = None
+
+    def start(self, deliver, on_reconnect):
+        self.thread = threading.Thread(
+            target=self._listen, args=(deliver, on_reconnect), name="event-broker", daemon=True
+        )
+        self.thread.start()
+
+    def _listen(self, deliver, on_reconnect):
+        connected_before = False
+        while not self.closed:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if connected_before:
+                    # Anything published while we were away is lost
+                    on_reconnect()
+                connected_before = True
+                while not self.closed:
+                    item = pubsub.get_message(timeout=1.0)
+                    if item is not None:
+                        deliver(json.loads(item["data"]))
+            except Exception as e:
+                logger.warning(f"Event broker connection lost: {e}")
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+    def publish(self, message):
+        self.client.publish(self.channel, json.dumps(message))
+
+    def close(self):
+        self.closed = True
+
+
+class PostgresBroker:
+    """
+    Postgres LISTEN/NOTIFY, for deployments that already run Postgres and no
+    Redis. Payloads are sent as UTF-8 JSON and must stay under 8000 bytes;
+    an event too large for that reaches its user as a "reset", so the
+    client refetches instead.
+    """
+
+    def __init__(self, url, channel="studybuddy_events"):
+        import psycopg2
+        self.psycopg2 = psycopg2
+        # SQLAlchemy URLs name the driver, libpq does not
+        self.dsn = "postgresql://" + url.split("://", 1)[1]
+        self.channel = channel
+        self.closed = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def _connect(self):
+        connection = self.psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+
+    def start(self, deliver, on_reconnect):
+        self.thread = threading.Thread(
+            target=self._listen, args=(deliver, on_reconnect), name="event-broker", daemon=True
+        )
+        self.thread.start()
+
+    def _listen(self, deliver, on_reconnect):
+        connected_before = False
+        while not self.closed:
+            connection = None
+            try:
+                connection = self._connect()
+                connection.cursor().execute(f"LISTEN {self.channel}")
+                if connected_before:
+                    on_reconnect()
+                connected_before = True
+                while not self.closed:
+                    if select.select([connection], [], [], 1.0)[0]:
+                        connection.poll()
+                        while connection.notifies:
+                            deliver(json.loads(connection.notifies.pop(0).payload))
+            except Exception as e:
+                logger.warning(f"Event broker connection lost: {e}")
+                time.sleep(1)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def publish(self, message):
+        payload = json.dumps(message, ensure_ascii=False)
+        if len(payload.encode("utf-8")) > MAX_NOTIFY_BYTES:
+            logger.warning(f"{message['type']} event too large to notify, sending a reset")
+            payload = json.dumps({"user_id": message["user_id"], "type": "reset", "data": {}})
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.connection is None or self.connection.closed:
+                        self.connection = self._connect()
+                    self.connection.cursor().execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                    return
+                except self.psycopg2.OperationalError:
+                    # Stale connection, retry once on a new one
+                    self.connection = None
+                    if attempt:
+                        raise
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+def create_broker(url):
+    """
+    Broker for EVENT_BROKER_URL: "local" (default), a redis:// URL or a
+    postgresql:// URL
+    """
+    scheme = (url or "local").split("://", 1)[0].split("+", 1)[0]
+    if scheme == "local":
+        return LocalBroker()
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBroker(url)
+    if scheme in ("postgres", "postgresql"):
+        return PostgresBroker(url)
+    raise ValueError(f"Unsupported EVENT_BROKER_URL scheme: {scheme}")
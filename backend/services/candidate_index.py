@@ -0,0 +1,112 @@
+from services.matching import SCHEDULE_INDICATORS, load_profile_features
+import threading
+import time
+
+
+class CandidateIndex:
+    """
+    Inverted index from interest token, specialization key and schedule bit to
+    the ids of users whose profile has them.
+
+    A user can only be recommended if they share at least one of these with the
+    current user, so the union of the matching posting lists is the complete
+    candidate set. The index is loaded lazily, kept current by the profile
+    routes and reloaded after `ttl` seconds so other worker processes pick up
+    profile changes they did not see.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self.by_interest = {}
+        self.by_specialization = {}
+        self.by_schedule_bit = [set() for _ in SCHEDULE_INDICATORS]
+        self.features = {}
+
+    def _add(self, user_id, features):
+        self.features[user_id] = features
+        for token in features.interests:
+            self.by_interest.setdefault(token, set()).add(user_id)
+        if features.specialization:
+            self.by_specialization.setdefault(features.specialization, set()).add(user_id)
+        for bit, posting in enumerate(self.by_schedule_bit):
+            if (features.schedule_mask or 0) & (1 << bit):
+                posting.add(user_id)
+
+    def _discard(self, user_id):
+        features = self.features.pop(user_id, None)
+        if features is None:
+            return
+        for token in features.interests:
+            posting = self.by_interest.get(token)
+            if posting is not None:
+                posting.discard(user_id)
+                if not posting:
+                    del self.by_interest[token]
+        if features.specialization:
+            posting = self.by_specialization.get(features.specialization)
+            if posting is not None:
+                posting.discard(user_id)
+                if not posting:
+                    del self.by_specialization[features.specialization]
+        for posting in self.by_schedule_bit:
+            posting.discard(user_id)
+
+    def load(self):
+        """(Re)build the index from the stored profile features"""
+        self.build(load_profile_features())
+
+    def build(self, entries):
+        """Replace the index with (user_id, MatchFeatures) pairs"""
+        with self.lock:
+            self._reset()
+            for user_id, features in entries:
+                self._add(user_id, features)
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def update(self, user_id, features):
+        """Re-index one user after their profile was created or changed"""
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            self._discard(user_id)
+            self._add(user_id, features)
+
+    def remove(self, user_id):
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            self._discard(user_id)
+
+    def candidates(self, features):
+        """Ids of users sharing a specialization, interest or schedule indicator with `features`"""
+        self.ensure_loaded()
+        with self.lock:
+            result = set()
+            if features.specialization:
+                result.update(self.by_specialization.get(features.specialization, ()))
+            for token in features.interests:
+                result.update(self.by_interest.get(token, ()))
+            for bit, posting in enumerate(self.by_schedule_bit):
+                if (features.schedule_mask or 0) & (1 << bit):
+                    result.update(posting)
+            return result
+
+    def specialization_candidates(self, specialization):
+        """Ids of users with the same specialization key"""
+        if not specialization:
+            return set()
+        self.ensure_loaded()
+        with self.lock:
+            return set(self.by_specialization.get(specialization, ()))
+
+
+candidate_index = CandidateIndex()
@@ -0,0 +1,142 @@
+from extensions import db
+from models import BuddyConnection
+from sqlalchemy import or_
+from collections import OrderedDict
+import threading
+import time
+
+
+def connection_status_label(user_id, initiator_id, status):
+    """Status of a connection as seen by `user_id`"""
+    if status == "approved":
+        return "connected"
+    elif initiator_id == user_id:
+        return "request_sent"
+    else:
+        return "request_received"
+
+
+class ConnectionGraphCache:
+    """
+    Process-level adjacency cache of the buddy graph:
+    user_id -> {other_id: (initiator_id, status)}.
+
+    A user's edges are loaded with one query the first time they are needed
+    and kept for `ttl` seconds, with at most `max_users` users held in LRU
+    order. The buddies and admin routes write changes through after they
+    commit. The cache serves listings (statuses, buddy lists); access checks
+    (are_connected) re-read the pair by its canonical key, so a connection
+    accepted or removed in another worker process counts immediately.
+    """
+
+    def __init__(self, max_users=10000, ttl=60):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # user_id -> (loaded_at, {other_id: (initiator_id, status)})
+
+    def _load(self, user_id):
+        edges = {}
+        rows = db.session.query(BuddyConnection.user_id, BuddyConnection.buddy_id, BuddyConnection.status).filter(
+            or_(BuddyConnection.low_id == user_id, BuddyConnection.high_id == user_id)
+        )
+        for initiator_id, buddy_id, status in rows:
+            other_id = buddy_id if initiator_id == user_id else initiator_id
+            edges[other_id] = (initiator_id, status)
+
+        with self.lock:
+            self.entries[user_id] = (time.monotonic(), edges)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_users:
+                self.entries.popitem(last=False)
+            return dict(edges)
+
+    def edges(self, user_id, fresh=False):
+        """
+        {other_id: (initiator_id, status)} for every connection of the user,
+        a copy the caller may iterate while other threads write through
+        """
+        if not fresh:
+            with self.lock:
+                entry = self.entries.get(user_id)
+                if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                    self.entries.move_to_end(user_id)
+                    return dict(entry[1])
+        return self._load(user_id)
+
+    def _load_pair(self, user_id, other_id):
+        low_id, high_id = BuddyConnection.pair_key(user_id, other_id)
+        row = db.session.query(BuddyConnection.user_id, BuddyConnection.buddy_id, BuddyConnection.status).filter(
+            BuddyConnection.low_id == low_id, BuddyConnection.high_id == high_id
+        ).first()
+        if row is None:
+            self.remove_edge(user_id, other_id)
+            return None
+        self.set_edge(*row)
+        return (row.user_id, row.status)
+
+    def edge(self, user_id, other_id, fresh=False):
+        """
+        (initiator_id, status) of the connection between two users, or None.
+        With `fresh` only this pair is re-read, a single probe of the
+        unique (low_id, high_id) index.
+        """
+        if fresh:
+            return self._load_pair(user_id, other_id)
+        return self.edges(user_id).get(other_id)
+
+    def are_connected(self, user_id, other_id):
+        """
+        True when the two users have an approved connection. Grants access,
+        so the pair is always re-read (one index probe), never taken from
+        the cache.
+        """
+        edge = self.edge(user_id, other_id, fresh=True)
+        return edge is not None and edge[1] == "approved"
+
+    def statuses(self, user_id, fresh=False):
+        """Map each connected or requested user's id to its status label"""
+        return {
+            other_id: connection_status_label(user_id, initiator_id, status)
+            for other_id, (initiator_id, status) in self.edges(user_id, fresh=fresh).items()
+        }
+
+    def connected_ids(self, user_id):
+        """Ids of the user's approved buddies"""
+        return [other_id for other_id, (_, status) in self.edges(user_id).items() if status == "approved"]
+
+    def set_edge(self, initiator_id, buddy_id, status):
+        """Write a created or updated connection through to both cached users"""
+        with self.lock:
+            for user_id, other_id in ((initiator_id, buddy_id), (buddy_id, initiator_id)):
+                entry = self.entries.get(user_id)
+                if entry is not None:
+                    entry[1][other_id] = (initiator_id, status)
+
+    def remove_edge(self, user_id, other_id):
+        """Forget a deleted connection in both cached users"""
+        with self.lock:
+            for a, b in ((user_id, other_id), (other_id, user_id)):
+                entry = self.entries.get(a)
+                if entry is not None:
+                    entry[1].pop(b, None)
+
+    def remove_user(self, user_id):
+        """Drop a deleted user and every cached edge pointing at them"""
+        with self.lock:
+            self.entries.pop(user_id, None)
+            for _, edges in self.entries.values():
+                edges.pop(user_id, None)
+
+
+connection_graph = ConnectionGraphCache()
+
+
+def connection_status_map(user_id, fresh=False):
+    """
+    Map the id of every user with a connection to `user_id` to its status
+    ("connected", "request_sent" or "request_received"). Users missing from
+    the map are "not_connected". With `fresh` the user's connections are
+    re-read from the database instead of the cache.
+    """
+    return connection_graph.statuses(user_id, fresh=fresh)
@@ -0,0 +1,146 @@
+from extensions import db
+from models import Conversation, Message, User, Profile
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def _pair(user_id, other_id):
+    return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+
+def _last_read_column(user_id, low_id):
+    return Conversation.user1_last_read_id if user_id == low_id else Conversation.user2_last_read_id
+
+
+def conversation_id_for(user_id, other_id):
+    """Id of the conversation between two users, creating the row on their first message"""
+    low_id, high_id = _pair(user_id, other_id)
+    query = db.session.query(Conversation.id).filter(
+        Conversation.user1_id == low_id, Conversation.user2_id == high_id
+    )
+    conversation_id = query.scalar()
+    if conversation_id is not None:
+        return conversation_id
+
+    values = {"user1_id": low_id, "user2_id": high_id, "user1_last_read_id": 0, "user2_last_read_id": 0}
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        # Both participants may send their first message at the same time
+        insert = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(Conversation)
+        db.session.execute(insert.values(**values).on_conflict_do_nothing(index_elements=["user1_id", "user2_id"]))
+    else:
+        db.session.add(Conversation(**values))
+        db.session.flush()
+    return query.scalar()
+
+
+def record_message(message):
+    """
+    Attach a new message to its conversation and move the conversation's
+    last message and last activity to it. Call before committing the message.
+    """
+    message.conversation_id = conversation_id_for(message.sender_id, message.receiver_id)
+    db.session.flush()
+
+    # Concurrent sends may commit out of order, never move the pointer back
+    is_newer = or_(Conversation.last_message_id.is_(None), Conversation.last_message_id < message.id)
+    Conversation.query.filter(Conversation.id == message.conversation_id).update({
+        Conversation.last_message_id: case((is_newer, message.id), else_=Conversation.last_message_id),
+        Conversation.last_activity: case((is_newer, message.timestamp), else_=Conversation.last_activity)
+    }, synchronize_session=False)
+
+
+def repoint_conversations():
+    """
+    Move the last message and last activity of every conversation whose
+    last message was deleted to the newest message left between the pair,
+    or clear the last message when none is. Call before committing a bulk
+    message delete.
+    """
+    newest_id = db.session.query(func.max(Message.id)).filter(or_(
+        and_(Message.sender_id == Conversation.user1_id, Message.receiver_id == Conversation.user2_id),
+        and_(Message.sender_id == Conversation.user2_id, Message.receiver_id == Conversation.user1_id)
+    )).correlate(Conversation).scalar_subquery()
+    newest_timestamp = db.session.query(Message.timestamp).filter(Message.id == newest_id).scalar_subquery()
+    last_message_exists = db.session.query(Message.id).filter(Message.id == Conversation.last_message_id).exists()
+
+    return Conversation.query.filter(
+        Conversation.last_message_id.isnot(None), ~last_message_exists
+    ).update({
+        Conversation.last_message_id: newest_id,
+        Conversation.last_activity: func.coalesce(newest_timestamp, Conversation.last_activity)
+    }, synchronize_session=False)
+
+
+def last_read_ids(user_id, other_id):
+    """{user_id: watermark, other_id: watermark}, 0 for both before the first message"""
+    low_id, high_id = _pair(user_id, other_id)
+    row = db.session.query(Conversation.user1_last_read_id, Conversation.user2_last_read_id).filter(
+        Conversation.user1_id == low_id, Conversation.user2_id == high_id
+    ).first()
+    user1_last_read_id, user2_last_read_id = row if row else (0, 0)
+    return {low_id: user1_last_read_id, high_id: user2_last_read_id}
+
+
+def is_read(message, watermarks):
+    """Whether the receiver has read `message`, given the pair's last_read_ids"""
+    return message.id <= watermarks.get(message.receiver_id, 0)
+
+
+def mark_conversation_read(user_id, other_id, up_to_id=None):
+    """
+    Move the user's read watermark for the conversation with `other_id` to
+    `up_to_id`, or to the last message when omitted. The watermark never
+    moves back or past the last message, so it stays put while the
+    conversation has none, and an unchanged one writes no row. Returns the
+    watermark, None when the users have no conversation.
+    """
+    low_id, high_id = _pair(user_id, other_id)
+    last_read = _last_read_column(user_id, low_id)
+    target = Conversation.last_message_id
+    if up_to_id is not None:
+        target = case((Conversation.last_message_id < up_to_id, Conversation.last_message_id), else_=up_to_id)
+
+    query = Conversation.query.filter(Conversation.user1_id == low_id, Conversation.user2_id == high_id)
+    # A NULL last message would fall through to up_to_id in the case above
+    query.filter(Conversation.last_message_id.isnot(None), last_read < target).update(
+        {last_read: target}, synchronize_session=False
+    )
+    return query.with_entities(last_read).scalar()
+
+
+def inbox_rows(user_id):
+    """
+    One row per conversation of the user, most recent first: the other
+    user's id, username, avatar and specialization, the last message and
+    the user's unread count. A single query over the
+    ix_conversations_user*_activity indexes, with unread messages counted
+    past the read watermark on ix_messages_pair.
+    """
+    is_user1 = Conversation.user1_id == user_id
+    other_id = case((is_user1, Conversation.user2_id), else_=Conversation.user1_id)
+    last_read = case((is_user1, Conversation.user1_last_read_id), else_=Conversation.user2_last_read_id)
+    unread = db.session.query(func.count(Message.id)).filter(
+        Message.sender_id == other_id,
+        Message.receiver_id == user_id,
+        Message.id > last_read
+    ).correlate(Conversation).scalar_subquery()
+
+    last_message = db.aliased(Message)
+    return db.session.query(
+        User.id.label("user_id"),
+        User.username,
+        User.avatar,
+        Profile.specialization,
+        last_message.content.label("last_message"),
+        last_message.timestamp.label("last_message_time"),
+        unread.label("unread_count")
+    ).select_from(Conversation).join(
+        User, User.id == other_id
+    ).join(
+        Profile, Profile.user_id == User.id
+    ).outerjoin(
+        last_message, last_message.id == Conversation.last_message_id
+    ).filter(
+        or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id)
+    ).order_by(Conversation.last_activity.desc()).all()
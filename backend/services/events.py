@@ -0,0 +1,209 @@
+from collections import deque
+from services.broker import LocalBroker
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Channel:
+    __slots__ = ("events", "evicted_id", "condition", "listeners", "last_active")
+
+    def __init__(self, lock, replay_size):
+        self.events = deque(maxlen=replay_size)  # (event_id, event_type, data)
+        self.evicted_id = 0  # newest event that fell out of the buffer
+        self.condition = threading.Condition(lock)
+        self.listeners = 0
+        self.last_active = time.monotonic()
+
+
+class EventHub:
+    """
+    Publish hub for realtime delivery to logged-in users.
+
+    Events are published through a broker (services.broker) and every
+    process delivers the ones it receives to its own readers, so a message
+    sent in one worker reaches a stream held open by another. The default
+    local broker delivers in the publishing process only.
+
+    Each user has a channel holding their last `replay_size` delivered
+    events. Event ids increase within the process, and a reader asks for
+    everything after the last id it saw. Cursors handed to clients carry the
+    process epoch, so a client reconnecting to another worker or after a
+    restart is told to refetch. The same `wait` call backs the SSE stream,
+    which re-enters it after every batch, and the long-poll fallback, which
+    returns after one. Waiting readers block on their channel's condition,
+    so an idle stream costs no queries and no CPU until something is
+    delivered for that user.
+    """
+
+    def __init__(self, replay_size=100, idle_ttl=600):
+        self.replay_size = replay_size
+        self.idle_ttl = idle_ttl
+        self.lock = threading.Lock()
+        self.channels = {}
+        self.epoch = os.urandom(4).hex()
+        self._ids = itertools.count(1)
+        self.last_id = 0
+        self.delivered = 0
+        self.broker = LocalBroker()
+        self.broker.start(self.deliver, self.invalidate)
+
+    def use_broker(self, broker):
+        """Switch to another broker, closing the current one"""
+        self.broker.close()
+        broker.start(self.deliver, self.invalidate)
+        self.broker = broker
+
+    def _channel(self, user_id):
+        channel = self.channels.get(user_id)
+        if channel is None:
+            channel = self.channels[user_id] = _Channel(self.lock, self.replay_size)
+        return channel
+
+    def _prune(self, now):
+        idle = [
+            user_id for user_id, channel in self.channels.items()
+            if not channel.listeners and now - channel.last_active > self.idle_ttl
+        ]
+        for user_id in idle:
+            del self.channels[user_id]
+
+    def publish(self, user_id, event_type, data):
+        """
+        Send an event to a user through the broker. Called after the change
+        is committed, so a broker failure is logged rather than raised.
+        """
+        try:
+            self.broker.publish({"user_id": user_id, "type": event_type, "data": data})
+        except Exception as e:
+            logger.error(f"Failed to publish {event_type} event: {e}", exc_info=True)
+
+    def deliver(self, message):
+        """Queue an event received from the broker and wake the user's waiting readers"""
+        with self.lock:
+            event_id = self.last_id = next(self._ids)
+            channel = self._channel(message["user_id"])
+            if len(channel.events) == channel.events.maxlen:
+                channel.evicted_id = channel.events[0][0]
+            channel.events.append((event_id, message["type"], message["data"]))
+            channel.last_active = time.monotonic()
+            channel.condition.notify_all()
+            self.delivered += 1
+            if self.delivered % 1000 == 0:
+                self._prune(channel.last_active)
+        return event_id
+
+    def invalidate(self):
+        """Events may have been lost (broker reconnected), make every reader refetch"""
+        with self.lock:
+            self.last_id = next(self._ids)
+            for channel in self.channels.values():
+                channel.evicted_id = self.last_id
+                channel.condition.notify_all()
+
+    def current_id(self):
+        """Id a new reader starts after to receive only future events"""
+        with self.lock:
+            return self.last_id
+
+    def cursor(self, event_id):
+        """Client-facing cursor for an event id"""
+        return f"{self.epoch}-{event_id}"
+
+    def parse_cursor(self, cursor):
+        """
+        (after_id, missed) for a cursor sent by a client. A missing cursor
+        starts at the next event, and one from another process or an older
+        run of this one is missed.
+        """
+        if not cursor:
+            return self.current_id(), False
+        epoch, _, event_id = cursor.partition("-")
+        if epoch != self.epoch or not event_id.isdigit():
+            return self.current_id(), True
+        return int(event_id), False
+
+    def wait(self, user_id, after_id, timeout):
+        """
+        ([(event_id, event_type, data)], missed) of the user's events after
+        `after_id`, blocking up to `timeout` seconds for the first one.
+        `missed` is True when events after `after_id` are no longer held
+        (they fell out of the replay buffer or the broker dropped them), so
+        the reader should refetch instead of relying on the stream.
+        """
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            channel = self._channel(user_id)
+            channel.listeners += 1
+            try:
+                while True:
+                    events = [event for event in channel.events if event[0] > after_id]
+                    missed = after_id < channel.evicted_id
+                    if events or missed:
+                        return events, missed
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return [], False
+                    channel.condition.wait(remaining)
+            finally:
+                channel.listeners -= 1
+                channel.last_active = time.monotonic()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "channels": len(self.channels),
+                "listeners": sum(channel.listeners for channel in self.channels.values()),
+                "delivered": self.delivered,
+                "broker": type(self.broker).__name__
+            }
+
+
+event_hub = EventHub()
+
+
+def format_sse(cursor, event_type, data):
+    """One Server-Sent Events frame"""
+    return f"id: {cursor}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+def serialize_message(message, read=False):
+    """`read` comes from the receiver's read watermark, see services.conversations"""
+    return {
+        "id": message.id,
+        "senderId": message.sender_id,
+        "receiverId": message.receiver_id,
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat(),
+        "read": read,
+        "type": message.message_type
+    }
+
+
+def serialize_notification(notification):
+    return {
+        "id": notification.id,
+        "type": notification.type,
+        "title": notification.title,
+        "message": notification.message,
+        "timestamp": notification.timestamp.isoformat(),
+        "read": notification.read,
+        "data": notification.data
+    }
+
+
+def publish_message(message):
+    """Push a committed chat message to both participants (the sender's other tabs too)"""
+    payload = serialize_message(message)
+    event_hub.publish(message.receiver_id, "message", payload)
+    event_hub.publish(message.sender_id, "message", payload)
+
+
+def publish_notification(notification):
+    """Push a committed notification to its user"""
+    event_hub.publish(notification.user_id, "notification", serialize_notification(notification))
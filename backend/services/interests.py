@@ -0,0 +1,85 @@
+from extensions import db
+from models import Interest, InterestAlias, Profile, profile_interests
+from sqlalchemy.dialects import postgresql, sqlite
+from collections import defaultdict
+import threading
+import time
+
+
+class InterestTaxonomy:
+    """
+    Alias map folding the spellings of an interest into one canonical name
+    ("ml", "machine-learning" -> "machine learning").
+
+    Aliases live in the interest_aliases table and are cached per process,
+    reloaded after `ttl` seconds. Folding happens when a profile is written,
+    so the stored interest_keys and profile_interests rows are canonical and
+    overlap counts compare like with like.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self.aliases = {}
+
+    def load(self):
+        rows = db.session.query(InterestAlias.alias, Interest.name).join(
+            Interest, InterestAlias.interest_id == Interest.id
+        ).all()
+        with self.lock:
+            self.aliases = dict(rows)
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def fold(self, tokens):
+        """Sorted canonical names for normalized interest tokens"""
+        if not tokens:
+            return []
+        self.ensure_loaded()
+        with self.lock:
+            return sorted({self.aliases.get(token, token) for token in tokens})
+
+
+interest_taxonomy = InterestTaxonomy()
+
+
+def interest_tags(names):
+    """Interest rows for canonical names, inserting the missing ones"""
+    if not names:
+        return []
+    existing = {interest.name: interest for interest in Interest.query.filter(Interest.name.in_(names))}
+    missing = [name for name in names if name not in existing]
+    if missing:
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            # Two profiles may introduce the same interest at the same time
+            insert = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(Interest)
+            db.session.execute(insert.values([{"name": name} for name in missing]).on_conflict_do_nothing(
+                index_elements=["name"]
+            ))
+        else:
+            db.session.add_all(Interest(name=name) for name in missing)
+            db.session.flush()
+        existing.update((interest.name, interest) for interest in Interest.query.filter(Interest.name.in_(missing)))
+    return [existing[name] for name in names]
+
+
+def profile_interest_names(*criteria):
+    """
+    user_id -> frozenset of canonical interest names for the profiles
+    matching the Profile `criteria`, read through the profile_interests join.
+    Profiles without interests map to an empty set.
+    """
+    names = defaultdict(set)
+    rows = db.session.query(Profile.user_id, Interest.name).join(
+        profile_interests, profile_interests.c.profile_id == Profile.id
+    ).join(
+        Interest, Interest.id == profile_interests.c.interest_id
+    ).filter(*criteria)
+    for user_id, name in rows:
+        names[user_id].add(name)
+    return defaultdict(frozenset, ((user_id, frozenset(tags)) for user_id, tags in names.items()))
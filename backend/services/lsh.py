@@ -0,0 +1,147 @@
+from extensions import db
+from models import Profile
+import hashlib
+import numpy as np
+import threading
+import time
+
+# Largest prime below 2**32, so (a * x + b) for 32-bit a, x, b fits in uint64
+_PRIME = np.uint64(4294967291)
+_SEED = 20250909
+
+
+def _token_hash(token):
+    """Stable 32-bit hash of an interest token, identical across processes"""
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class InterestLSH:
+    """
+    MinHash signatures of interest sets with banded locality-sensitive hashing.
+
+    Each profile's interest tokens are reduced to `bands * rows` MinHash
+    values (stored in Profile.interest_signature). The signature is cut into
+    `bands` bands of `rows` values and every band is a bucket key, so two
+    profiles land in a common bucket with probability 1 - (1 - J**rows)**bands
+    for interest Jaccard similarity J. More rows per band favour high overlap,
+    more bands raise recall at the cost of bigger candidate sets.
+
+    Only used when MATCHING_CANDIDATE_MODE is "lsh"; the index is loaded
+    lazily, kept current by the profile routes and reloaded after `ttl` seconds
+    like the exact CandidateIndex.
+    """
+
+    def __init__(self, bands=32, rows=2, ttl=300, enabled=False):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.configure(bands, rows)
+
+    def configure(self, bands, rows):
+        """Set the banding; signatures of another length are recomputed on load"""
+        self.bands = bands
+        self.rows = rows
+        self.num_perm = bands * rows
+        rng = np.random.default_rng(_SEED)
+        self.a = rng.integers(1, int(_PRIME), size=self.num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=self.num_perm, dtype=np.uint64)
+        self.loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self.buckets = {}  # (band, band bytes) -> set of user ids
+        self.signatures = {}
+
+    def signature(self, tokens):
+        """MinHash signature (uint32 array) of a set of interest tokens, None when empty"""
+        if not tokens:
+            return None
+        hashes = np.fromiter((_token_hash(token) for token in tokens), dtype=np.uint64) % _PRIME
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def encode(self, signature):
+        """Column value for Profile.interest_signature"""
+        return None if signature is None else signature.astype("<u4").tobytes()
+
+    def decode(self, value, interest_keys):
+        """
+        Signature from a stored column value, recomputed from the interest
+        tokens when missing or made with a different number of permutations
+        """
+        if value is not None and len(value) == self.num_perm * 4:
+            return np.frombuffer(value, dtype="<u4").astype(np.uint32)
+        tokens = interest_keys.split(',') if interest_keys else []
+        return self.signature(tokens)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _add(self, user_id, signature):
+        if signature is None:
+            return
+        self.signatures[user_id] = signature
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, set()).add(user_id)
+
+    def _discard(self, user_id):
+        signature = self.signatures.pop(user_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(user_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def build(self, signatures):
+        """Replace the buckets with (user_id, signature) pairs"""
+        with self.lock:
+            self._reset()
+            for user_id, signature in signatures:
+                self._add(user_id, signature)
+            self.loaded_at = time.monotonic()
+
+    def load(self):
+        """(Re)build the buckets from the stored signatures"""
+        rows = db.session.query(Profile.user_id, Profile.interest_signature, Profile.interest_keys).all()
+        self.build((user_id, self.decode(value, interest_keys)) for user_id, value, interest_keys in rows)
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def update(self, user_id, signature):
+        """Re-bucket one user after their interests changed"""
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            self._discard(user_id)
+            self._add(user_id, signature)
+
+    def remove(self, user_id):
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            self._discard(user_id)
+
+    def candidates(self, signature):
+        """Ids of users sharing at least one band bucket with `signature`"""
+        if signature is None:
+            return set()
+        self.ensure_loaded()
+        with self.lock:
+            result = set()
+            for key in self._band_keys(signature):
+                result.update(self.buckets.get(key, ()))
+            return result
+
+
+interest_lsh = InterestLSH()
+
+
+def profile_signature(profile):
+    """MinHash signature of a profile's interests under the current banding"""
+    return interest_lsh.decode(profile.interest_signature, profile.interest_keys)
@@ -0,0 +1,228 @@
+from extensions import db
+from models import Profile
+from collections import namedtuple, OrderedDict
+from services.lsh import interest_lsh
+from services.interests import interest_taxonomy, interest_tags, profile_interest_names
+import threading
+
+# Schedule words recognised when matching, in bit order for Profile.schedule_mask
+SCHEDULE_INDICATORS = ("weekday", "weekend", "morning", "afternoon", "evening", "night")
+
+MatchFeatures = namedtuple("MatchFeatures", ["interests", "specialization", "schedule_mask"])
+
+
+def normalize_interests(interests):
+    """Turn a comma string (or list) of interests into sorted canonical tokens"""
+    if not interests:
+        return []
+    if isinstance(interests, str):
+        interests = interests.split(',')
+    return sorted({i.strip().lower() for i in interests if i and i.strip()})
+
+
+def normalize_specialization(specialization):
+    """Lowercased specialization key, or None when not specified"""
+    if not specialization or not specialization.strip():
+        return None
+    return specialization.strip().lower()
+
+
+def schedule_to_mask(schedule):
+    """Bitmask of the schedule indicators found in a free-text schedule, None when empty"""
+    if not schedule:
+        return None
+    schedule = schedule.lower()
+    mask = 0
+    for bit, indicator in enumerate(SCHEDULE_INDICATORS):
+        if indicator in schedule:
+            mask |= 1 << bit
+    return mask
+
+
+def refresh_profile_features(profile):
+    """Recompute the stored matching features after the raw profile fields change"""
+    tokens = interest_taxonomy.fold(normalize_interests(profile.interests))
+    profile.interest_keys = ",".join(tokens)
+    profile.interest_tags = interest_tags(tokens)
+    profile.interest_signature = interest_lsh.encode(interest_lsh.signature(tokens))
+    profile.specialization_key = normalize_specialization(profile.specialization)
+    profile.schedule_mask = schedule_to_mask(profile.schedule)
+    return profile
+
+
+# Profile columns needed to build MatchFeatures without loading full ORM objects
+FEATURE_COLUMNS = ("interest_keys", "specialization_key", "schedule_mask", "interests", "specialization", "schedule")
+
+
+def features_from_columns(interest_names, interest_keys, specialization_key, schedule_mask, interests, specialization, schedule):
+    """MatchFeatures from a profile's canonical interest names and a row of FEATURE_COLUMNS"""
+    if interest_keys is None:
+        # Row written before features were stored
+        return MatchFeatures(
+            frozenset(interest_taxonomy.fold(normalize_interests(interests))),
+            normalize_specialization(specialization),
+            schedule_to_mask(schedule)
+        )
+    return MatchFeatures(interest_names, specialization_key, schedule_mask)
+
+
+def profile_features(profile):
+    """
+    Read the pre-normalized features of a profile from its stored columns,
+    parsing the raw fields for rows that were never refreshed. Never writes
+    or touches the interest_tags relationship, so it is safe in read paths
+    and per-pair loops.
+    """
+    interest_names = frozenset(profile.interest_keys.split(",")) if profile.interest_keys else frozenset()
+    return features_from_columns(interest_names, *(getattr(profile, name) for name in FEATURE_COLUMNS))
+
+
+def load_profile_features(*criteria):
+    """
+    (user_id, MatchFeatures) for every profile matching the Profile
+    `criteria`, in user_id order, without loading ORM objects. Interests
+    come from the indexed profile_interests join.
+    """
+    columns = [getattr(Profile, name) for name in FEATURE_COLUMNS]
+    rows = db.session.query(Profile.user_id, *columns).filter(*criteria).order_by(Profile.user_id).all()
+    names = profile_interest_names(*criteria)
+    return [(row[0], features_from_columns(names[row[0]], *row[1:])) for row in rows]
+
+
+class CompatibilityCache:
+    """
+    Bounded LRU memo of pairwise compatibility scores.
+
+    Keys are the two user ids plus each profile's updated_at, so a profile
+    change makes its old entries unreachable; invalidate_user also frees
+    them right away. Hit and miss counters are exposed through stats().
+    """
+
+    def __init__(self, max_size=50000):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.scores = OrderedDict()
+        self.keys_by_user = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(profile1, profile2):
+        if profile1.user_id > profile2.user_id:
+            profile1, profile2 = profile2, profile1
+        return profile1.user_id, profile2.user_id, profile1.updated_at, profile2.updated_at
+
+    def _forget(self, key):
+        for user_id in key[:2]:
+            keys = self.keys_by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_user[user_id]
+
+    def get_or_compute(self, profile1, profile2):
+        key = self._key(profile1, profile2)
+        with self.lock:
+            score = self.scores.get(key)
+            if score is not None:
+                self.scores.move_to_end(key)
+                self.hits += 1
+                return score
+            self.misses += 1
+
+        score = compatibility_from_features(profile_features(profile1), profile_features(profile2))
+
+        with self.lock:
+            self.scores[key] = score
+            for user_id in key[:2]:
+                self.keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self.scores) > self.max_size:
+                evicted, _ = self.scores.popitem(last=False)
+                self._forget(evicted)
+        return score
+
+    def invalidate_user(self, user_id):
+        """Drop every cached pair involving a user whose profile changed"""
+        with self.lock:
+            for key in self.keys_by_user.pop(user_id, ()):
+                self.scores.pop(key, None)
+                self._forget(key)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.scores),
+                "maxSize": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+compatibility_cache = CompatibilityCache()
+
+
+def calculate_compatibility(profile1, profile2):
+    """
+    Calculate compatibility score between two profiles, memoized per profile version
+    """
+    return compatibility_cache.get_or_compute(profile1, profile2)
+
+
+def compatibility_from_features(features1, features2):
+    """
+    Interests are worth 40%, specialization 30% and schedule 30% of the score
+    """
+    score = 0
+
+    # Check interests (40% of score)
+    if features1.interests and features2.interests:
+        common_interests = features1.interests & features2.interests
+        interest_score = (len(common_interests) / max(len(features1.interests), len(features2.interests))) * 40
+        score += interest_score
+    elif not features1.interests and not features2.interests:
+        # Both have no interests specified - give partial score
+        score += 20
+
+    # Check specialization (30% of score)
+    if features1.specialization and features2.specialization:
+        if features1.specialization == features2.specialization:
+            score += 30
+    elif not features1.specialization and not features2.specialization:
+        # Both have no specialization specified - give partial score
+        score += 15
+
+    # Check schedule (30% of score)
+    if features1.schedule_mask is not None and features2.schedule_mask is not None:
+        matches = bin(features1.schedule_mask & features2.schedule_mask).count("1")
+        schedule_score = (matches / len(SCHEDULE_INDICATORS)) * 30
+        score += schedule_score
+    elif features1.schedule_mask is None and features2.schedule_mask is None:
+        # Both have no schedule specified - give partial score
+        score += 15
+
+    return min(round(score), 100)
+
+
+def match_tier(features1, features2):
+    """
+    Recommendation priority of a pair: 0 same specialization, 1 common
+    interests, 2 overlapping schedule, None when nothing matches
+    """
+    if features1.specialization and features1.specialization == features2.specialization:
+        return 0
+    if features1.interests & features2.interests:
+        return 1
+    if (features1.schedule_mask or 0) & (features2.schedule_mask or 0):
+        return 2
+    return None
+
+
+def split_interests(profile):
+    """Interests as entered by the user, for API responses"""
+    if not profile.interests:
+        return []
+    if isinstance(profile.interests, str):
+        return [i.strip() for i in profile.interests.split(',')]
+    return profile.interests
@@ -0,0 +1,48 @@
+from extensions import db
+from models import Message
+
+
+def _directions(user_id, other_id):
+    return ((user_id, other_id), (other_id, user_id))
+
+
+def pair_messages(user_id, other_id, after_id=None, before_id=None, limit=50):
+    """
+    (messages, has_more) for a page of the conversation between two users,
+    newest first.
+
+    Without a cursor this is the latest `limit` messages. `after_id` returns
+    the messages newer than it (the oldest `limit` of them when there are
+    more, so the caller can continue from the newest id it got) and
+    `before_id` the `limit` messages older than it. Each direction of the
+    conversation is a range scan of ix_messages_pair from the cursor,
+    limited to the page, so the cost follows the page size rather than the
+    conversation length and no COUNT is needed. `after_id` wins over
+    `before_id`.
+    """
+    rows = []
+    for sender_id, receiver_id in _directions(user_id, other_id):
+        query = Message.query.filter(Message.sender_id == sender_id, Message.receiver_id == receiver_id)
+        if after_id is not None:
+            query = query.filter(Message.id > after_id).order_by(Message.id.asc())
+        else:
+            if before_id is not None:
+                query = query.filter(Message.id < before_id)
+            query = query.order_by(Message.id.desc())
+        rows.extend(query.limit(limit + 1).all())
+
+    rows.sort(key=lambda message: message.id, reverse=after_id is None)
+    page = rows[:limit]
+    if after_id is not None:
+        page.reverse()
+    return page, len(rows) > limit
+
+
+def pair_message_count(user_id, other_id):
+    """Number of messages between two users, counted on the pair index"""
+    return sum(
+        db.session.query(db.func.count(Message.id)).filter(
+            Message.sender_id == sender_id, Message.receiver_id == receiver_id
+        ).scalar()
+        for sender_id, receiver_id in _directions(user_id, other_id)
+    )
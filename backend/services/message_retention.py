@@ -1,4 +1,5 @@
 from models import Message, db
+from services.conversations import repoint_conversations
 from datetime import datetime, timedelta
 from sqlalchemy.exc import SQLAlchemyError
 import threading
@@ -47,6 +48,10 @@ class MessageRetentionService:
                 Message.timestamp < retention_period
             ).delete()
             
+            # Inbox rows must not point at the messages just deleted
+            if deleted_count > 0:
+                repoint_conversations()
+            
             db.session.commit()
             
             if deleted_count > 0:
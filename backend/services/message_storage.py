@@ -2,6 +2,7 @@ from models import Message, db
 from datetime import datetime, timedelta
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import or_, and_
+from services.conversations import record_message, last_read_ids, is_read
 
 class SimpleMessageStorage:
     def __init__(self, app):
@@ -24,6 +25,7 @@ class SimpleMessageStorage:
             )
             
             db.session.add(message)
+            record_message(message)
             db.session.commit()
             
             # Check if we need to cleanup old messages for this conversation
@@ -52,6 +54,7 @@ class SimpleMessageStorage:
                 )
             ).order_by(Message.timestamp.desc()).limit(limit).all()
             
+            watermarks = last_read_ids(user1_id, user2_id)
             formatted_messages = []
             for message in messages:
                 formatted_messages.append({
@@ -61,7 +64,7 @@ class SimpleMessageStorage:
                     "content": message.content,
                     "timestamp": message.timestamp.isoformat(),
                     "type": message.message_type,
-                    "read": message.read
+                    "read": is_read(message, watermarks)
                 })
             
             return formatted_messages
@@ -0,0 +1,115 @@
+from extensions import db
+from models import User, BuddyConnection
+import heapq
+import threading
+import time
+
+
+class StudyNetwork:
+    """
+    Connected components of the approved buddy graph, as a union-find over
+    every user id (path halving, union by size).
+
+    Accepted connections and new users are applied incrementally, and the
+    component count, largest cluster and number of isolated users are kept
+    up to date as unions happen. Union-find cannot split a component, so a
+    removed connection or deleted user only marks the structure stale; it is
+    rebuilt on the next read, and in any case every `rebuild_interval`
+    seconds so other worker processes' changes are picked up.
+    """
+
+    def __init__(self, rebuild_interval=3600):
+        self.rebuild_interval = rebuild_interval
+        self.lock = threading.Lock()
+        self.built_at = None
+        self.stale = False
+        self._reset()
+
+    def _reset(self):
+        self.parent = {}
+        self.size = {}
+        self.components = 0
+        self.isolated = 0
+        self.largest = 0
+
+    def _add(self, user_id):
+        if user_id in self.parent:
+            return
+        self.parent[user_id] = user_id
+        self.size[user_id] = 1
+        self.components += 1
+        self.isolated += 1
+        self.largest = max(self.largest, 1)
+
+    def _find(self, user_id):
+        parent = self.parent
+        while parent[user_id] != user_id:
+            parent[user_id] = parent[parent[user_id]]
+            user_id = parent[user_id]
+        return user_id
+
+    def _union(self, a, b):
+        if a not in self.parent or b not in self.parent:
+            return
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.isolated -= (self.size[root_a] == 1) + (self.size[root_b] == 1)
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size.pop(root_b)
+        self.components -= 1
+        self.largest = max(self.largest, self.size[root_a])
+
+    def rebuild(self):
+        """Recompute the components from every user and approved connection"""
+        user_ids = [row[0] for row in db.session.query(User.id)]
+        edges = db.session.query(BuddyConnection.user_id, BuddyConnection.buddy_id).filter(
+            BuddyConnection.status == "approved"
+        ).all()
+
+        with self.lock:
+            self._reset()
+            for user_id in user_ids:
+                self._add(user_id)
+            for a, b in edges:
+                self._union(a, b)
+            self.built_at = time.time()
+            self.stale = False
+
+    def ensure_current(self):
+        if self.built_at is None or self.stale or time.time() - self.built_at > self.rebuild_interval:
+            self.rebuild()
+
+    def add_user(self, user_id):
+        if self.built_at is None:
+            return
+        with self.lock:
+            self._add(user_id)
+
+    def connect(self, user_id, other_id):
+        """Merge the clusters of two users after their connection was approved"""
+        if self.built_at is None:
+            return
+        with self.lock:
+            self._union(user_id, other_id)
+
+    def mark_stale(self):
+        """A connection or user was removed, components may have split"""
+        self.stale = True
+
+    def stats(self, top=10):
+        self.ensure_current()
+        with self.lock:
+            return {
+                "totalUsers": len(self.parent),
+                "components": self.components,
+                "largestCluster": self.largest,
+                "isolatedUsers": self.isolated,
+                "clusterSizes": heapq.nlargest(top, (size for size in self.size.values() if size > 1)),
+                "builtAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.built_at))
+            }
+
+
+study_network = StudyNetwork()
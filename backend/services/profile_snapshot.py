@@ -0,0 +1,240 @@
+from extensions import db
+from models import Profile, ProfileChange
+from services.matching import load_profile_features
+from services.batch_matching import CandidateMatrix
+from flask import current_app
+from sqlalchemy import func
+from datetime import datetime
+import json
+import logging
+import mmap
+import numpy as np
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SBSNAP01"
+_ALIGN = 8
+
+# Column name, dtype and length ("count", "count + 1" or "tokens"), in file order
+COLUMNS = (
+    ("user_ids", "<i8", "count"),
+    ("indptr", "<i8", "count + 1"),
+    ("interest_counts", "<i4", "count"),
+    ("specialization_codes", "<i4", "count"),
+    ("schedule_masks", "<i1", "count"),
+    ("level_codes", "<i1", "count"),
+    ("indices", "<i4", "tokens"),
+    ("token_rows", "<i4", "tokens"),
+)
+
+
+def _padding(offset):
+    return -offset % _ALIGN
+
+
+def write_profile_snapshot(path):
+    """
+    Write every profile's matching features to `path` as a columnar snapshot.
+
+    The file is written next to `path` and moved over it with os.replace, so
+    readers either see the previous snapshot or the complete new one. The
+    header records the last profile_changes id the snapshot covers; the log
+    up to it is pruned once the file is in place. Returns the number of
+    profiles written.
+    """
+    built_at = datetime.utcnow()
+    # Read before the profiles, a change logged in between is applied twice, never missed
+    change_id = db.session.query(func.max(ProfileChange.id)).scalar() or 0
+    entries = load_profile_features()
+    level_of = dict(db.session.query(Profile.user_id, Profile.level))
+
+    matrix = CandidateMatrix.from_features([user_id for user_id, _ in entries], [features for _, features in entries])
+    levels = {}
+    level_codes = [
+        levels.setdefault(level, len(levels)) if level else -1
+        for level in (level_of.get(user_id) for user_id, _ in entries)
+    ]
+
+    arrays = {
+        "user_ids": matrix.user_ids,
+        "indptr": matrix.indptr,
+        "interest_counts": matrix.interest_counts,
+        "specialization_codes": matrix.specialization_codes,
+        "schedule_masks": matrix.schedule_masks,
+        "level_codes": np.asarray(level_codes),
+        "indices": matrix.indices,
+        "token_rows": matrix.token_rows,
+    }
+    header = json.dumps({
+        "built_at": built_at.isoformat(),
+        "change_id": change_id,
+        "count": len(entries),
+        "tokens": len(matrix.indices),
+        "vocabulary": sorted(matrix.vocabulary, key=matrix.vocabulary.get),
+        "specializations": sorted(matrix.specializations, key=matrix.specializations.get),
+        "levels": sorted(levels, key=levels.get),
+    }).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".profile_snapshot.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            f.write(b"\0" * _padding(f.tell()))
+            for name, dtype, _ in COLUMNS:
+                f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+                f.write(b"\0" * _padding(f.tell()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    ProfileChange.query.filter(ProfileChange.id <= change_id).delete(synchronize_session=False)
+    db.session.commit()
+    return len(entries)
+
+
+def changed_profile_features(since_id):
+    """
+    Ids of the users logged in profile_changes after `since_id`, and
+    (user_id, MatchFeatures) for those that still have a profile.
+    """
+    changed = db.session.query(ProfileChange.user_id).filter(ProfileChange.id > since_id).distinct()
+    changed_ids = {user_id for user_id, in changed}
+    if not changed_ids:
+        return changed_ids, []
+    return changed_ids, load_profile_features(Profile.user_id.in_(changed.scalar_subquery()))
+
+
+class ProfileSnapshot:
+    """
+    Read-only view of a snapshot file.
+
+    Every column is a NumPy array over one shared read-only mmap, so all
+    worker processes map the same page-cache pages instead of each holding
+    their own copy; only the vocabulary and specialization names are parsed
+    per process.
+    """
+    __slots__ = ("built_at", "change_id", "count", "vocabulary", "specializations", "levels", "columns", "matrix", "_mmap")
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a profile snapshot")
+
+        offset = len(MAGIC)
+        header_length = int.from_bytes(self._mmap[offset:offset + 4], "little")
+        offset += 4
+        header = json.loads(self._mmap[offset:offset + header_length])
+        offset += header_length
+        offset += _padding(offset)
+
+        self.built_at = datetime.fromisoformat(header["built_at"])
+        self.change_id = header.get("change_id", 0)
+        self.count = header["count"]
+        self.vocabulary = {token: code for code, token in enumerate(header["vocabulary"])}
+        self.specializations = {name: code for code, name in enumerate(header["specializations"])}
+        self.levels = header["levels"]
+
+        lengths = {"count": self.count, "count + 1": self.count + 1, "tokens": header["tokens"]}
+        self.columns = {}
+        for name, dtype, length in COLUMNS:
+            array = np.frombuffer(self._mmap, dtype=dtype, count=lengths[length], offset=offset)
+            self.columns[name] = array
+            offset += array.nbytes
+            offset += _padding(offset)
+
+        self.matrix = CandidateMatrix(
+            self.columns["user_ids"], self.columns["indptr"], self.columns["indices"], self.vocabulary,
+            self.columns["specialization_codes"], self.specializations, self.columns["schedule_masks"],
+            interest_counts=self.columns["interest_counts"], token_rows=self.columns["token_rows"]
+        )
+
+    def level(self, position):
+        code = int(self.columns["level_codes"][position])
+        return self.levels[code] if code >= 0 else None
+
+
+class SnapshotReader:
+    """
+    Process-level handle on the snapshot at `path`.
+
+    current() stats the file on every call and maps it again when it was
+    replaced, so a rebuild by any process is picked up by every worker on its
+    next request. Returns None when no snapshot has been written.
+
+    Profile writes are logged with record_change() and scored from the
+    database until the snapshot is rewritten; refresh_if_stale() rewrites it
+    in the background once `max_changes` writes have piled up.
+    """
+
+    def __init__(self, path=None, max_changes=1000):
+        self.path = path
+        self.max_changes = max_changes
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.identity = None
+        self.rebuilding = False
+
+    def current(self):
+        if not self.path:
+            return None
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            if identity != self.identity:
+                # The previous mapping is released once no request holds its arrays
+                self.snapshot = ProfileSnapshot(self.path)
+                self.identity = identity
+            return self.snapshot
+
+    def record_change(self, user_id):
+        """
+        Log that a user's matching features changed or their profile was
+        deleted. Part of the caller's transaction; nothing is logged while no
+        snapshot exists, the next one reads every profile anyway.
+        """
+        if self.current() is not None:
+            db.session.add(ProfileChange(user_id=user_id))
+
+    def refresh_if_stale(self):
+        """Start a background rewrite once `max_changes` writes were logged since the snapshot. Call after committing."""
+        snapshot = self.current()
+        if snapshot is None or self.rebuilding:
+            return
+        pending = db.session.query(func.count(ProfileChange.id)).filter(ProfileChange.id > snapshot.change_id).scalar()
+        if pending < self.max_changes:
+            return
+        with self.lock:
+            if self.rebuilding:
+                return
+            self.rebuilding = True
+        thread = threading.Thread(target=self._rebuild, args=(current_app._get_current_object(),))
+        thread.daemon = True
+        thread.start()
+
+    def _rebuild(self, app):
+        try:
+            with app.app_context():
+                count = write_profile_snapshot(self.path)
+            logger.info(f"Rewrote the profile snapshot with {count} profiles")
+        except Exception as e:
+            logger.error(f"Profile snapshot rewrite failed: {e}", exc_info=True)
+        finally:
+            self.rebuilding = False
+
+
+profile_snapshot = SnapshotReader()
@@ -0,0 +1,220 @@
+from flask.cli import AppGroup
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from extensions import db
+from models import BuddyConnection, BuddyRecommendation, Profile
+from services.matching import load_profile_features, normalize_interests
+from services.interests import interest_taxonomy
+from services.batch_matching import CandidateMatrix, NO_TIER
+from services.lsh import interest_lsh
+from services.profile_snapshot import profile_snapshot, write_profile_snapshot
+from services.recommendations import recommendations_per_tier
+from sqlalchemy import insert, update
+from datetime import datetime
+import click
+import numpy as np
+import os
+import time
+
+recommendations_cli = AppGroup("recommendations", help="Maintain the materialized buddy recommendations.")
+
+# Set in each worker process by _init_worker
+_matrix = None
+_features = None
+_excluded_positions = None
+_per_tier = None
+
+
+def _init_worker(user_ids, features, excluded_positions, per_tier):
+    global _matrix, _features, _excluded_positions, _per_tier
+    _matrix = CandidateMatrix.from_features(user_ids, features)
+    _features = features
+    _excluded_positions = excluded_positions
+    _per_tier = per_tier
+
+
+def _top_per_tier(keep, tier, compatibility):
+    """Positions of the best _per_tier kept candidates of each tier, ranked like rank_recommendations"""
+    selected = []
+    for value in np.unique(tier[keep]):
+        positions = np.flatnonzero(keep & (tier == value))
+        if len(positions) > _per_tier:
+            # Highest score first, lowest user id on ties
+            order = np.lexsort((_matrix.user_ids[positions], -compatibility[positions]))
+            positions = positions[order[:_per_tier]]
+        selected.append(positions)
+    return np.sort(np.concatenate(selected)) if selected else np.empty(0, dtype=np.int64)
+
+
+def _score_batch(shard, start, end):
+    """Score the users at positions [start, end) against all profiles, in a worker process"""
+    started = time.perf_counter()
+    user_ids, candidate_ids, tiers, scores = [], [], [], []
+
+    for position in range(start, end):
+        compatibility, tier = _matrix.score(_features[position])
+        keep = tier != NO_TIER
+        keep[position] = False
+        excluded = _excluded_positions.get(position)
+        if excluded:
+            keep[excluded] = False
+
+        kept = _top_per_tier(keep, tier, compatibility)
+        user_ids.append(np.full(len(kept), _matrix.user_ids[position], dtype=np.int64))
+        candidate_ids.append(_matrix.user_ids[kept])
+        tiers.append(tier[kept])
+        scores.append(compatibility[kept])
+
+    rows = tuple(np.concatenate(column) for column in (user_ids, candidate_ids, tiers, scores))
+    first_id, last_id = int(_matrix.user_ids[start]), int(_matrix.user_ids[end - 1])
+    pairs = (end - start) * (len(_matrix) - 1)
+    return shard, first_id, last_id, end - start, pairs, rows, time.perf_counter() - started
+
+
+def _replace_rows(first_id, last_id, rows, chunk_size):
+    """
+    Swap in the new lists of the users with ids in [first_id, last_id] and
+    commit, so each batch holds the write lock only briefly and readers see
+    a user's old list or their new one, never a partial one
+    """
+    BuddyRecommendation.query.filter(
+        BuddyRecommendation.user_id.between(first_id, last_id)
+    ).delete(synchronize_session=False)
+
+    user_ids, candidate_ids, tiers, scores = (column.tolist() for column in rows)
+    for start in range(0, len(user_ids), chunk_size):
+        end = start + chunk_size
+        db.session.execute(insert(BuddyRecommendation), [
+            {"user_id": u, "candidate_id": c, "tier": t, "score": s}
+            for u, c, t, s in zip(user_ids[start:end], candidate_ids[start:end], tiers[start:end], scores[start:end])
+        ])
+
+    db.session.execute(
+        update(Profile).where(Profile.user_id.between(first_id, last_id))
+        .values(recommendations_refreshed_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+@recommendations_cli.command("rebuild")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+@click.option("--shards", type=int, default=None, help="Number of user shards (default: one per worker).")
+@click.option("--batch-size", type=int, default=500, show_default=True, help="Users scored and committed together.")
+@click.option("--chunk-size", type=int, default=5000, show_default=True, help="Rows per bulk insert.")
+def rebuild_recommendations(workers, shards, batch_size, chunk_size):
+    """Recompute buddy_recommendations for all users, keeping RECOMMENDATIONS_PER_TIER per tier."""
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    started = time.perf_counter()
+
+    entries = load_profile_features()
+    user_ids = [user_id for user_id, _ in entries]
+    features = [candidate_features for _, candidate_features in entries]
+    position_of = {user_id: position for position, user_id in enumerate(user_ids)}
+
+    # Any existing connection, whatever its status, keeps a pair out of recommendations
+    excluded_positions = {}
+    for a, b in db.session.query(BuddyConnection.user_id, BuddyConnection.buddy_id):
+        if a in position_of and b in position_of:
+            excluded_positions.setdefault(position_of[a], []).append(position_of[b])
+            excluded_positions.setdefault(position_of[b], []).append(position_of[a])
+    db.session.commit()
+
+    click.echo(f"Loaded {len(user_ids)} profiles in {time.perf_counter() - started:.2f}s, "
+               f"scoring with {workers} workers over {shards} shards")
+
+    # Shards are contiguous user id ranges, cut into batches that are written as they finish
+    count = len(user_ids)
+    batches = iter([
+        (shard, batch_start, min(batch_start + batch_size, shard_end))
+        for shard, (shard_start, shard_end) in enumerate(
+            (count * shard // shards, count * (shard + 1) // shards) for shard in range(shards)
+        )
+        for batch_start in range(shard_start, shard_end, batch_size)
+    ])
+    shard_stats = {}  # shard -> [users, pairs, rows, seconds]
+
+    scoring_started = time.perf_counter()
+    total_pairs = 0
+    total_rows = 0
+    write_time = 0.0
+    per_tier = recommendations_per_tier()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(user_ids, features, excluded_positions, per_tier)) as executor:
+        pending = set()
+
+        def submit_next():
+            batch = next(batches, None)
+            if batch is not None:
+                pending.add(executor.submit(_score_batch, *batch))
+
+        # A bounded number of batches in flight keeps only their rows in memory
+        for _ in range(workers * 2):
+            submit_next()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard, first_id, last_id, users, pairs, batch_rows, elapsed = future.result()
+                submit_next()
+
+                write_started = time.perf_counter()
+                _replace_rows(first_id, last_id, batch_rows, chunk_size)
+                write_time += time.perf_counter() - write_started
+
+                total_pairs += pairs
+                total_rows += len(batch_rows[0])
+                stats = shard_stats.setdefault(shard, [0, 0, 0, 0.0])
+                stats[0] += users
+                stats[1] += pairs
+                stats[2] += len(batch_rows[0])
+                stats[3] += elapsed
+
+    for shard, (users, pairs, shard_rows, elapsed) in sorted(shard_stats.items()):
+        rate = pairs / elapsed if elapsed else 0
+        click.echo(f"  shard {shard}: {users} users, {pairs} pairs, {shard_rows} rows "
+                   f"in {elapsed:.2f}s ({rate:,.0f} pairs/s)")
+
+    # Lists of users whose profile is gone were in no batch
+    BuddyRecommendation.query.filter(
+        BuddyRecommendation.user_id.notin_(db.session.query(Profile.user_id))
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+    scoring_time = time.perf_counter() - scoring_started
+    click.echo(f"Scored {total_pairs} pairs in {scoring_time:.2f}s "
+               f"({total_pairs / scoring_time if scoring_time else 0:,.0f} pairs/s), "
+               f"wrote {total_rows} rows in {write_time:.2f}s, total {time.perf_counter() - started:.2f}s")
+
+
+@recommendations_cli.command("signatures")
+@click.option("--chunk-size", type=int, default=5000, show_default=True, help="Profiles per bulk update.")
+def rebuild_signatures(chunk_size):
+    """Store the MinHash interest signatures for the configured LSH bands and rows."""
+    started = time.perf_counter()
+    rows = db.session.query(Profile.id, Profile.interest_signature, Profile.interest_keys, Profile.interests).all()
+
+    updates = []
+    for profile_id, value, interest_keys, interests in rows:
+        if interest_keys is None:
+            interest_keys = ",".join(interest_taxonomy.fold(normalize_interests(interests)))
+        encoded = interest_lsh.encode(interest_lsh.decode(value, interest_keys))
+        if encoded != value:
+            updates.append({"id": profile_id, "interest_signature": encoded})
+
+    for start in range(0, len(updates), chunk_size):
+        db.session.execute(update(Profile), updates[start:start + chunk_size])
+    db.session.commit()
+
+    click.echo(f"Updated {len(updates)} of {len(rows)} signatures "
+               f"({interest_lsh.bands} bands x {interest_lsh.rows} rows) in {time.perf_counter() - started:.2f}s")
+
+
+@recommendations_cli.command("snapshot")
+def rebuild_snapshot():
+    """Write the memory-mapped profile snapshot shared by all workers."""
+    if not profile_snapshot.path:
+        raise click.ClickException("PROFILE_SNAPSHOT_PATH is not set")
+    started = time.perf_counter()
+    count = write_profile_snapshot(profile_snapshot.path)
+    size = os.path.getsize(profile_snapshot.path)
+    click.echo(f"Wrote {count} profiles ({size / 1024:,.0f} KiB) to {profile_snapshot.path} "
+               f"in {time.perf_counter() - started:.2f}s")
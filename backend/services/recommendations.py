@@ -0,0 +1,393 @@
+from extensions import db
+from models import BuddyRecommendation, Profile
+from services.matching import load_profile_features, profile_features, calculate_compatibility, match_tier
+from services.batch_matching import CandidateMatrix, NO_TIER
+from services.candidate_index import candidate_index
+from services.lsh import interest_lsh, profile_signature
+from services.profile_snapshot import profile_snapshot, changed_profile_features
+from services.connections import connection_status_map
+from services.social_graph import friends_of_friends
+from flask import current_app
+from sqlalchemy import or_, and_, insert, func
+from datetime import datetime
+import base64
+import json
+
+# Tier of second-degree candidates, ranked after every profile-based tier
+FRIENDS_OF_FRIENDS_TIER = 3
+
+
+def encode_cursor(key):
+    """Opaque cursor for the ranking key of the last returned recommendation"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Ranking key from a cursor, raises ValueError if it was not made by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        tier, negative_score, user_id = json.loads(base64.urlsafe_b64decode(padded))
+        return int(tier), int(negative_score), int(user_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def excluded_user_ids(user_id, fresh=False):
+    """
+    The user and everyone they already have a connection or pending request
+    with. Pass `fresh` before writing recommendation rows, so a connection
+    made in another worker is not taken from a stale cache.
+    """
+    return {user_id} | connection_status_map(user_id, fresh=fresh).keys()
+
+
+def score_candidates(profile):
+    """
+    Score the owner of `profile` against everyone they could be recommended.
+
+    Returns (candidate_id, tier, compatibility) for every candidate that
+    matches on specialization (tier 0), interests (1) or schedule (2).
+
+    With MATCHING_CANDIDATE_MODE "lsh" only users with the same
+    specialization or an LSH bucket in common are scored, so low-overlap
+    interest and schedule-only matches may be missed. Otherwise a profile
+    snapshot, when one has been written, is scored instead of the candidate
+    index.
+    """
+    features = profile_features(profile)
+    excluded = excluded_user_ids(profile.user_id, fresh=True)
+    if interest_lsh.enabled:
+        candidate_ids = (
+            candidate_index.specialization_candidates(features.specialization)
+            | interest_lsh.candidates(profile_signature(profile))
+        )
+    else:
+        snapshot = profile_snapshot.current()
+        if snapshot is not None:
+            return score_snapshot_candidates(snapshot, features, excluded)
+        candidate_ids = candidate_index.candidates(features)
+    candidate_ids -= excluded
+    if not candidate_ids:
+        return []
+
+    # Score from the stored feature columns, no ORM objects needed
+    return _score_entries(load_profile_features(Profile.user_id.in_(candidate_ids)), features)
+
+
+def _score_entries(entries, features):
+    """Score (user_id, MatchFeatures) pairs, keeping those with a tier"""
+    matrix = CandidateMatrix.from_features(
+        [user_id for user_id, _ in entries],
+        [candidate_features for _, candidate_features in entries]
+    )
+    compatibilities, tiers = matrix.score(features)
+
+    return [
+        (candidate_id, tier, compatibility)
+        for candidate_id, compatibility, tier in zip(matrix.user_ids.tolist(), compatibilities.tolist(), tiers.tolist())
+        if tier != NO_TIER
+    ]
+
+
+def score_snapshot_candidates(snapshot, features, excluded):
+    """
+    score_candidates over every profile of a snapshot. Users logged in
+    profile_changes since the snapshot was written are scored from the
+    database instead, or dropped when their profile was deleted; the log is
+    bounded by the background rewrite (see SnapshotReader.refresh_if_stale).
+    """
+    compatibilities, tiers = snapshot.matrix.score(features)
+    keep = tiers != NO_TIER
+    scored = {
+        candidate_id: (candidate_id, tier, compatibility)
+        for candidate_id, tier, compatibility in zip(
+            snapshot.matrix.user_ids[keep].tolist(), tiers[keep].tolist(), compatibilities[keep].tolist()
+        )
+    }
+
+    changed_ids, entries = changed_profile_features(snapshot.change_id)
+    for user_id in changed_ids:
+        scored.pop(user_id, None)
+    for candidate in _score_entries(entries, features):
+        scored[candidate[0]] = candidate
+
+    for user_id in excluded:
+        scored.pop(user_id, None)
+    return list(scored.values())
+
+
+def recommendations_per_tier():
+    """How many candidates are stored per user and tier (RECOMMENDATIONS_PER_TIER)"""
+    return current_app.config.get("RECOMMENDATIONS_PER_TIER", 100)
+
+
+def top_per_tier(candidates, per_tier):
+    """The best `per_tier` (candidate_id, tier, score) of each tier, in ranking order"""
+    kept = []
+    counts = {}
+    for candidate in sorted(candidates, key=lambda c: (c[1], -c[2], c[0])):
+        if counts.get(candidate[1], 0) < per_tier:
+            counts[candidate[1]] = counts.get(candidate[1], 0) + 1
+            kept.append(candidate)
+    return kept
+
+
+def trim_recommendations(user_ids, per_tier):
+    """Delete the rows ranked past `per_tier` in each tier of the given users' lists"""
+    if not user_ids:
+        return
+    rank = func.row_number().over(
+        partition_by=(BuddyRecommendation.user_id, BuddyRecommendation.tier),
+        order_by=(BuddyRecommendation.score.desc(), BuddyRecommendation.candidate_id.asc())
+    ).label("rank")
+    ranked = db.session.query(BuddyRecommendation.id, rank).filter(
+        BuddyRecommendation.user_id.in_(user_ids)
+    ).subquery()
+    surplus = db.session.query(ranked.c.id).filter(ranked.c.rank > per_tier)
+    BuddyRecommendation.query.filter(BuddyRecommendation.id.in_(surplus)).delete(synchronize_session=False)
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _tier_boundaries(user_ids, per_tier):
+    """
+    {(user_id, tier): (score, candidate_id, row_id)} of the last stored row
+    of every full tier in the given users' lists. A tier that is not full
+    holds every candidate of that tier.
+    """
+    boundaries = {}
+    rank = func.row_number().over(
+        partition_by=(BuddyRecommendation.user_id, BuddyRecommendation.tier),
+        order_by=(BuddyRecommendation.score.desc(), BuddyRecommendation.candidate_id.asc())
+    ).label("rank")
+    for chunk in _chunks(user_ids):
+        ranked = db.session.query(
+            BuddyRecommendation.id, BuddyRecommendation.user_id, BuddyRecommendation.tier,
+            BuddyRecommendation.score, BuddyRecommendation.candidate_id, rank
+        ).filter(BuddyRecommendation.user_id.in_(chunk)).subquery()
+        rows = db.session.query(
+            ranked.c.user_id, ranked.c.tier, ranked.c.score, ranked.c.candidate_id, ranked.c.id
+        ).filter(ranked.c.rank == per_tier)
+        for user_id, tier, score, candidate_id, row_id in rows:
+            boundaries[(user_id, tier)] = (score, candidate_id, row_id)
+    return boundaries
+
+
+def _write_list(user_id, candidates, per_tier):
+    """Replace the user's own list with the best `per_tier` of `candidates` in each tier"""
+    BuddyRecommendation.query.filter(BuddyRecommendation.user_id == user_id).delete(synchronize_session=False)
+    rows = [
+        {"user_id": user_id, "candidate_id": candidate_id, "tier": tier, "score": score}
+        for candidate_id, tier, score in top_per_tier(candidates, per_tier)
+    ]
+    if rows:
+        db.session.execute(insert(BuddyRecommendation), rows)
+
+
+def _rescore_lists(user_ids, per_tier, changed_id, changed_scores):
+    """
+    Recompute the lists of `user_ids` from scratch. Their pair with
+    `changed_id` is taken from `changed_scores` ({user_id: (tier, score)},
+    missing when not a candidate) rather than from indexes that only see
+    the change after commit.
+    """
+    for chunk in _chunks(user_ids):
+        for profile in Profile.query.filter(Profile.user_id.in_(chunk)):
+            candidates = [candidate for candidate in score_candidates(profile) if candidate[0] != changed_id]
+            if profile.user_id in changed_scores:
+                candidates.append((changed_id, *changed_scores[profile.user_id]))
+            _write_list(profile.user_id, candidates, per_tier)
+
+
+def refresh_user_recommendations(profile):
+    """
+    Bring every buddy_recommendations list up to date after the matching
+    fields of `profile` changed.
+
+    Each list holds the best RECOMMENDATIONS_PER_TIER candidates of each
+    tier, so the table stores O(users) rows rather than a row per matching
+    pair. The owner's own list is rewritten. In every other list the owner
+    is rescored (compatibility and tiers are symmetric) and inserted, moved
+    or evicted against that list's own tier boundary, leaving the other
+    candidates' rows untouched. Only when the owner drops out of a full
+    tier, whose next candidate is not stored, is that list scored again.
+    Called after the profile is created or updated; the caller commits.
+    """
+    user_id = profile.user_id
+    per_tier = recommendations_per_tier()
+
+    scored = score_candidates(profile)
+    after = {candidate_id: (tier, score) for candidate_id, tier, score in scored}
+    before = {
+        other_id: (tier, score) for other_id, tier, score in db.session.query(
+            BuddyRecommendation.user_id, BuddyRecommendation.tier, BuddyRecommendation.score
+        ).filter(BuddyRecommendation.candidate_id == user_id)
+    }
+    _write_list(user_id, scored, per_tier)
+
+    others = (after.keys() | before.keys()) - {user_id}
+    boundaries = _tier_boundaries(others, per_tier)
+    moved, evicted, rescored, rows = [], [], [], []
+    for other_id in others:
+        old, new = before.get(other_id), after.get(other_id)
+        if old == new:
+            continue
+        if old is not None:
+            stays = new is not None and new[0] == old[0] and new[1] >= old[1]
+            if (other_id, old[0]) in boundaries and not stays:
+                # The next best candidate of that tier is not stored
+                rescored.append(other_id)
+                continue
+            moved.append(other_id)
+            if stays:
+                rows.append({"user_id": other_id, "candidate_id": user_id, "tier": new[0], "score": new[1]})
+                continue
+        if new is not None:
+            boundary = boundaries.get((other_id, new[0]))
+            if boundary is None or (-new[1], user_id) < (-boundary[0], boundary[1]):
+                rows.append({"user_id": other_id, "candidate_id": user_id, "tier": new[0], "score": new[1]})
+                if boundary is not None:
+                    evicted.append(boundary[2])
+
+    for chunk in _chunks(moved):
+        BuddyRecommendation.query.filter(
+            BuddyRecommendation.candidate_id == user_id, BuddyRecommendation.user_id.in_(chunk)
+        ).delete(synchronize_session=False)
+    for chunk in _chunks(evicted):
+        BuddyRecommendation.query.filter(BuddyRecommendation.id.in_(chunk)).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(insert(BuddyRecommendation), rows)
+    _rescore_lists(rescored, per_tier, user_id, after)
+
+    profile.recommendations_refreshed_at = datetime.utcnow()
+
+
+def _remove_candidate(candidate_id, per_tier, user_ids=None):
+    """
+    Delete `candidate_id` from the lists of `user_ids` (every list when
+    None), scoring again the lists where it leaves a full tier
+    """
+    query = BuddyRecommendation.query.filter(BuddyRecommendation.candidate_id == candidate_id)
+    if user_ids is not None:
+        query = query.filter(BuddyRecommendation.user_id.in_(user_ids))
+    held = dict(query.with_entities(BuddyRecommendation.user_id, BuddyRecommendation.tier))
+    if not held:
+        return
+    boundaries = _tier_boundaries(held.keys(), per_tier)
+    query.delete(synchronize_session=False)
+    _rescore_lists([user_id for user_id, tier in held.items() if (user_id, tier) in boundaries], per_tier, candidate_id, {})
+
+
+def remove_recommendation_pair(user_id, other_id):
+    """Drop the pair once a connection (pending, approved or rejected) exists between them"""
+    per_tier = recommendations_per_tier()
+    _remove_candidate(other_id, per_tier, [user_id])
+    _remove_candidate(user_id, per_tier, [other_id])
+
+
+def restore_recommendation_pair(user_id, other_id):
+    """Score the pair again after the connection between them was removed"""
+    BuddyRecommendation.query.filter(
+        or_(
+            and_(BuddyRecommendation.user_id == user_id, BuddyRecommendation.candidate_id == other_id),
+            and_(BuddyRecommendation.user_id == other_id, BuddyRecommendation.candidate_id == user_id)
+        )
+    ).delete(synchronize_session=False)
+
+    profiles = Profile.query.filter(Profile.user_id.in_([user_id, other_id])).all()
+    if len(profiles) != 2:
+        return
+
+    tier = match_tier(*(profile_features(profile) for profile in profiles))
+    if tier is None:
+        return
+
+    score = calculate_compatibility(*profiles)
+    db.session.execute(insert(BuddyRecommendation), [
+        {"user_id": user_id, "candidate_id": other_id, "tier": tier, "score": score},
+        {"user_id": other_id, "candidate_id": user_id, "tier": tier, "score": score},
+    ])
+    trim_recommendations([user_id, other_id], recommendations_per_tier())
+
+
+def remove_user_recommendations(user_id):
+    """Drop every row involving a deleted user. Call after deleting the profile, before committing."""
+    BuddyRecommendation.query.filter(BuddyRecommendation.user_id == user_id).delete(synchronize_session=False)
+    _remove_candidate(user_id, recommendations_per_tier())
+
+
+def friends_of_friends_keys(user_id, after=None):
+    """
+    Ranking keys (FRIENDS_OF_FRIENDS_TIER, -mutual_connections, candidate_id)
+    for users who share buddies with `user_id` but match on no profile tier,
+    starting strictly after the `after` key.
+    """
+    counts = friends_of_friends.mutual_counts(user_id)
+    candidate_ids = counts.keys() - excluded_user_ids(user_id)
+    if not candidate_ids:
+        return []
+
+    # Only users with a profile, and not already recommended on a profile tier
+    with_profile = {
+        row[0] for row in db.session.query(Profile.user_id).filter(Profile.user_id.in_(candidate_ids))
+    }
+    ranked = {
+        row[0] for row in db.session.query(BuddyRecommendation.candidate_id).filter(
+            BuddyRecommendation.user_id == user_id,
+            BuddyRecommendation.candidate_id.in_(with_profile)
+        )
+    }
+
+    keys = sorted(
+        (FRIENDS_OF_FRIENDS_TIER, -counts[candidate_id], candidate_id) for candidate_id in with_profile - ranked
+    )
+    if after is not None:
+        keys = [key for key in keys if key > after]
+    return keys
+
+
+def rank_recommendations(profile, limit=None, after=None):
+    """
+    Read the ranked recommendations of the owner of `profile`.
+
+    Rows are ordered by (tier, -score, candidate_id) where tier is 0 same
+    specialization, 1 common interests, 2 overlapping schedule, and the page
+    starts strictly after the `after` key. Friends of friends that match on
+    none of these follow as FRIENDS_OF_FRIENDS_TIER, scored by their mutual
+    connections. Read only: lists are written when profiles are saved and by
+    `flask recommendations rebuild`.
+
+    Returns (keys, has_more) where keys are (tier, -score, candidate_id).
+    """
+    query = db.session.query(
+        BuddyRecommendation.tier, BuddyRecommendation.score, BuddyRecommendation.candidate_id
+    ).filter(BuddyRecommendation.user_id == profile.user_id)
+
+    if after is not None:
+        tier, negative_score, candidate_id = after
+        query = query.filter(or_(
+            BuddyRecommendation.tier > tier,
+            and_(BuddyRecommendation.tier == tier, BuddyRecommendation.score < -negative_score),
+            and_(
+                BuddyRecommendation.tier == tier,
+                BuddyRecommendation.score == -negative_score,
+                BuddyRecommendation.candidate_id > candidate_id
+            )
+        ))
+
+    query = query.order_by(
+        BuddyRecommendation.tier.asc(), BuddyRecommendation.score.desc(), BuddyRecommendation.candidate_id.asc()
+    )
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    keys = [(tier, -score, candidate_id) for tier, score, candidate_id in query.all()]
+    if limit is None or len(keys) <= limit:
+        keys += friends_of_friends_keys(profile.user_id, after=after)
+    if limit is None:
+        return keys, False
+    return keys[:limit], len(keys) > limit
@@ -0,0 +1,69 @@
+from extensions import db
+from models import Profile
+from sqlalchemy import text, and_, or_
+import re
+
+# Same expression as the ix_profiles_search GIN index, see the full-text search migration
+POSTGRES_DOCUMENT = (
+    "to_tsvector('english', coalesce(bio, '') || ' ' || coalesce(interests, '') || ' ' || "
+    "coalesce(specialization, '') || ' ' || coalesce(schedule, ''))"
+)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(query):
+    """Words of a free-text search, lowercased, at most 10"""
+    return _WORD.findall((query or "").lower())[:10]
+
+
+def _fts5_query(terms):
+    # Quoting keeps FTS5 syntax in user input literal; the last word also matches as a prefix
+    return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+
+def search_profiles(query, exclude_user_id=None, limit=20, offset=0):
+    """
+    Rank profiles whose bio, interests, specialization and schedule contain
+    every word of `query`.
+
+    Uses the FTS5 index on SQLite (bm25, interests and specialization weigh
+    double) and the tsvector GIN index on Postgres (ts_rank_cd); other
+    databases fall back to unranked LIKE matching. Returns (user_ids,
+    has_more) for the page starting at `offset`.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], False
+
+    dialect = db.engine.dialect.name
+    params = {"exclude": exclude_user_id or 0, "limit": limit + 1, "offset": offset}
+
+    if dialect == "sqlite":
+        params["query"] = _fts5_query(terms)
+        rows = db.session.execute(text("""
+            SELECT p.user_id
+            FROM profiles_fts
+            JOIN profiles p ON p.id = profiles_fts.rowid
+            WHERE profiles_fts MATCH :query AND p.user_id != :exclude
+            ORDER BY bm25(profiles_fts, 1.0, 2.0, 2.0, 1.0), p.user_id
+            LIMIT :limit OFFSET :offset
+        """), params)
+    elif dialect == "postgresql":
+        params["query"] = " ".join(terms)
+        rows = db.session.execute(text(f"""
+            SELECT p.user_id
+            FROM profiles p, plainto_tsquery('english', :query) query
+            WHERE {POSTGRES_DOCUMENT} @@ query AND p.user_id != :exclude
+            ORDER BY ts_rank_cd({POSTGRES_DOCUMENT}, query) DESC, p.user_id
+            LIMIT :limit OFFSET :offset
+        """), params)
+    else:
+        fields = (Profile.bio, Profile.interests, Profile.specialization, Profile.schedule)
+        rows = db.session.query(Profile.user_id).filter(
+            Profile.user_id != params["exclude"],
+            and_(*(or_(*(field.ilike(f"%{term}%") for field in fields)) for term in terms))
+        ).order_by(Profile.user_id).limit(params["limit"]).offset(offset)
+
+    user_ids = [row[0] for row in rows]
+    return user_ids[:limit], len(user_ids) > limit
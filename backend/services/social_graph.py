@@ -0,0 +1,187 @@
+from extensions import db
+from models import BuddyConnection
+from collections import OrderedDict
+import numpy as np
+import scipy.sparse as sp
+import threading
+import time
+
+
+class FriendsOfFriends:
+    """
+    Second-degree buddy candidates ("people your buddies study with").
+
+    Approved connections are kept as a symmetric sparse adjacency matrix A.
+    Row u of A @ A counts, for every other user, how many buddies they share
+    with u, so one sparse row-matrix product gives all second-degree
+    candidates with their mutual-connection counts.
+
+    Adjacency is loaded lazily and reloaded after `ttl` seconds. Accepted or
+    removed connections are applied to the matrix itself: A is held as a CSR
+    base plus a small DOK matrix of +1/-1 edits, products run against both,
+    and the edits are folded into the base once there are `fold_after` of
+    them. A change drops only the cached results of its two users and their
+    buddies, the users whose second-degree neighbourhood it touches.
+    """
+
+    def __init__(self, max_cached_users=10000, ttl=300, fold_after=1024):
+        self.max_cached_users = max_cached_users
+        self.ttl = ttl
+        self.fold_after = fold_after
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self.adjacency = {}
+        self.matrix = None  # CSR base, capacity x capacity
+        self.delta = None  # DOK edits not yet folded into the base
+        self.delta_csr = None  # delta as CSR, rebuilt after the next edit
+        self.positions = {}
+        self.user_ids = []  # position -> user id
+        self.results = OrderedDict()  # user_id -> {candidate_id: mutual_count}
+
+    def load(self):
+        """(Re)build the adjacency from approved connections"""
+        rows = db.session.query(BuddyConnection.user_id, BuddyConnection.buddy_id).filter(
+            BuddyConnection.status == "approved"
+        ).all()
+
+        pairs = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        user_ids, inverse = np.unique(pairs, return_inverse=True)
+        inverse = inverse.reshape(-1, 2)
+        sources = np.concatenate([inverse[:, 0], inverse[:, 1]])
+        targets = np.concatenate([inverse[:, 1], inverse[:, 0]])
+        capacity = max(64, 2 * len(user_ids))
+
+        with self.lock:
+            self.adjacency = {}
+            for a, b in rows:
+                self.adjacency.setdefault(a, set()).add(b)
+                self.adjacency.setdefault(b, set()).add(a)
+            self.matrix = sp.csr_matrix(
+                (np.ones(len(sources), dtype=np.int32), (sources, targets)), shape=(capacity, capacity)
+            )
+            self.delta = sp.dok_matrix((capacity, capacity), dtype=np.int32)
+            self.delta_csr = None
+            self.user_ids = user_ids.tolist()
+            self.positions = {user_id: position for position, user_id in enumerate(self.user_ids)}
+            self.results.clear()
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def _fold(self):
+        """Merge the pending edits into the CSR base"""
+        if self.delta.nnz:
+            self.matrix = self.matrix + self.delta.tocsr()
+            self.matrix.eliminate_zeros()
+            self.delta = sp.dok_matrix(self.matrix.shape, dtype=np.int32)
+            self.delta_csr = None
+
+    def _position(self, user_id):
+        """Matrix position of a user, growing the matrix for a user new to the graph"""
+        position = self.positions.get(user_id)
+        if position is None:
+            position = self.positions[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+            if position >= self.matrix.shape[0]:
+                self._fold()
+                capacity = 2 * self.matrix.shape[0]
+                self.matrix.resize((capacity, capacity))
+                self.delta = sp.dok_matrix((capacity, capacity), dtype=np.int32)
+        return position
+
+    def _edit(self, user_id, other_id, change):
+        """Add `change` (+1 or -1) to both directions of a pair"""
+        a, b = self._position(user_id), self._position(other_id)
+        for row, column in ((a, b), (b, a)):
+            self.delta[row, column] = self.delta.get((row, column), 0) + change
+        self.delta_csr = None
+        if self.delta.nnz >= self.fold_after:
+            self._fold()
+
+    def _invalidate_around(self, *user_ids):
+        """Drop cached results of users within two hops of any of `user_ids`"""
+        affected = set(user_ids)
+        for user_id in user_ids:
+            affected.update(self.adjacency.get(user_id, ()))
+        for user_id in affected:
+            self.results.pop(user_id, None)
+
+    def mutual_counts(self, user_id):
+        """{candidate_id: mutual buddies} for users two hops away and not already buddies"""
+        self.ensure_loaded()
+        with self.lock:
+            cached = self.results.get(user_id)
+            if cached is not None:
+                self.results.move_to_end(user_id)
+                return cached
+
+            if not self.adjacency.get(user_id):
+                return {}
+
+            position = self.positions[user_id]
+            row = self.matrix[position]
+            two_hop = row @ self.matrix
+            if self.delta.nnz:
+                if self.delta_csr is None:
+                    self.delta_csr = self.delta.tocsr()
+                row = row + self.delta_csr[position]
+                two_hop = row @ self.matrix + row @ self.delta_csr
+            two_hop = two_hop.tocoo()
+
+            counts = {}
+            direct = self.adjacency[user_id]
+            for candidate_position, mutual in zip(two_hop.col.tolist(), two_hop.data.tolist()):
+                candidate_id = self.user_ids[candidate_position]
+                if mutual > 0 and candidate_id != user_id and candidate_id not in direct:
+                    counts[candidate_id] = int(mutual)
+
+            self.results[user_id] = counts
+            while len(self.results) > self.max_cached_users:
+                self.results.popitem(last=False)
+            return counts
+
+    def add_edge(self, user_id, other_id):
+        """Record a newly approved connection"""
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            if other_id in self.adjacency.get(user_id, ()):
+                return
+            self.adjacency.setdefault(user_id, set()).add(other_id)
+            self.adjacency.setdefault(other_id, set()).add(user_id)
+            self._edit(user_id, other_id, 1)
+            self._invalidate_around(user_id, other_id)
+
+    def remove_edge(self, user_id, other_id):
+        """Forget a connection that is no longer approved"""
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            if other_id not in self.adjacency.get(user_id, ()):
+                return
+            self._invalidate_around(user_id, other_id)
+            self._edit(user_id, other_id, -1)
+            for a, b in ((user_id, other_id), (other_id, user_id)):
+                buddies = self.adjacency[a]
+                buddies.discard(b)
+                if not buddies:
+                    del self.adjacency[a]
+
+    def remove_user(self, user_id):
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            # Everyone who had the user as a friend of a friend, through each of their buddies
+            self._invalidate_around(user_id, *self.adjacency.get(user_id, ()))
+            for buddy_id in self.adjacency.pop(user_id, set()):
+                self._edit(user_id, buddy_id, -1)
+                buddies = self.adjacency.get(buddy_id)
+                if buddies is not None:
+                    buddies.discard(user_id)
+                    if not buddies:
+                        del self.adjacency[buddy_id]
+
+
+friends_of_friends = FriendsOfFriends()
@@ -0,0 +1,214 @@
+from extensions import db
+from models import Profile
+import math
+import re
+import numpy as np
+import scipy.sparse as sp
+import threading
+import time
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have i i'm in is it its like love me my of on or so that the
+    this to was we with you your am im also really very more about into just
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens of a profile text without stop words"""
+    if not text:
+        return []
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def profile_text(bio, interests, specialization):
+    """Text a profile is compared on"""
+    return " ".join(part for part in (bio, interests, specialization) if part)
+
+
+class TextSimilarityIndex:
+    """
+    TF-IDF vectors of profile bio, interests and specialization with cosine
+    top-K retrieval.
+
+    Rows are L2-normalized (1 + log tf) * idf vectors in a CSR matrix, so the
+    similarities of one profile to everyone are a single sparse matrix-vector
+    product. Profile edits do not rebuild the matrix: the changed user's old
+    row is masked out and the new vector goes to a small delta matrix that is
+    scored alongside it. Document frequencies are updated with every edit;
+    the delta is folded into the base matrix (re-weighting every row with the
+    current idf) once it holds `compact_after` rows or the index is reloaded
+    after `ttl` seconds.
+    """
+
+    def __init__(self, ttl=300, compact_after=256):
+        self.ttl = ttl
+        self.compact_after = compact_after
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self.vocabulary = {}  # token -> column
+        self.document_frequency = {}  # token -> number of profiles containing it
+        self.term_counts = {}  # user_id -> {token: count}
+        self.base = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.base_user_ids = np.empty(0, dtype=np.int64)
+        self.base_positions = {}
+        self.masked = np.zeros(0, dtype=bool)
+        self.delta = {}  # user_id -> 1 x V vector replacing their base row
+
+    def _idf(self, token):
+        return math.log((1 + len(self.term_counts)) / (1 + self.document_frequency.get(token, 0))) + 1
+
+    def _vector(self, counts):
+        """Normalized TF-IDF row for term counts, over the current vocabulary"""
+        columns, values = [], []
+        for token, count in counts.items():
+            column = self.vocabulary.get(token)
+            if column is None:
+                column = self.vocabulary[token] = len(self.vocabulary)
+            columns.append(column)
+            values.append((1 + math.log(count)) * self._idf(token))
+        values = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(values)
+        if norm:
+            values /= norm
+        return sp.csr_matrix((values, ([0] * len(columns), columns)), shape=(1, len(self.vocabulary)))
+
+    @staticmethod
+    def _padded(matrix, width):
+        """Matrix widened to `width` columns for tokens added after it was built"""
+        if matrix.shape[1] == width:
+            return matrix
+        matrix = matrix.copy()
+        matrix.resize((matrix.shape[0], width))
+        return matrix
+
+    @staticmethod
+    def _counts(text):
+        counts = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        return counts
+
+    def _compact(self):
+        """Re-vectorize every profile into a fresh base matrix"""
+        user_ids = list(self.term_counts)
+        rows = [self._vector(self.term_counts[user_id]) for user_id in user_ids]
+        width = len(self.vocabulary)
+        if rows:
+            self.base = sp.vstack([self._padded(row, width) for row in rows], format="csr")
+        else:
+            self.base = sp.csr_matrix((0, width), dtype=np.float32)
+        self.base_user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.base_positions = {user_id: position for position, user_id in enumerate(user_ids)}
+        self.masked = np.zeros(len(user_ids), dtype=bool)
+        self.delta = {}
+
+    def load(self):
+        """(Re)build the index from every profile's text"""
+        rows = db.session.query(Profile.user_id, Profile.bio, Profile.interests, Profile.specialization).all()
+
+        with self.lock:
+            self._reset()
+            for user_id, bio, interests, specialization in rows:
+                counts = self._counts(profile_text(bio, interests, specialization))
+                if counts:
+                    self.term_counts[user_id] = counts
+                    for token in counts:
+                        self.document_frequency[token] = self.document_frequency.get(token, 0) + 1
+            self._compact()
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def _discard(self, user_id):
+        counts = self.term_counts.pop(user_id, None)
+        if counts is None:
+            return
+        for token in counts:
+            remaining = self.document_frequency[token] - 1
+            if remaining:
+                self.document_frequency[token] = remaining
+            else:
+                del self.document_frequency[token]
+        position = self.base_positions.get(user_id)
+        if position is not None:
+            self.masked[position] = True
+        self.delta.pop(user_id, None)
+
+    def update(self, user_id, bio, interests, specialization):
+        """Re-vectorize one profile after its text changed"""
+        if self.loaded_at is None:
+            return
+        counts = self._counts(profile_text(bio, interests, specialization))
+        with self.lock:
+            self._discard(user_id)
+            if counts:
+                self.term_counts[user_id] = counts
+                for token in counts:
+                    self.document_frequency[token] = self.document_frequency.get(token, 0) + 1
+                self.delta[user_id] = self._vector(counts)
+            if len(self.delta) >= self.compact_after:
+                self._compact()
+
+    def remove(self, user_id):
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            self._discard(user_id)
+
+    def _row(self, user_id):
+        vector = self.delta.get(user_id)
+        if vector is not None:
+            return vector
+        position = self.base_positions.get(user_id)
+        if position is None or self.masked[position]:
+            return None
+        return self.base[position]
+
+    def top_k(self, user_id, k=10, exclude=()):
+        """[(other_user_id, cosine similarity)] of the k most similar profiles, best first"""
+        self.ensure_loaded()
+        with self.lock:
+            query = self._row(user_id)
+            if query is None:
+                return []
+            width = len(self.vocabulary)
+            query = self._padded(query, width)
+
+            # Tokens added since the last compaction have no base column
+            scores = (self.base @ query[:, :self.base.shape[1]].T).toarray().ravel()
+            scores[self.masked] = 0
+            user_ids = self.base_user_ids
+
+            if self.delta:
+                delta_ids = list(self.delta)
+                delta = sp.vstack([self._padded(self.delta[delta_id], width) for delta_id in delta_ids], format="csr")
+                scores = np.concatenate([scores, (delta @ query.T).toarray().ravel()])
+                user_ids = np.concatenate([user_ids, np.asarray(delta_ids, dtype=np.int64)])
+
+        excluded = set(exclude) | {user_id}
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k + len(excluded):
+            # Only the best k plus however many may be excluded need sorting
+            keep = k + len(excluded)
+            candidates = candidates[np.argpartition(-scores[candidates], keep - 1)[:keep]]
+        order = candidates[np.lexsort((user_ids[candidates], -scores[candidates]))]
+
+        results = []
+        for position in order.tolist():
+            other_id = int(user_ids[position])
+            if other_id in excluded:
+                continue
+            results.append((other_id, float(scores[position])))
+            if len(results) == k:
+                break
+        return results
+
+
+text_index = TextSimilarityIndex()
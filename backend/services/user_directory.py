@@ -0,0 +1,83 @@
+from extensions import db
+from models import User
+import bisect
+import threading
+import time
+
+
+class UsernameIndex:
+    """
+    Sorted array of lowercase usernames for prefix lookups.
+
+    A prefix search is a bisect to the first key >= prefix followed by a
+    scan while keys still start with it, so suggestions cost O(log n + k).
+    Only active users are listed. The index is loaded lazily, updated by the
+    signup and admin routes and reloaded after `ttl` seconds so other worker
+    processes pick up users they did not create.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self.keys = []  # (lowercase username, user_id), sorted
+        self.usernames = {}  # user_id -> username as entered
+
+    def load(self):
+        """(Re)build the index from every active user"""
+        rows = db.session.query(User.id, User.username).filter(User.is_active.isnot(False)).all()
+
+        with self.lock:
+            self.keys = sorted((username.lower(), user_id) for user_id, username in rows)
+            self.usernames = dict(rows)
+            self.loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def _discard(self, user_id):
+        username = self.usernames.pop(user_id, None)
+        if username is None:
+            return
+        key = (username.lower(), user_id)
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def add(self, user_id, username):
+        """List a new or re-activated user"""
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            self._discard(user_id)
+            self.usernames[user_id] = username
+            bisect.insort(self.keys, (username.lower(), user_id))
+
+    def remove(self, user_id):
+        """Unlist a deleted or deactivated user"""
+        if self.loaded_at is None:
+            return
+        with self.lock:
+            self._discard(user_id)
+
+    def suggest(self, prefix, limit=8, exclude=()):
+        """[(user_id, username)] of up to `limit` users whose username starts with `prefix`, alphabetically"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        self.ensure_loaded()
+        with self.lock:
+            results = []
+            position = bisect.bisect_left(self.keys, (prefix,))
+            while position < len(self.keys) and len(results) < limit:
+                key, user_id = self.keys[position]
+                if not key.startswith(prefix):
+                    break
+                if user_id not in exclude:
+                    results.append((user_id, self.usernames[user_id]))
+                position += 1
+            return results
+
+
+username_index = UsernameIndex()
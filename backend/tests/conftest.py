@@ -0,0 +1,102 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask_migrate import upgrade
+from app import create_app
+from extensions import db
+from models import User
+from services.candidate_index import candidate_index
+from services.connections import connection_graph
+from services.events import event_hub
+from services.lsh import interest_lsh
+from services.matching import compatibility_cache
+from services.network_clusters import study_network
+from services.profile_snapshot import profile_snapshot
+from services.social_graph import friends_of_friends
+from services.text_similarity import text_index
+
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, "migrations")
+
+# Process-wide caches, emptied so no test sees another test's users
+CACHES = (
+    candidate_index, connection_graph, event_hub, interest_lsh, compatibility_cache,
+    study_network, profile_snapshot, friends_of_friends, text_index,
+)
+
+
+def _create_app(database_path):
+    os.environ["DATABASE_URI"] = f"sqlite:///{database_path}"
+    for cache in CACHES:
+        cache.__init__()
+    app = create_app()
+    app.config["TESTING"] = True
+    # The retention loop only sleeps between runs, it need not outlive the test
+    app.message_retention_service.running = False
+    return app
+
+
+@pytest.fixture(scope="session")
+def migrated_database(tmp_path_factory):
+    """A database file upgraded to the head revision, copied by every test"""
+    path = tmp_path_factory.mktemp("db") / "template.db"
+    app = _create_app(path)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+        db.engine.dispose()
+    return path
+
+
+@pytest.fixture
+def app(migrated_database, tmp_path):
+    path = tmp_path / "studybuddy.db"
+    shutil.copy(migrated_database, path)
+    app = _create_app(path)
+    profile_snapshot.path = str(tmp_path / "profile_snapshot.bin")
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def empty_app(tmp_path):
+    """An app on a database no migration has run on"""
+    app = _create_app(tmp_path / "empty.db")
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def login(app):
+    """login(user_id) -> a test client with that user's session"""
+    def login(user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+            session["_fresh"] = True
+        return client
+    return login
+
+
+@pytest.fixture
+def make_user(app, login):
+    """make_user(name, **profile) -> user id, creating the profile through POST /api/profile"""
+    def make_user(name, **profile):
+        with app.app_context():
+            user = User(username=name, email=f"{name}@example.com", password_hash="x")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+        if profile:
+            response = login(user_id).post("/api/profile", json=profile)
+            assert response.status_code == 201, response.get_json()
+        return user_id
+    return make_user
@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from benchmarks.compatibility_benchmark import RawProfile, baseline_scorer, features_of, loop_scorer, random_profile
+from services.batch_matching import CandidateMatrix
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_scorer_equals_scalar_and_baseline_scorers(seed):
+    rnd = random.Random(seed)
+    profiles = [random_profile(rnd) for _ in range(500)]
+    current_profile = random_profile(rnd)
+    candidates = [features_of(profile) for profile in profiles]
+    current = features_of(current_profile)
+
+    compatibility, tier = CandidateMatrix.from_features(range(len(candidates)), candidates).score(current)
+
+    expected = loop_scorer(current, candidates)
+    assert list(zip(compatibility.tolist(), tier.tolist())) == expected
+    assert expected == baseline_scorer(current_profile, profiles)
+
+
+def test_vectorized_scorer_handles_no_candidates():
+    compatibility, tier = CandidateMatrix.from_features([], []).score(features_of(RawProfile("python", "design", "")))
+    assert compatibility.tolist() == [] and tier.tolist() == []
+
+
+def test_stored_features_strip_specializations_and_drop_empty_interests():
+    # The two intentional departures from the original string-based scorer
+    current = RawProfile("python,,sql", " Design ", "evening")
+    candidate = RawProfile("python, sql", "design", "evening")
+    assert loop_scorer(features_of(current), [features_of(candidate)]) == [(75, 0)]
+    assert baseline_scorer(current, [candidate]) == [(32, 1)]
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import BuddyConnection, Message
+
+
+@pytest.fixture
+def buddies(app, make_user):
+    """Two connected users, (ada, grace)"""
+    ada, grace = make_user("ada"), make_user("grace")
+    with app.app_context():
+        db.session.add(BuddyConnection(user_id=ada, buddy_id=grace, status="approved"))
+        db.session.commit()
+    return ada, grace
+
+
+def send(login, sender_id, receiver_id, content):
+    response = login(sender_id).post(f"/api/chat/send/{receiver_id}", json={"content": content})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["message_id"]
+
+
+def mark_read(login, user_id, other_id, **body):
+    return login(user_id).post(f"/api/chat/messages/{other_id}/read", json=body)
+
+
+def test_read_watermark_moves_forward_only(login, buddies):
+    ada, grace = buddies
+    ids = [send(login, grace, ada, f"message {i}") for i in range(3)]
+
+    messages = login(ada).get(f"/api/chat/messages/{grace}").get_json()
+    assert messages["last_read_id"] == 0
+    assert not any(message["read"] for message in messages["messages"])
+
+    assert mark_read(login, ada, grace, last_read_id=ids[1]).get_json()["last_read_id"] == ids[1]
+    # Never back
+    assert mark_read(login, ada, grace, last_read_id=ids[0]).get_json()["last_read_id"] == ids[1]
+    # Never past the last message
+    assert mark_read(login, ada, grace, last_read_id=ids[-1] + 100).get_json()["last_read_id"] == ids[-1]
+
+    messages = login(grace).get(f"/api/chat/messages/{ada}").get_json()
+    assert messages["buddy_last_read_id"] == ids[-1]
+    assert all(message["read"] for message in messages["messages"])
+
+
+def test_read_watermarks_are_per_user(login, buddies):
+    ada, grace = buddies
+    first = send(login, grace, ada, "hi")
+    second = send(login, ada, grace, "hello")
+
+    assert mark_read(login, ada, grace).get_json()["last_read_id"] == second
+    assert login(grace).get(f"/api/chat/messages/{ada}").get_json()["last_read_id"] == 0
+    assert mark_read(login, grace, ada, last_read_id=first).get_json()["last_read_id"] == first
+
+
+def test_read_watermark_stays_put_without_messages(app, login, buddies):
+    ada, grace = buddies
+    first = send(login, grace, ada, "hi")
+    assert mark_read(login, ada, grace, last_read_id=first).get_json()["last_read_id"] == first
+
+    # Retention deletes every message, leaving the conversation without a last one
+    with app.app_context():
+        Message.query.update({Message.timestamp: datetime.utcnow() - timedelta(days=365)})
+        db.session.commit()
+        app.message_retention_service.cleanup_old_messages()
+        assert Message.query.count() == 0
+
+    assert mark_read(login, ada, grace, last_read_id=first + 1000).get_json()["last_read_id"] == first
+    assert mark_read(login, ada, grace).get_json()["last_read_id"] == first
+
+    later = send(login, grace, ada, "still there?")
+    assert later > first
+    assert mark_read(login, ada, grace, last_read_id=later + 1000).get_json()["last_read_id"] == later
+
+
+def test_read_watermark_rejects_non_ids(login, buddies):
+    ada, grace = buddies
+    send(login, grace, ada, "hi")
+    assert mark_read(login, ada, grace, last_read_id="5").status_code == 400
+    assert mark_read(login, ada, grace, last_read_id=True).status_code == 400
+
+
+def fetch(login, user_id, other_id, **params):
+    response = login(user_id).get(f"/api/chat/messages/{other_id}", query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_older_pages_follow_before_id(app, login, make_user, buddies):
+    ada, grace = buddies
+    ids = [send(login, *((ada, grace) if i % 3 else (grace, ada)), f"message {i}") for i in range(23)]
+    # Messages of another pair never show up
+    outsider = make_user("outsider")
+    with app.app_context():
+        db.session.add(BuddyConnection(user_id=ada, buddy_id=outsider, status="approved"))
+        db.session.commit()
+    send(login, outsider, ada, "not in this conversation")
+
+    page = fetch(login, ada, grace, limit=10, include_total="true")
+    assert page["total"] == 23
+    seen = [message["id"] for message in page["messages"]]
+    while page["has_more"]:
+        page = fetch(login, ada, grace, limit=10, before_id=page["oldest_id"])
+        seen += [message["id"] for message in page["messages"]]
+
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_newer_pages_follow_after_id(login, buddies):
+    ada, grace = buddies
+    first = send(login, grace, ada, "hi")
+    page = fetch(login, ada, grace, after_id=first)
+    assert page["messages"] == [] and not page["has_more"] and page["newest_id"] == first
+
+    ids = [send(login, *((ada, grace) if i % 2 else (grace, ada)), f"message {i}") for i in range(12)]
+    newest, seen = first, []
+    while True:
+        page = fetch(login, ada, grace, limit=5, after_id=newest)
+        # Newest first within the page, the oldest of the newer messages first across pages
+        assert [message["id"] for message in page["messages"]] == sorted(
+            (message["id"] for message in page["messages"]), reverse=True
+        )
+        seen += reversed([message["id"] for message in page["messages"]])
+        newest = page["newest_id"]
+        if not page["has_more"]:
+            break
+
+    assert seen == ids
@@ -0,0 +1,69 @@
+import pytest
+from flask_migrate import downgrade, upgrade
+from sqlalchemy.exc import IntegrityError
+
+from conftest import MIGRATIONS_DIR
+from extensions import db
+from models import BuddyConnection
+
+# The revision before connections were keyed by their canonical pair
+BEFORE_CANONICAL_PAIRS = "b93f1d5c2e60"
+
+
+def test_reversed_request_is_refused(app, login, make_user):
+    ada, grace = make_user("ada"), make_user("grace")
+    assert login(ada).post("/api/buddies/connect", json={"buddy_id": grace}).status_code == 200
+
+    response = login(grace).post("/api/buddies/connect", json={"buddy_id": ada})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Connection already exists"}
+
+    with app.app_context():
+        connection = BuddyConnection.between(ada, grace).one()
+        assert (connection.user_id, connection.buddy_id, connection.status) == (ada, grace, "pending")
+        assert BuddyConnection.query.count() == 1
+
+
+def test_pair_key_is_unique_whichever_user_initiated(app, make_user):
+    ada, grace = make_user("ada"), make_user("grace")
+    with app.app_context():
+        db.session.add(BuddyConnection(user_id=grace, buddy_id=ada, status="pending"))
+        db.session.commit()
+
+        db.session.add(BuddyConnection(user_id=ada, buddy_id=grace, status="pending"))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+
+def test_migration_keeps_one_row_per_pair(app, make_user):
+    a, b, c, d = (make_user(name) for name in ("ada", "grace", "alan", "edsger"))
+    with app.app_context():
+        downgrade(directory=MIGRATIONS_DIR, revision=BEFORE_CANONICAL_PAIRS)
+        db.session.execute(db.text(
+            "INSERT INTO buddy_connections (user_id, buddy_id, status, created_at) VALUES "
+            "(:a, :b, 'pending', '2025-01-01'), (:b, :a, 'approved', '2025-01-02'), "
+            "(:a, :c, 'pending', '2025-01-01'), (:c, :a, 'pending', '2025-01-02'), (:c, :b, 'rejected', '2025-01-01'), "
+            "(:d, :d, 'approved', '2025-01-01')"
+        ), {"a": a, "b": b, "c": c, "d": d})
+        db.session.execute(db.text(
+            "INSERT INTO buddy_relationships (user1_id, user2_id, status, created_at) VALUES "
+            "(:b, :a, 'pending', '2025-01-01'), (:d, :b, 'accepted', '2025-01-01')"
+        ), {"a": a, "b": b, "d": d})
+        db.session.commit()
+
+        upgrade(directory=MIGRATIONS_DIR)
+
+        rows = {
+            (row.low_id, row.high_id): (row.user_id, row.buddy_id, row.status, row.created_at.day)
+            for row in BuddyConnection.query
+        }
+        assert rows == {
+            # The row that got furthest wins, the oldest among equals
+            (a, b): (b, a, "approved", 2),
+            (a, c): (a, c, "pending", 1),
+            (b, c): (c, b, "rejected", 1),
+            # Folded in from buddy_relationships
+            (b, d): (d, b, "approved", 1),
+        }
+        assert BuddyConnection.query.count() == 4
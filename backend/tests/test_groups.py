@@ -0,0 +1,46 @@
+import pytest
+
+from extensions import db
+from models import StudyGroup, StudyGroupMember
+
+
+@pytest.fixture
+def group(app, make_user):
+    """A study group of three members, one without a profile. Returns (group_id, member ids)."""
+    members = [
+        make_user("ada", availability=[{"day": "monday", "start": "09:00", "end": "12:00"}]),
+        make_user("grace", availability=[{"day": "monday", "start": "10:00", "end": "14:00"}]),
+        make_user("alan"),
+    ]
+    with app.app_context():
+        group = StudyGroup(name="Algorithms")
+        db.session.add(group)
+        db.session.flush()
+        db.session.add_all(StudyGroupMember(group_id=group.id, user_id=user_id) for user_id in members)
+        db.session.commit()
+        return group.id, members
+
+
+def test_common_slots_of_members_with_availability(login, group):
+    group_id, (ada, grace, alan) = group
+    response = login(ada).get(f"/api/groups/{group_id}/common-slots")
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "slots": [{"day": "monday", "start": "10:00", "end": "12:00"}],
+        "total_minutes": 120,
+        "members": 3,
+        "missing_availability": [alan],
+    }
+
+
+def test_common_slots_errors_are_json(login, make_user, group):
+    group_id, _ = group
+    outsider = make_user("outsider")
+
+    response = login(outsider).get(f"/api/groups/{group_id}/common-slots")
+    assert response.status_code == 403
+    assert response.get_json() == {"error": "Not a member of this group"}
+
+    response = login(outsider).get(f"/api/groups/{group_id + 1}/common-slots")
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Group not found"}
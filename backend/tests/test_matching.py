@@ -0,0 +1,38 @@
+from sqlalchemy import event
+
+from extensions import db
+from models import Profile
+from services.matching import MatchFeatures, profile_features
+
+
+def test_profile_features_read_the_stored_columns(app, make_user):
+    user_id = make_user("ada", interests="Python, machine learning", specialization=" Data Science ", schedule="weekday evening")
+    with app.app_context():
+        profile = Profile.query.filter_by(user_id=user_id).one()
+        features = profile_features(profile)
+        assert features == MatchFeatures(
+            frozenset(profile.interest_keys.split(",")), profile.specialization_key, profile.schedule_mask
+        )
+        assert features.interests == {interest.name for interest in profile.interest_tags}
+
+
+def test_profile_features_neither_query_nor_write(app, make_user):
+    user_id = make_user("ada", interests="python, sql", specialization="data science", schedule="evening")
+    make_user("grace", interests="python, rust, go", specialization="data science", schedule="evening")
+    with app.app_context():
+        # A row written before features were stored
+        Profile.query.filter_by(user_id=user_id).update({"interest_keys": None})
+        db.session.commit()
+        profiles = Profile.query.order_by(Profile.user_id).all()
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, "before_cursor_execute", listener)
+        try:
+            features = [profile_features(profile) for profile in profiles]
+        finally:
+            event.remove(db.engine, "before_cursor_execute", listener)
+
+        assert statements == []
+        assert not db.session.new and not db.session.dirty
+        assert [f.interests for f in features] == [{"python", "sql"}, {"python", "rust", "go"}]
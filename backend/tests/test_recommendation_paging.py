@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from services.recommendations import encode_cursor
+
+SPECIALIZATIONS = ["data science", "design"]
+INTERESTS = ["python", "react", "sql", "figma", "statistics"]
+SCHEDULES = ["weekday evening", "weekend morning", "night"]
+
+
+@pytest.fixture
+def user_id(make_user):
+    """A user with 40 possible buddies spread over every tier"""
+    rnd = random.Random(3)
+    for i in range(40):
+        make_user(
+            f"user{i}",
+            interests=", ".join(rnd.sample(INTERESTS, rnd.randint(0, 2))),
+            specialization=rnd.choice(SPECIALIZATIONS + [""]),
+            schedule=rnd.choice(SCHEDULES),
+        )
+    return make_user("ada", interests="python, sql", specialization="data science", schedule="weekday evening")
+
+
+def test_pages_follow_the_cursor_through_the_full_list(login, user_id):
+    client = login(user_id)
+    full = client.get("/api/buddies/recommended").get_json()
+    assert len(full) > 10
+
+    pages, cursor = [], None
+    while True:
+        response = client.get("/api/buddies/recommended", query_string={"limit": 7, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.get_json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert all(len(page) == 7 for page in pages[:-1]) and 0 < len(pages[-1]) <= 7
+    assert [buddy["id"] for page in pages for buddy in page] == [buddy["id"] for buddy in full]
+
+
+def test_last_page_has_no_cursor(login, user_id):
+    response = login(user_id).get("/api/buddies/recommended", query_string={"limit": 100})
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", encode_cursor(["a", "b", "c"])])
+def test_bad_cursor_is_a_400(login, user_id, cursor):
+    response = login(user_id).get("/api/buddies/recommended", query_string={"limit": 5, "cursor": cursor})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from extensions import db
+from models import BuddyConnection, BuddyRecommendation, Profile
+from services.recommendations import score_candidates, top_per_tier
+
+SPECIALIZATIONS = ["frontend developer", "data science", "design", ""]
+INTERESTS = ["python", "react", "ml", "machine learning", "sql", "figma", "statistics", "css"]
+SCHEDULES = ["weekday evening", "weekend morning", "night", "afternoon", ""]
+PER_TIER = 3
+
+
+def random_profile(rnd):
+    return {
+        "bio": f"studying {rnd.choice(INTERESTS)}",
+        "interests": ", ".join(rnd.sample(INTERESTS, rnd.randint(0, 3))),
+        "specialization": rnd.choice(SPECIALIZATIONS),
+        "schedule": rnd.choice(SCHEDULES),
+    }
+
+
+def assert_matches_full_recompute(app):
+    """Every stored list equals the best PER_TIER of a from-scratch scoring"""
+    with app.app_context():
+        for profile in Profile.query:
+            expected = sorted(top_per_tier(score_candidates(profile), PER_TIER))
+            stored = sorted(
+                (row.candidate_id, row.tier, row.score)
+                for row in BuddyRecommendation.query.filter_by(user_id=profile.user_id)
+            )
+            assert stored == expected, f"list of user {profile.user_id}"
+
+
+@pytest.fixture
+def population(app, make_user):
+    """30 users with random profiles and a small cap, so most tiers are full"""
+    app.config["RECOMMENDATIONS_PER_TIER"] = PER_TIER
+    rnd = random.Random(7)
+    return rnd, [make_user(f"user{i}", **random_profile(rnd)) for i in range(30)]
+
+
+def test_lists_match_full_recompute_after_creates(app, population):
+    assert_matches_full_recompute(app)
+
+
+@pytest.mark.parametrize("field", ["bio", "interests", "specialization", "schedule"])
+def test_lists_match_full_recompute_after_edits(app, login, population, field):
+    rnd, user_ids = population
+    for user_id in rnd.sample(user_ids, 10):
+        response = login(user_id).put("/api/profile", json={field: random_profile(rnd)[field]})
+        assert response.status_code == 200
+        assert_matches_full_recompute(app)
+
+
+def test_lists_match_full_recompute_after_connections(app, login, population):
+    rnd, user_ids = population
+    for _ in range(4):
+        user_id, buddy_id = rnd.sample(user_ids, 2)
+        response = login(user_id).post("/api/buddies/connect", json={"buddy_id": buddy_id})
+        assert response.status_code == 200
+        assert_matches_full_recompute(app)
+
+        with app.app_context():
+            request_id = BuddyConnection.query.filter_by(user_id=user_id, buddy_id=buddy_id).one().id
+        response = login(buddy_id).post(f"/api/buddies/requests/{request_id}/decline")
+        assert response.status_code == 200
+        assert_matches_full_recompute(app)
+
+
+def test_lists_match_full_recompute_after_user_deletion(app, login, population):
+    rnd, user_ids = population
+    for user_id in rnd.sample(user_ids, 4):
+        response = login(1).delete(f"/api/admin/users/{user_id}")
+        assert response.status_code == 200
+        assert_matches_full_recompute(app)
+
+    with app.app_context():
+        assert not BuddyRecommendation.query.filter(
+            db.or_(BuddyRecommendation.user_id.notin_(db.session.query(Profile.user_id)),
+                   BuddyRecommendation.candidate_id.notin_(db.session.query(Profile.user_id)))
+        ).count()
@@ -1,6 +1,7 @@
 import React, { useEffect, useState, useRef, useCallback } from "react";
 import { useNavigate } from "react-router-dom";
 import { api, getInitialsAvatar } from "../pages/utils/api";
+import { subscribeEvents } from "../pages/utils/events";
 
 // Single message bubble
 const MessageBubble = ({ message, isOwn }) => (
@@ -38,12 +39,29 @@ const ChatInterface = ({ chat, onClose, userData }) => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   };
 
+  // Move our read watermark up to the newest message we have shown
+  const markRead = useCallback(
+    async (lastReadId) => {
+      if (!chat || !lastReadId) return;
+      try {
+        const chatId = chat.userId || chat.id;
+        await api.post(`/chat/messages/${chatId}/read`, {
+          last_read_id: lastReadId,
+        });
+      } catch (err) {
+        console.error("Failed to mark messages as read:", err);
+      }
+    },
+    [chat]
+  );
+
   // Fetch messages
   const fetchMessages = useCallback(async () => {
     if (!chat) return;
     try {
       const chatId = chat.userId || chat.id;
       const response = await api.get(`/chat/messages/${chatId}`);
+      markRead(response.data?.newest_id);
       if (response.data?.messages) {
         const formatted = response.data.messages
           .map((msg) => ({
@@ -57,14 +75,38 @@ const ChatInterface = ({ chat, onClose, userData }) => {
     } catch (err) {
       console.error("Failed to fetch messages:", err);
     }
-  }, [chat, userData]);
+  }, [chat, userData, markRead]);
 
+  // New messages are pushed by the server instead of polled. The history
+  // is fetched by "reset" once the event stream is live, so nothing sent in
+  // between is lost.
   useEffect(() => {
     if (!chat) return;
-    fetchMessages();
-    const interval = setInterval(fetchMessages, 3000);
-    return () => clearInterval(interval);
-  }, [chat, fetchMessages]);
+    const chatId = chat.userId || chat.id;
+    return subscribeEvents({
+      message: (msg) => {
+        if (msg.senderId !== chatId && msg.receiverId !== chatId) return;
+        const formatted = {
+          ...msg,
+          senderUsername:
+            msg.senderId === userData.id ? userData.username : chat.username,
+        };
+        if (msg.senderId === chatId) markRead(msg.id);
+        setMessages((prev) => {
+          if (prev.some((m) => m.id === msg.id)) return prev;
+          // Our own message echoed back before the send request returned
+          const temp = prev.findIndex(
+            (m) => m.isTemp && m.senderId === msg.senderId && m.content === msg.content
+          );
+          if (temp === -1) return [...prev, formatted];
+          const next = [...prev];
+          next[temp] = formatted;
+          return next;
+        });
+      },
+      reset: fetchMessages,
+    });
+  }, [chat, fetchMessages, markRead, userData]);
 
   useEffect(scrollToBottom, [messages]);
 
@@ -75,7 +117,7 @@ const ChatInterface = ({ chat, onClose, userData }) => {
       const tempMessage = {
         id: Date.now(),
         senderId: userData.id,
-        content: newMessage,
+        content: newMessage.trim(),
         timestamp: new Date().toISOString(),
         isTemp: true,
       };
@@ -88,7 +130,11 @@ const ChatInterface = ({ chat, onClose, userData }) => {
       });
 
       setMessages((prev) =>
-        prev.map((m) => (m.id === tempMessage.id ? response.data : m))
+        prev.map((m) =>
+          m.id === tempMessage.id
+            ? { ...m, id: response.data.message_id, isTemp: false }
+            : m
+        )
       );
     } catch (err) {
       console.error("Failed to send message:", err);
@@ -252,7 +298,12 @@ const MessagesPage = () => {
             <div
               key={chat.id}
               className="flex items-center justify-between p-3 mb-3 bg-gray-800 rounded-2xl hover:bg-gray-700 cursor-pointer transition-all"
-              onClick={() => setSelectedChat(chat)}
+              onClick={() => {
+                setSelectedChat(chat);
+                setChats((prev) =>
+                  prev.map((c) => (c.id === chat.id ? { ...c, unread_count: 0 } : c))
+                );
+              }}
             >
               <div className="flex items-center gap-3">
                 <img
@@ -10,6 +10,7 @@ import ProfileTab from '../components/ProfileTab';
 import NotificationsPanel from '../components/NotificationsPanel';
 import MessagesPage from '../components/MessagesPage'; // Import the MessagesPage component
 import { api, getProfilePicture } from "./utils/api";
+import { subscribeEvents } from "./utils/events";
 
 // Add getInitialsAvatar function if it's missing from api.js
 const getInitialsAvatar = (username) => {
@@ -50,7 +51,6 @@ const Dashboard = () => {
   const [notifications, setNotifications] = useState([]);
   const [showNotifications, setShowNotifications] = useState(false);
   const [unreadCount, setUnreadCount] = useState(0);
-  const notificationIntervalRef = useRef(null);
   const [connectedBuddies, setConnectedBuddies] = useState([]);
   const [showChat, setShowChat] = useState(false);
   const [currentChat, setCurrentChat] = useState(null);
@@ -265,16 +265,12 @@ const Dashboard = () => {
     return new Date(timestamp).toLocaleDateString();
   };
 
-  // Simulate receiving new notifications
+  // Refresh notifications when the server pushes one
   useEffect(() => {
-    notificationIntervalRef.current = setInterval(() => {
-      fetchNotifications();
-    }, 30000);
-    return () => {
-      if (notificationIntervalRef.current) {
-        clearInterval(notificationIntervalRef.current);
-      }
-    };
+    return subscribeEvents({
+      notification: fetchNotifications,
+      reset: fetchNotifications,
+    });
   }, [fetchNotifications]);
   
   // Fetch profile data
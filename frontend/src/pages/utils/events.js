@@ -0,0 +1,104 @@
+import { API_BASE, api } from "./api";
+
+const EVENT_TYPES = ["message", "notification", "connection_request", "reset"];
+
+// One connection per page, shared by every subscriber
+const subscribers = new Set();
+// Subscribers waiting for the connection before their first fetch
+const waiting = new Set();
+let connected = false;
+let disconnect = null;
+
+const dispatch = (type, data) => subscribers.forEach((handlers) => handlers[type]?.(data));
+
+// Events are delivered from now on, so a fetch started now misses nothing
+const markConnected = () => {
+  connected = true;
+  waiting.forEach((handlers) => handlers.reset?.({}));
+  waiting.clear();
+};
+
+const openStream = () => {
+  const source = new EventSource(`${API_BASE}/api/events`, { withCredentials: true });
+  let failed = false;
+  source.addEventListener("open", () => {
+    if (failed) {
+      // Subscribers fetched while the stream was down, fetch again
+      waiting.clear();
+      dispatch("reset", {});
+    }
+    failed = false;
+    markConnected();
+  });
+  source.addEventListener("error", () => {
+    // Load anyway, EventSource keeps reconnecting in the background
+    failed = true;
+    markConnected();
+  });
+  EVENT_TYPES.forEach((type) =>
+    source.addEventListener(type, (e) => dispatch(type, JSON.parse(e.data)))
+  );
+  return () => source.close();
+};
+
+const openPolling = () => {
+  let closed = false;
+  let cursor = null;
+  const poll = async () => {
+    while (!closed) {
+      try {
+        // The first call returns the current cursor without waiting
+        const params = cursor ? `?after=${cursor}` : "?timeout=0";
+        const { data } = await api.get(`/events/poll${params}`);
+        if (closed) break;
+        cursor = data.cursor;
+        markConnected();
+        if (data.reset) dispatch("reset", {});
+        data.events.forEach((event) => dispatch(event.type, event.data));
+      } catch (err) {
+        console.error("Event poll failed:", err);
+        markConnected();
+        await new Promise((resolve) => setTimeout(resolve, 5000));
+      }
+    }
+  };
+  poll();
+  return () => {
+    closed = true;
+  };
+};
+
+const closeIfUnused = () => {
+  if (subscribers.size === 0 && disconnect) {
+    disconnect();
+    disconnect = null;
+    connected = false;
+  }
+};
+
+// Subscribe to the server's realtime events (new messages, notifications,
+// connection requests). All subscribers share one Server-Sent Events
+// connection, or one long-polling loop where EventSource is unavailable.
+// `handlers` maps an event type to a callback receiving its data. "reset"
+// is called once the connection is live, so the subscriber's initial fetch
+// cannot miss events sent before it, and again whenever events were missed
+// and the caller should refetch. Returns a function that unsubscribes.
+export const subscribeEvents = (handlers) => {
+  subscribers.add(handlers);
+  if (connected) {
+    Promise.resolve().then(() => subscribers.has(handlers) && handlers.reset?.({}));
+  } else {
+    waiting.add(handlers);
+  }
+  if (!disconnect) {
+    disconnect =
+      typeof window !== "undefined" && "EventSource" in window ? openStream() : openPolling();
+  }
+
+  return () => {
+    subscribers.delete(handlers);
+    waiting.delete(handlers);
+    // Keep the connection through a re-subscribe, e.g. switching chats
+    setTimeout(closeIfUnused, 1000);
+  };
+};